@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+import traceback
+from typing import Callable
+
+import folder_paths
+
+# Rebuild every schema at least this often, for nodes that list files without going through folder_paths
+FULL_REFRESH_INTERVAL = 60.0
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Whether an If-None-Match request header matches the current ETag."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ObjectInfoCache:
+    """
+    Pre-serialised /object_info payload.
+
+    The schema of every node class is serialised once and kept together with
+    the folders its INPUT_TYPES read through folder_paths. On each request only
+    the classes whose folders changed, or that were added or imported since the
+    last request, are recomputed, and the JSON body, its gzip encoding and the
+    ETag are only rebuilt when one of the schemas actually changed.
+    """
+
+    def __init__(self, node_mappings: dict, node_info: Callable[[str], dict]):
+        self.node_mappings = node_mappings
+        self.node_info = node_info
+        # class_type -> (node class, serialised schema, {folder read: stamp})
+        self.entries: dict[str, tuple[object, bytes, dict]] = {}
+        self.etag: str | None = None
+        self.body: bytes | None = None
+        self.gzip_body: bytes | None = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def _compute(self, class_type: str):
+        with folder_paths.record_folder_reads() as reads:
+            try:
+                fragment = json.dumps(self.node_info(class_type)).encode("utf-8")
+            except Exception:
+                logging.error(f"[ERROR] An error occurred while retrieving information for the '{class_type}' node.")
+                logging.error(traceback.format_exc())
+                return None
+        stamps = {read: folder_paths.get_read_stamp(read) for read in reads}
+        # Looked up after node_info, which may have imported a lazily loaded node
+        return dict.get(self.node_mappings, class_type), fragment, stamps
+
+    def get(self) -> tuple[str, bytes, bytes]:
+        """Refresh the payload if needed and return (etag, body, gzipped body)."""
+        with self.lock, folder_paths.cache_helper:
+            now = time.monotonic()
+            full_refresh = self.body is None or now - self.built_at >= FULL_REFRESH_INTERVAL
+            current_stamps = {}
+
+            def is_stale(stamps):
+                for read, stamp in stamps.items():
+                    if read not in current_stamps:
+                        current_stamps[read] = folder_paths.get_read_stamp(read)
+                    if stamp is None or current_stamps[read] != stamp:
+                        return True
+                return False
+
+            changed = False
+            entries = {}
+            for class_type in list(self.node_mappings):
+                entry = self.entries.get(class_type)
+                if full_refresh or entry is None or entry[0] is not dict.get(self.node_mappings, class_type) or is_stale(entry[2]):
+                    new_entry = self._compute(class_type)
+                    if new_entry is None:
+                        continue
+                    if entry is None or entry[1] != new_entry[1]:
+                        changed = True
+                    entry = new_entry
+                entries[class_type] = entry
+            if entries.keys() != self.entries.keys():
+                changed = True
+            self.entries = entries
+
+            if full_refresh:
+                self.built_at = now
+            if changed or self.body is None:
+                self.body = b"{" + b", ".join(json.dumps(class_type).encode("utf-8") + b": " + entry[1] for class_type, entry in entries.items()) + b"}"
+                self.gzip_body = gzip.compress(self.body, compresslevel=6, mtime=0)
+                self.etag = '"{}"'.format(hashlib.blake2b(self.body, digest_size=16).hexdigest())
+            return self.etag, self.body, self.gzip_body
@@ -0,0 +1,130 @@
+"""
+Benchmark cache key generation for the outputs cache.
+
+Compares the previous CacheKeySetInputSignature (full ordered ancestry per
+node, nested frozensets) with the memoized digest implementation on
+synthetic workflows of 500-5000 nodes.
+
+Usage: python benchmarks/cache_key_benchmark.py [--sizes 500 1000 2500 5000]
+"""
+import argparse
+import logging
+import asyncio
+import os
+import random
+import sys
+import time
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class BenchNode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {"required": {}}
+
+
+# Only NODE_CLASS_MAPPINGS is needed; avoid importing torch/CUDA through nodes.py
+mock_nodes = MagicMock()
+mock_nodes.NODE_CLASS_MAPPINGS = {"BenchSource": BenchNode, "BenchOp": BenchNode}
+mock_nodes.get_node_class = mock_nodes.NODE_CLASS_MAPPINGS.__getitem__
+sys.modules.setdefault("nodes", mock_nodes)
+
+from comfy_execution.caching import CacheKeySetInputSignature, to_hashable  # noqa: E402
+from comfy_execution.graph import DynamicPrompt  # noqa: E402
+from comfy_execution.graph_utils import is_link  # noqa: E402
+
+
+class LegacyCacheKeySetInputSignature(CacheKeySetInputSignature):
+    """The ancestry-based implementation the digests replaced."""
+
+    async def get_node_signature(self, dynprompt, node_id):
+        signature = []
+        ancestors, order_mapping = self.get_ordered_ancestry(dynprompt, node_id)
+        signature.append(await self.get_legacy_immediate_signature(dynprompt, node_id, order_mapping))
+        for ancestor_id in ancestors:
+            signature.append(await self.get_legacy_immediate_signature(dynprompt, ancestor_id, order_mapping))
+        return to_hashable(signature)
+
+    async def get_legacy_immediate_signature(self, dynprompt, node_id, ancestor_order_mapping):
+        node = dynprompt.get_node(node_id)
+        signature = [node["class_type"], await self.is_changed_cache.get(node_id)]
+        inputs = node["inputs"]
+        for key in sorted(inputs.keys()):
+            if is_link(inputs[key]):
+                (ancestor_id, ancestor_socket) = inputs[key]
+                signature.append((key, ("ANCESTOR", ancestor_order_mapping[ancestor_id], ancestor_socket)))
+            else:
+                signature.append((key, inputs[key]))
+        return signature
+
+    def get_ordered_ancestry(self, dynprompt, node_id):
+        ancestors = []
+        order_mapping = {}
+        stack = [node_id]
+        # Iterative version of the old recursive walk so deep graphs don't hit the recursion limit
+        while stack:
+            inputs = dynprompt.get_node(stack.pop())["inputs"]
+            for key in reversed(sorted(inputs.keys())):
+                if is_link(inputs[key]) and inputs[key][0] not in order_mapping:
+                    ancestor_id = inputs[key][0]
+                    ancestors.append(ancestor_id)
+                    order_mapping[ancestor_id] = len(ancestors) - 1
+                    stack.append(ancestor_id)
+        return ancestors, order_mapping
+
+
+class BenchIsChangedCache:
+    async def get(self, node_id):
+        return False
+
+
+def make_graph(size, seed=0):
+    """Layered DAG where each node links to 1-3 earlier nodes, like a long sampler/VAE chain."""
+    rng = random.Random(seed)
+    prompt = {"0": {"class_type": "BenchSource", "inputs": {"text": "source", "value": 0}}}
+    for i in range(1, size):
+        inputs = {"value": i, "mode": rng.choice(["a", "b", "c"]), "scale": rng.random()}
+        for slot in range(rng.randint(1, 3)):
+            # Mostly link to recent nodes so the graph is deep, sometimes far back
+            back = rng.randint(1, min(i, 8)) if rng.random() < 0.9 else rng.randint(1, i)
+            inputs[f"input_{slot}"] = [str(i - back), 0]
+        prompt[str(i)] = {"class_type": "BenchOp", "inputs": inputs}
+    return prompt
+
+
+async def time_keys(key_class, prompt, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        dynprompt = DynamicPrompt(prompt)
+        is_changed = BenchIsChangedCache()
+        start = time.perf_counter()
+        # The executor sets up both the outputs and ui caches for each prompt
+        for _ in range(2):
+            key_set = key_class(dynprompt, prompt.keys(), is_changed)
+            await key_set.add_keys(prompt.keys())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def main(sizes, repeat, legacy_limit):
+    logging.info(f"{'nodes':>6} {'legacy (s)':>12} {'digest (s)':>12} {'speedup':>9}")
+    for size in sizes:
+        prompt = make_graph(size)
+        new = await time_keys(CacheKeySetInputSignature, prompt, repeat)
+        if size <= legacy_limit:
+            old = await time_keys(LegacyCacheKeySetInputSignature, prompt, 1)
+            logging.info(f"{size:>6} {old:>12.3f} {new:>12.4f} {old / new:>8.0f}x")
+        else:
+            logging.info(f"{size:>6} {'skipped':>12} {new:>12.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2500, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=int, default=1000, help="Skip the slow legacy run above this many nodes")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeat, args.legacy_limit))
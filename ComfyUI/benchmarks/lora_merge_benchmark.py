@@ -0,0 +1,105 @@
+"""
+Benchmark patching LoRAs into a model.
+
+Builds a DiT shaped stack of linear layers, applies 1, 3 and 5 random LoRAs
+through ModelPatcher and compares merging every weight on its own with
+calculate_weight (the previous behaviour of ModelPatcher.load) against the
+batched merge of patch_weights_to_device. Runs on the GPU when one is
+available.
+
+Usage: python benchmarks/lora_merge_benchmark.py [--blocks 40] [--width 3072] [--rank 32]
+                                                 [--loras 1 3 5] [--dtype bf16]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch  # noqa: E402
+
+from comfy.cli_args import args  # noqa: E402
+
+if not torch.cuda.is_available():
+    args.cpu = True
+
+import comfy.model_management  # noqa: E402
+import comfy.model_patcher  # noqa: E402
+from comfy.weight_adapter.lora import LoRAAdapter  # noqa: E402
+
+DTYPES = {"fp32": torch.float32, "fp16": torch.float16, "bf16": torch.bfloat16, "fp8": torch.float8_e4m3fn}
+
+
+def make_model(blocks, width, dtype):
+    layers = []
+    for _ in range(blocks):
+        # qkv, attention out, mlp in, mlp out of one transformer block
+        layers += [torch.nn.Linear(width, 3 * width), torch.nn.Linear(width, width),
+                   torch.nn.Linear(width, 4 * width), torch.nn.Linear(4 * width, width)]
+    model = torch.nn.Sequential(*layers)
+    with torch.no_grad():
+        for p in model.parameters():
+            p.data = p.data.to(dtype)
+    return model
+
+
+def make_lora(model, rank):
+    patches = {}
+    for name, module in model.named_modules():
+        if isinstance(module, torch.nn.Linear):
+            up = torch.randn(module.out_features, rank, dtype=torch.float16) * 0.01
+            down = torch.randn(rank, module.in_features, dtype=torch.float16) * 0.01
+            patches["{}.weight".format(name)] = LoRAAdapter(set(), (up, down, float(rank), None, None, None))
+    return patches
+
+
+def sync(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def time_patch(patcher, keys, device, batched):
+    sync(device)
+    start = time.perf_counter()
+    if batched:
+        patcher.patch_weights_to_device(keys, device_to=device)
+    else:
+        for key in keys:
+            patcher.patch_weight_to_device(key, device_to=device)
+    sync(device)
+    elapsed = time.perf_counter() - start
+    patcher.unpatch_model(patcher.offload_device)
+    return elapsed
+
+
+def main(blocks, width, rank, lora_counts, dtype):
+    device = comfy.model_management.get_torch_device()
+    model = make_model(blocks, width, DTYPES[dtype])
+    base = comfy.model_patcher.ModelPatcher(model, device, torch.device("cpu"))
+    loras = [make_lora(model, rank) for _ in range(max(lora_counts))]
+    keys = list(loras[0])
+    size = sum(p.numel() * p.element_size() for p in model.parameters()) / (1024 ** 3)
+
+    logging.info(f"{len(keys)} weights, {size:.2f} GB {dtype}, rank {rank}, device {device}")
+    logging.info(f"{'loras':>6} {'per key':>10} {'batched':>10} {'speedup':>8}")
+    for count in lora_counts:
+        patcher = base.clone()
+        for lora in loras[:count]:
+            patcher.add_patches(lora, 1.0)
+        per_key = time_patch(patcher, keys, device, batched=False)
+        batched = time_patch(patcher, keys, device, batched=True)
+        logging.info(f"{count:>6} {per_key:>9.2f}s {batched:>9.2f}s {per_key / batched:>7.2f}x")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=40)
+    parser.add_argument("--width", type=int, default=3072)
+    parser.add_argument("--rank", type=int, default=32)
+    parser.add_argument("--loras", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--dtype", choices=DTYPES, default="bf16")
+    cli_args = parser.parse_args()
+    main(cli_args.blocks, cli_args.width, cli_args.rank, cli_args.loras, cli_args.dtype)
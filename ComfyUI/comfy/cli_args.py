@@ -47,6 +47,8 @@ parser.add_argument("--extra-model-paths-config", type=str, default=None, metava
 parser.add_argument("--output-directory", type=str, default=None, help="Set the ComfyUI output directory. Overrides --base-directory.")
 parser.add_argument("--temp-directory", type=str, default=None, help="Set the ComfyUI temp directory (default is in the ComfyUI directory). Overrides --base-directory.")
 parser.add_argument("--input-directory", type=str, default=None, help="Set the ComfyUI input directory. Overrides --base-directory.")
+parser.add_argument("--folder-watch", type=str, default="auto", choices=["auto", "poll", "off"], help="How the in-memory index of model and input folders is kept current: auto uses inotify on Linux and falls back to polling, poll checks folder modification times in the background, off checks them on every lookup like before.")
+parser.add_argument("--folder-poll-interval", type=float, default=2.0, help="Seconds between background checks of folders that are polled instead of watched.")
 parser.add_argument("--auto-launch", action="store_true", help="Automatically launch ComfyUI in the default browser.")
 parser.add_argument("--disable-auto-launch", action="store_true", help="Disable auto launching the browser.")
 parser.add_argument("--cuda-device", type=int, default=None, metavar="DEVICE_ID", help="Set the id of the cuda device this instance will use. All other devices will not be visible.")
@@ -100,11 +102,24 @@ class LatentPreviewMethod(enum.Enum):
 parser.add_argument("--preview-method", type=LatentPreviewMethod, default=LatentPreviewMethod.NoPreviews, help="Default preview method for sampler nodes.", action=EnumAction)
 
 parser.add_argument("--preview-size", type=int, default=512, help="Sets the maximum preview size for sampler nodes.")
+parser.add_argument("--preview-step-interval", type=int, default=1, metavar="N", help="Only decode a sampler preview every N steps. The last step is always previewed.")
+parser.add_argument("--preview-min-interval", type=float, default=0, metavar="MS", help="Decode sampler previews at most every MS milliseconds.")
+parser.add_argument("--progress-state-interval", type=float, default=100, metavar="MS", help="Minimum time between progress_state websocket messages during a node's execution. Node starts and finishes are always sent.")
 
 cache_group = parser.add_mutually_exclusive_group()
 cache_group.add_argument("--cache-classic", action="store_true", help="Use the old style (aggressive) caching.")
 cache_group.add_argument("--cache-lru", type=int, default=0, help="Use LRU caching with a maximum of N node results cached. May use more RAM/VRAM.")
 cache_group.add_argument("--cache-none", action="store_true", help="Reduced RAM/VRAM usage at the expense of executing every node for each run.")
+cache_group.add_argument("--cache-ram", type=float, default=0, help="Use LRU caching limited to N GB of cached tensors in RAM instead of a number of node results.")
+parser.add_argument("--cache-vram", type=float, default=0, help="With --cache-ram, also limit cached tensors that live in VRAM to N GB.")
+parser.add_argument("--lora-cache-size", type=float, default=2.0, help="RAM budget in GB for LoRA files kept loaded between runs and shared by all LoRA loader nodes. The most recently used LoRA is always kept.")
+parser.add_argument("--patched-weight-cache-size", type=float, default=0, help="Keep up to N GB of weights with LoRAs applied in RAM so switching back to a recently used LoRA combination copies them instead of recomputing them. Disabled by default.")
+
+parser.add_argument("--batch-prompts", type=int, default=0, metavar="N", help="Sample up to N queued prompts that only differ in seed or conditioning in one batched KSampler call. Only used with deterministic samplers.")
+
+parser.add_argument("--disk-cache-dir", type=str, default=None, help="Also keep the outputs of expensive deterministic nodes as safetensors files in this directory so they survive restarts and are shared by ComfyUI processes on the same host.")
+parser.add_argument("--disk-cache-size", type=float, default=20.0, help="Maximum size of the --disk-cache-dir cache in GB. The least recently used entries are evicted first.")
+parser.add_argument("--disk-cache-nodes", type=str, nargs="+", default=None, help="Node class types whose outputs are kept in the disk cache. Defaults to CLIPTextEncode, CLIPVisionEncode, VAEEncode, VAEEncodeForInpaint and LoadImage.")
 
 attn_group = parser.add_mutually_exclusive_group()
 attn_group.add_argument("--use-split-cross-attention", action="store_true", help="Use the split cross attention optimization. Ignored when xformers is used.")
@@ -131,6 +146,8 @@ vram_group.add_argument("--cpu", action="store_true", help="To use the CPU for e
 parser.add_argument("--reserve-vram", type=float, default=None, help="Set the amount of vram in GB you want to reserve for use by your OS/other software. By default some amount is reserved depending on your OS.")
 
 parser.add_argument("--async-offload", action="store_true", help="Use async weight offloading.")
+parser.add_argument("--prefetch-layers", type=int, default=0, metavar="N", help="In low VRAM mode, copy the weights of the next N offloaded layers to the GPU on a side stream while the current layer runs. Offloaded weights are pinned in host memory. Disabled by default.")
+parser.add_argument("--residency-planner", action="store_true", help="Unload the models whose next use by the running and queued prompts is farthest away first, and load the model needed next ahead of time when it fits in free VRAM.")
 
 parser.add_argument("--force-non-blocking", action="store_true", help="Force ComfyUI to use non-blocking operations for all applicable tensors. This may improve performance on some non-Nvidia systems but can cause issues with some workflows.")
 
@@ -155,6 +172,13 @@ parser.add_argument("--quick-test-for-ci", action="store_true", help="Quick test
 parser.add_argument("--windows-standalone-build", action="store_true", help="Windows standalone build: Enable convenient things that most people using the standalone windows build will probably enjoy (like auto opening the page on startup).")
 
 parser.add_argument("--disable-metadata", action="store_true", help="Disable saving prompt metadata in files.")
+parser.add_argument("--image-save-threads", type=int, default=None, help="Number of threads encoding the PNGs of a batch in SaveImage and PreviewImage. Defaults to the number of CPU cores, at most 8.")
+parser.add_argument("--async-image-writes", action="store_true", help="Let SaveImage and PreviewImage finish writing their PNGs in the background while the prompt keeps executing. A prompt is only reported as finished once its files are written.")
+parser.add_argument("--video-encode-threads", type=int, default=0, help="Threads used by the H.264 encoder when saving videos, 0 lets the encoder decide.")
+parser.add_argument("--video-encode-preset", type=str, default=None, help="x264 preset used when saving videos, e.g. veryfast. Defaults to the encoder's default (medium).")
+parser.add_argument("--video-encode-crf", type=float, default=None, help="x264 CRF used when saving videos, lower is better quality. Defaults to the encoder's default (23).")
+parser.add_argument("--lazy-node-loading", action="store_true", help="Only import node modules when a prompt uses one of their nodes. The first start imports everything and writes an index of node types and their schemas that later starts use instead. Custom nodes that add web extensions or routes are always imported at startup. The server waits while a module is imported on first use.")
+parser.add_argument("--node-index-path", type=str, default=None, help="Where to keep the --lazy-node-loading index. Defaults to node_index.json in the user directory.")
 parser.add_argument("--disable-all-custom-nodes", action="store_true", help="Disable loading all custom nodes.")
 parser.add_argument("--whitelist-custom-nodes", type=str, nargs='+', default=[], help="Specify custom node folders to load even when --disable-all-custom-nodes is enabled.")
 parser.add_argument("--disable-api-nodes", action="store_true", help="Disable loading all api nodes.")
@@ -65,3 +65,17 @@ def stochastic_rounding(value, dtype, seed=0):
         return output
 
     return value.to(dtype=dtype)
+
+
+def stochastic_rounding_batched(values, dtype, seeds):
+    """
+    List of stochastic_rounding of each values[i] with seeds[i].
+
+    Every result gets its own storage, the results become separate parameters
+    and a view into one batch tensor would keep all of them alive until the
+    last one is freed.
+    """
+    if dtype == torch.float8_e4m3fn or dtype == torch.float8_e5m2:
+        # Every weight keeps the random stream of its own seed
+        return [stochastic_rounding(values[i], dtype, seed=seed) for i, seed in enumerate(seeds)]
+    return [value.to(dtype=dtype, copy=True) for value in values]
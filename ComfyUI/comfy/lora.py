@@ -407,3 +407,67 @@ def calculate_weight(patches, weight, key, intermediate_dtype=torch.float32, ori
             weight = old_weight
 
     return weight
+
+# Upper bound for the intermediate weights merged together by calculate_weights_batched
+BATCH_MERGE_BYTES = 256 * 1024 * 1024
+
+
+def lora_batch_signature(patches, weight):
+    """
+    Grouping key for weights that can be merged by calculate_weights_batched.
+
+    Only weights patched exclusively by plain LoRAs (no mid, DoRA, reshape,
+    offset or function) qualify, and weights are only merged together when their
+    shapes and the ranks, dtypes and scales of their LoRAs match. Returns None for
+    weights that need calculate_weight.
+    """
+    if len(patches) == 0:
+        return None
+    signature = [tuple(weight.shape)]
+    for strength, v, strength_model, offset, function in patches:
+        if offset is not None or function is not None or strength_model != 1.0:
+            return None
+        if type(v) is not weight_adapter.LoRAAdapter:
+            return None
+        mat1, mat2, alpha, mid, dora_scale, reshape = v.weights
+        if mid is not None or dora_scale is not None or reshape is not None:
+            return None
+        rank = mat2.shape[0]
+        if mat1.shape[0] != weight.shape[0] or mat1[0].numel() != rank or mat2[0].numel() * weight.shape[0] != weight.numel():
+            return None
+        if alpha is not None:
+            alpha = alpha / rank
+        else:
+            alpha = 1.0
+        signature.append((rank, mat1.dtype, mat2.dtype, strength * alpha))
+    return tuple(signature)
+
+
+def calculate_weights_batched(patches_list, weights, intermediate_dtype=torch.float32):
+    """
+    Apply the LoRA patches of several equally shaped weights at once.
+
+    weights is a (N, *shape) tensor of intermediate_dtype holding the weights to
+    patch and patches_list the N patch lists, which must all have the same
+    lora_batch_signature. The up and down matrices of each LoRA are stacked and
+    merged with one baddbmm instead of N small matmuls.
+    """
+    n = weights.shape[0]
+    flat = weights.view(n, weights.shape[1], -1)
+    non_blocking = comfy.model_management.device_supports_non_blocking(weights.device)
+    for i, p in enumerate(patches_list[0]):
+        strength = p[0]
+        mat2, alpha = p[1].weights[1:3]
+        rank = mat2.shape[0]
+        if alpha is not None:
+            alpha = alpha / rank
+        else:
+            alpha = 1.0
+        up = torch.empty((n, flat.shape[1], rank), dtype=intermediate_dtype, device=weights.device)
+        down = torch.empty((n, rank, flat.shape[2]), dtype=intermediate_dtype, device=weights.device)
+        for j, patches in enumerate(patches_list):
+            v = patches[i][1].weights
+            up[j].copy_(v[0].reshape(up.shape[1:]), non_blocking=non_blocking)
+            down[j].copy_(v[1].reshape(down.shape[1:]), non_blocking=non_blocking)
+        flat.baddbmm_(up, down, alpha=strength * alpha)
+    return weights
@@ -0,0 +1,95 @@
+"""
+Shared LoRA file cache used by the LoRA loader nodes and comfy.sd.load_lora_for_models.
+"""
+from __future__ import annotations
+import collections
+import os
+import threading
+
+import torch
+
+import comfy.utils
+from comfy.cli_args import args
+
+
+class LoraFileCache:
+    """
+    Process wide LRU cache of LoRA state dicts read from disk.
+
+    Entries are keyed by (path, mtime, size) so a replaced file is read again.
+    Safetensors files stay mmap backed, as returned by load_torch_file. When the
+    cached state dicts exceed the byte budget the least recently used ones are
+    dropped, but the most recently used LoRA is always kept.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def state_dict_bytes(sd):
+        storages = {}
+        for v in sd.values():
+            if isinstance(v, torch.Tensor):
+                storage = v.untyped_storage()
+                storages[storage.data_ptr()] = storage.nbytes()
+        return sum(storages.values())
+
+    def load(self, lora_path):
+        st = os.stat(lora_path)
+        key = (os.path.realpath(lora_path), st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        sd = comfy.utils.load_torch_file(lora_path, safe_load=True)
+        nbytes = self.state_dict_bytes(sd)
+        with self.lock:
+            if key not in self.entries:
+                # Drop stale entries for older versions of the same file
+                for old_key in [k for k in self.entries if k[0] == key[0]]:
+                    self._remove(old_key)
+                self.entries[key] = (sd, nbytes)
+                self.total_bytes += nbytes
+            self.entries.move_to_end(key)
+            while self.total_bytes > self.budget and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+        return sd
+
+    def _remove(self, key):
+        _, nbytes = self.entries.pop(key)
+        self.total_bytes -= nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+lora_cache = LoraFileCache(int(args.lora_cache_size * (1024 ** 3)))
+
+
+def load_lora_file(lora_path):
+    """Load a LoRA state dict through the shared cache. The returned dict must not be modified."""
+    return lora_cache.load(lora_path)
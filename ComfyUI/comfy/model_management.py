@@ -565,17 +565,27 @@ def extra_reserved_memory():
 def minimum_inference_memory():
     return (1024 * 1024 * 1024) * 0.8 + extra_reserved_memory()
 
+# Set to a comfy_execution.residency.ResidencyPlanner to choose the models to unload by their predicted next use
+residency_planner = None
+
 def free_memory(memory_required, device, keep_loaded=[]):
     cleanup_models_gc()
     unloaded_model = []
     can_unload = []
     unloaded_models = []
 
+    next_uses = None
+    if residency_planner is not None:
+        next_uses = residency_planner.next_uses()
+
     for i in range(len(current_loaded_models) -1, -1, -1):
         shift_model = current_loaded_models[i]
         if shift_model.device == device:
             if shift_model not in keep_loaded and not shift_model.is_dead():
-                can_unload.append((-shift_model.model_offloaded_memory(), sys.getrefcount(shift_model.model), shift_model.model_memory(), i))
+                order = (-shift_model.model_offloaded_memory(), sys.getrefcount(shift_model.model), shift_model.model_memory(), i)
+                if next_uses is not None:
+                    order = residency_planner.eviction_rank(shift_model, next_uses) + order
+                can_unload.append(order)
                 shift_model.currently_used = False
 
     for x in sorted(can_unload):
@@ -587,6 +597,8 @@ def free_memory(memory_required, device, keep_loaded=[]):
                 break
             memory_to_free = memory_required - free_mem
         logging.debug(f"Unloading {current_loaded_models[i].model.model.__class__.__name__}")
+        if next_uses is not None:
+            residency_planner.record_eviction(current_loaded_models[i], next_uses, memory_to_free)
         if current_loaded_models[i].model_unload(memory_to_free):
             unloaded_model.append(i)
 
@@ -32,8 +32,11 @@ import comfy.float
 import comfy.hooks
 import comfy.lora
 import comfy.model_management
+import comfy.patched_weight_cache
 import comfy.patcher_extension
 import comfy.utils
+import comfy.weight_prefetch
+from comfy.cli_args import args
 from comfy.comfy_types import UnetWrapperFunction
 from comfy.patcher_extension import CallbacksMP, PatcherInjection, WrappersMP
 
@@ -106,6 +109,9 @@ def wipe_lowvram_weight(m):
     if hasattr(m, "bias_function"):
         m.bias_function = []
 
+    if getattr(m, "weight_prefetcher", None) is not None:
+        m.weight_prefetcher = None
+
 def move_weight_functions(m, device):
     if device is None:
         return 0
@@ -577,6 +583,24 @@ class ModelPatcher:
                         sd.pop(k)
             return sd
 
+    def _backup_weight(self, key, weight, inplace_update):
+        if key not in self.backup:
+            self.backup[key] = collections.namedtuple('Dimension', ['weight', 'inplace_update'])(weight.to(device=self.offload_device, copy=inplace_update), inplace_update)
+
+    def _set_patched_weight(self, key, out_weight, inplace_update):
+        if inplace_update:
+            comfy.utils.copy_to_param(self.model, key, out_weight)
+        else:
+            comfy.utils.set_attr_param(self.model, key, out_weight)
+
+    def _patch_weight_from_cache(self, key, weight, device, inplace_update):
+        # A copy of a previously patched weight is much cheaper than calculate_weight
+        handle = comfy.patched_weight_cache.patched_weight_cache.make_key(self.model, key, weight, self.patches[key], device)
+        out_weight = comfy.patched_weight_cache.patched_weight_cache.get(handle, device)
+        if out_weight is not None:
+            self._set_patched_weight(key, out_weight, inplace_update)
+        return handle, out_weight is not None
+
     def patch_weight_to_device(self, key, device_to=None, inplace_update=False):
         if key not in self.patches:
             return
@@ -584,8 +608,13 @@ class ModelPatcher:
         weight, set_func, convert_func = get_key_weight(self.model, key)
         inplace_update = self.weight_inplace_update or inplace_update
 
-        if key not in self.backup:
-            self.backup[key] = collections.namedtuple('Dimension', ['weight', 'inplace_update'])(weight.to(device=self.offload_device, copy=inplace_update), inplace_update)
+        self._backup_weight(key, weight, inplace_update)
+
+        handle = None
+        if set_func is None and convert_func is None:
+            handle, hit = self._patch_weight_from_cache(key, weight, device_to if device_to is not None else weight.device, inplace_update)
+            if hit:
+                return
 
         if device_to is not None:
             temp_weight = comfy.model_management.cast_to_device(weight, device_to, torch.float32, copy=True)
@@ -597,13 +626,70 @@ class ModelPatcher:
         out_weight = comfy.lora.calculate_weight(self.patches[key], temp_weight, key)
         if set_func is None:
             out_weight = comfy.float.stochastic_rounding(out_weight, weight.dtype, seed=string_to_seed(key))
-            if inplace_update:
-                comfy.utils.copy_to_param(self.model, key, out_weight)
-            else:
-                comfy.utils.set_attr_param(self.model, key, out_weight)
+            comfy.patched_weight_cache.patched_weight_cache.put(handle, out_weight)
+            self._set_patched_weight(key, out_weight, inplace_update)
         else:
             set_func(out_weight, inplace_update=inplace_update, seed=string_to_seed(key))
 
+    def patch_weights_to_device(self, keys, device_to=None, inplace_update=False):
+        """
+        Patch several weights. Equally shaped weights patched only by plain LoRAs
+        are merged together with comfy.lora.calculate_weights_batched, the other
+        ones go through patch_weight_to_device.
+        """
+        inplace_update = self.weight_inplace_update or inplace_update
+        groups = {}
+        for key in keys:
+            if key not in self.patches:
+                continue
+            weight, set_func, convert_func = get_key_weight(self.model, key)
+            signature = None
+            if set_func is None and convert_func is None:
+                signature = comfy.lora.lora_batch_signature(self.patches[key], weight)
+            if signature is None:
+                self.patch_weight_to_device(key, device_to=device_to, inplace_update=inplace_update)
+                continue
+
+            self._backup_weight(key, weight, inplace_update)
+            device = device_to if device_to is not None else weight.device
+            handle, hit = self._patch_weight_from_cache(key, weight, device, inplace_update)
+            if not hit:
+                groups.setdefault((signature, weight.dtype, device), []).append((key, weight, handle))
+
+        for (_, dtype, device), group in groups.items():
+            chunk_size = max(1, comfy.lora.BATCH_MERGE_BYTES // (group[0][1].numel() * 4))
+            for start in range(0, len(group), chunk_size):
+                chunk = group[start:start + chunk_size]
+                temp_weights = torch.empty((len(chunk),) + tuple(chunk[0][1].shape), dtype=torch.float32, device=device)
+                for i, (_, weight, _) in enumerate(chunk):
+                    temp_weights[i].copy_(weight)
+                comfy.lora.calculate_weights_batched([self.patches[key] for key, _, _ in chunk], temp_weights)
+                out_weights = comfy.float.stochastic_rounding_batched(temp_weights, dtype, [string_to_seed(key) for key, _, _ in chunk])
+                del temp_weights
+                for i, (key, _, handle) in enumerate(chunk):
+                    comfy.patched_weight_cache.patched_weight_cache.put(handle, out_weights[i])
+                    self._set_patched_weight(key, out_weights[i], inplace_update)
+
+    def _attach_weight_prefetcher(self, m, device):
+        if args.prefetch_layers <= 0 or device is None or not comfy.model_management.is_device_cuda(device):
+            return
+        prefetcher = getattr(self.model, "weight_prefetcher", None)
+        if prefetcher is None:
+            prefetcher = comfy.weight_prefetch.WeightPrefetcher(device, args.prefetch_layers)
+            self.model.weight_prefetcher = prefetcher
+        m.weight_prefetcher = prefetcher
+
+    def _release_weight_prefetcher(self):
+        """Free the prefetch buffers, they are only needed while modules are in low VRAM mode."""
+        prefetcher = getattr(self.model, "weight_prefetcher", None)
+        if prefetcher is None:
+            return
+        for m in self.model.modules():
+            if getattr(m, "weight_prefetcher", None) is not None:
+                m.weight_prefetcher = None
+        prefetcher.release()
+        self.model.weight_prefetcher = None
+
     def _load_list(self):
         loading = []
         for n, m in self.model.named_modules():
@@ -626,6 +712,8 @@ class ModelPatcher:
             patch_counter = 0
             lowvram_counter = 0
             loading = self._load_list()
+            if getattr(self.model, "weight_prefetcher", None) is not None:
+                self.model.weight_prefetcher.reset()
 
             load_completely = []
             loading.sort(reverse=True)
@@ -652,6 +740,7 @@ class ModelPatcher:
                     if hasattr(m, "comfy_cast_weights"):
                         m.weight_function = []
                         m.bias_function = []
+                        self._attach_weight_prefetcher(m, device_to)
 
                     if weight_key in self.patches:
                         if force_patch_weights:
@@ -688,6 +777,7 @@ class ModelPatcher:
                 mem_counter += move_weight_functions(m, device_to)
 
             load_completely.sort(reverse=True)
+            patch_keys = []
             for x in load_completely:
                 n = x[1]
                 m = x[2]
@@ -697,11 +787,13 @@ class ModelPatcher:
                         continue
 
                 for param in params:
-                    self.patch_weight_to_device("{}.{}".format(n, param), device_to=device_to)
+                    patch_keys.append("{}.{}".format(n, param))
 
                 logging.debug("lowvram: loaded module regularly {} {}".format(n, m))
                 m.comfy_patched_weights = True
 
+            self.patch_weights_to_device(patch_keys, device_to=device_to)
+
             for x in load_completely:
                 x[2].to(device_to)
 
@@ -711,6 +803,7 @@ class ModelPatcher:
             else:
                 logging.info("loaded completely {} {} {}".format(lowvram_model_memory / (1024 * 1024), mem_counter / (1024 * 1024), full_load))
                 self.model.model_lowvram = False
+                self._release_weight_prefetcher()
                 if full_load:
                     self.model.to(device_to)
                     mem_counter = self.model_size()
@@ -753,6 +846,7 @@ class ModelPatcher:
 
                 self.model.model_lowvram = False
                 self.model.lowvram_patch_counter = 0
+            self._release_weight_prefetcher()
 
             keys = list(self.backup.keys())
 
@@ -831,6 +925,7 @@ class ModelPatcher:
                                 m.bias_function.append(LowVramPatch(bias_key, self.patches))
                                 patch_counter += 1
                             cast_weight = True
+                            self._attach_weight_prefetcher(m, self.load_device)
 
                         if cast_weight:
                             m.prev_comfy_cast_weights = m.comfy_cast_weights
@@ -874,6 +969,7 @@ class ModelPatcher:
         self.model_patches_to(self.offload_device)
         if unpatch_all:
             self.unpatch_model(self.offload_device, unpatch_weights=unpatch_all)
+        self._release_weight_prefetcher()
         for callback in self.get_all_callbacks(CallbacksMP.ON_DETACH):
             callback(self, unpatch_all)
         return self.model
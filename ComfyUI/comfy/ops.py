@@ -67,7 +67,20 @@ def cast_bias_weight(s, input=None, dtype=None, device=None, bias_dtype=None):
         if device is None:
             device = input.device
 
-    offload_stream = comfy.model_management.get_offload_stream(device)
+    weight_source, bias_source = s.weight, s.bias
+    # Weights the prefetcher already copied to the device are private buffers, functions can modify them in place
+    copy_for_function = True
+    prefetcher = getattr(s, "weight_prefetcher", None)
+    prefetched = None
+    if prefetcher is not None and device == prefetcher.device:
+        prefetched = prefetcher.fetch(s)
+
+    if prefetched is not None:
+        weight_source, bias_source = prefetched["weight"], prefetched.get("bias")
+        copy_for_function = False
+        offload_stream = None
+    else:
+        offload_stream = comfy.model_management.get_offload_stream(device)
     if offload_stream is not None:
         wf_context = offload_stream
     else:
@@ -75,9 +88,9 @@ def cast_bias_weight(s, input=None, dtype=None, device=None, bias_dtype=None):
 
     bias = None
     non_blocking = comfy.model_management.device_supports_non_blocking(device)
-    if s.bias is not None:
+    if bias_source is not None:
         has_function = len(s.bias_function) > 0
-        bias = comfy.model_management.cast_to(s.bias, bias_dtype, device, non_blocking=non_blocking, copy=has_function, stream=offload_stream)
+        bias = comfy.model_management.cast_to(bias_source, bias_dtype, device, non_blocking=non_blocking, copy=has_function and copy_for_function, stream=offload_stream)
 
         if has_function:
             with wf_context:
@@ -85,7 +98,7 @@ def cast_bias_weight(s, input=None, dtype=None, device=None, bias_dtype=None):
                     bias = f(bias)
 
     has_function = len(s.weight_function) > 0
-    weight = comfy.model_management.cast_to(s.weight, dtype, device, non_blocking=non_blocking, copy=has_function, stream=offload_stream)
+    weight = comfy.model_management.cast_to(weight_source, dtype, device, non_blocking=non_blocking, copy=has_function and copy_for_function, stream=offload_stream)
     if has_function:
         with wf_context:
             for f in s.weight_function:
@@ -98,6 +111,7 @@ class CastWeightBiasOp:
     comfy_cast_weights = False
     weight_function = []
     bias_function = []
+    weight_prefetcher = None
 
 class disable_weight_init:
     class Linear(torch.nn.Linear, CastWeightBiasOp):
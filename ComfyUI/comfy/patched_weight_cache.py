@@ -0,0 +1,127 @@
+"""
+Cache of fully patched weights used by ModelPatcher.patch_weight_to_device.
+"""
+from __future__ import annotations
+import collections
+import threading
+import weakref
+
+import torch
+
+from comfy.cli_args import args
+
+
+class PatchedWeightCache:
+    """
+    Byte-bounded LRU cache of weights after LoRA and other patches were applied.
+
+    An entry is keyed by the model, the weight key and a fingerprint of the
+    patches for that key. Tensors and other objects in the patches are
+    identified by their id and only weakly referenced, so an entry goes stale
+    as soon as one of them is freed. LoRA tensors keep their identity between
+    runs because LoRA files are shared through comfy.lora_cache, so switching
+    back to a previously used LoRA stack hits the cache even though the new
+    ModelPatcher clone has a different patches_uuid.
+
+    Patched weights are kept in host RAM, pinned when they are copied to a
+    CUDA device so the copy back can be asynchronous.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def _fingerprint(self, value, refs):
+        if value is None or isinstance(value, (str, int, float, bool, torch.dtype)):
+            return value
+        if isinstance(value, torch.Tensor):
+            refs.append(value)
+            return ("tensor", id(value))
+        if isinstance(value, (tuple, list)):
+            return (type(value).__name__,) + tuple(self._fingerprint(v, refs) for v in value)
+        import comfy.weight_adapter
+        if isinstance(value, comfy.weight_adapter.WeightAdapterBase):
+            # Adapters are recreated every time a LoRA is applied, the tensors they wrap are not
+            return (type(value).__qualname__, self._fingerprint(value.weights, refs))
+        refs.append(value)
+        return ("object", id(value))
+
+    def make_key(self, model, key, weight, patches, device):
+        """Return a handle for the patched weight, or None if these patches can't be cached."""
+        if self.budget <= 0:
+            return None
+        refs = [model]
+        # The device is part of the key since patches computed on another device can round differently
+        cache_key = (id(model), key, weight.dtype, tuple(weight.shape), torch.device(device).type, self._fingerprint(patches, refs))
+        try:
+            weak_refs = tuple(weakref.ref(r) for r in refs)
+        except TypeError:
+            return None
+        return cache_key, weak_refs
+
+    def get(self, handle, device):
+        """Copy a cached patched weight to device, or return None."""
+        if handle is None:
+            return None
+        cache_key, _ = handle
+        with self.lock:
+            entry = self.entries.get(cache_key)
+            if entry is not None and any(ref() is None for ref in entry[0]):
+                self._remove(cache_key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(cache_key)
+            self.hits += 1
+            cached = entry[1]
+        return cached.to(device=device, copy=True, non_blocking=cached.is_pinned())
+
+    def put(self, handle, weight):
+        if handle is None:
+            return
+        nbytes = weight.nbytes
+        if nbytes > self.budget:
+            return
+        cache_key, weak_refs = handle
+        if weight.device.type == "cpu":
+            stored = weight.clone()
+        else:
+            stored = torch.empty_like(weight, device="cpu", pin_memory=weight.device.type == "cuda")
+            stored.copy_(weight)
+        with self.lock:
+            if cache_key in self.entries:
+                self._remove(cache_key)
+            self.entries[cache_key] = (weak_refs, stored, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.budget:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, cache_key):
+        entry = self.entries.pop(cache_key)
+        self.total_bytes -= entry[2]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "budget": self.budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+patched_weight_cache = PatchedWeightCache(int(args.patched_weight_cache_size * (1024 ** 3)))
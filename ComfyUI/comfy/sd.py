@@ -51,6 +51,7 @@ import comfy.text_encoders.qwen_image
 
 import comfy.model_patcher
 import comfy.lora
+import comfy.lora_cache
 import comfy.lora_convert
 import comfy.hooks
 import comfy.t2i_adapter.adapter
@@ -65,7 +66,10 @@ def load_lora_for_models(model, clip, lora, strength_model, strength_clip):
     if clip is not None:
         key_map = comfy.lora.model_lora_keys_clip(clip.cond_stage_model, key_map)
 
-    lora = comfy.lora_convert.convert_lora(lora)
+    if isinstance(lora, str):
+        lora = comfy.lora_cache.load_lora_file(lora)
+    # Converters rename keys in place; a file loaded through the cache is shared
+    lora = comfy.lora_convert.convert_lora(dict(lora))
     loaded = comfy.lora.load_lora(lora, key_map)
     if model is not None:
         new_modelpatcher = model.clone()
@@ -526,6 +530,18 @@ class VAE:
                 pixels = pixels.narrow(d + 1, x_offset, x)
         return pixels
 
+    def tile_batch_options(self, tile_memory, out_channels, out_size):
+        """How many tiles to run per call and where to blend them, given the free memory."""
+        free_memory = model_management.get_free_memory(self.device)
+        # Blending buffers: the output plus one channel of weights, in float32
+        out_bytes = math.prod(out_size) * (out_channels + 1) * 4
+        accumulate_device = None
+        if self.output_device != self.device and free_memory > out_bytes * 2 + tile_memory:
+            accumulate_device = self.device
+            free_memory -= out_bytes
+        tile_batch = max(1, min(comfy.utils.MAX_TILE_BATCH, int(free_memory / max(1, tile_memory))))
+        return tile_batch, accumulate_device
+
     def decode_tiled_(self, samples, tile_x=64, tile_y=64, overlap = 16):
         steps = samples.shape[0] * comfy.utils.get_tiled_scale_steps(samples.shape[3], samples.shape[2], tile_x, tile_y, overlap)
         steps += samples.shape[0] * comfy.utils.get_tiled_scale_steps(samples.shape[3], samples.shape[2], tile_x // 2, tile_y * 2, overlap)
@@ -533,10 +549,13 @@ class VAE:
         pbar = comfy.utils.ProgressBar(steps)
 
         decode_fn = lambda a: self.first_stage_model.decode(a.to(self.vae_dtype).to(self.device)).float()
+        out_size = (samples.shape[2] * self.upscale_ratio, samples.shape[3] * self.upscale_ratio)
+        tile_batch, accumulate_device = self.tile_batch_options(self.memory_used_decode((1, samples.shape[1], tile_y, tile_x), self.vae_dtype), self.output_channels, out_size)
+        options = {"output_device": self.output_device, "pbar": pbar, "tile_batch": tile_batch, "accumulate_device": accumulate_device}
         output = self.process_output(
-            (comfy.utils.tiled_scale(samples, decode_fn, tile_x // 2, tile_y * 2, overlap, upscale_amount = self.upscale_ratio, output_device=self.output_device, pbar = pbar) +
-            comfy.utils.tiled_scale(samples, decode_fn, tile_x * 2, tile_y // 2, overlap, upscale_amount = self.upscale_ratio, output_device=self.output_device, pbar = pbar) +
-             comfy.utils.tiled_scale(samples, decode_fn, tile_x, tile_y, overlap, upscale_amount = self.upscale_ratio, output_device=self.output_device, pbar = pbar))
+            (comfy.utils.tiled_scale(samples, decode_fn, tile_x // 2, tile_y * 2, overlap, upscale_amount = self.upscale_ratio, **options) +
+            comfy.utils.tiled_scale(samples, decode_fn, tile_x * 2, tile_y // 2, overlap, upscale_amount = self.upscale_ratio, **options) +
+             comfy.utils.tiled_scale(samples, decode_fn, tile_x, tile_y, overlap, upscale_amount = self.upscale_ratio, **options))
             / 3.0)
         return output
 
@@ -561,9 +580,12 @@ class VAE:
         pbar = comfy.utils.ProgressBar(steps)
 
         encode_fn = lambda a: self.first_stage_model.encode((self.process_input(a)).to(self.vae_dtype).to(self.device)).float()
-        samples = comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x, tile_y, overlap, upscale_amount = (1/self.downscale_ratio), out_channels=self.latent_channels, output_device=self.output_device, pbar=pbar)
-        samples += comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x * 2, tile_y // 2, overlap, upscale_amount = (1/self.downscale_ratio), out_channels=self.latent_channels, output_device=self.output_device, pbar=pbar)
-        samples += comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x // 2, tile_y * 2, overlap, upscale_amount = (1/self.downscale_ratio), out_channels=self.latent_channels, output_device=self.output_device, pbar=pbar)
+        out_size = (pixel_samples.shape[2] / self.downscale_ratio, pixel_samples.shape[3] / self.downscale_ratio)
+        tile_batch, accumulate_device = self.tile_batch_options(self.memory_used_encode((1, pixel_samples.shape[1], tile_y, tile_x), self.vae_dtype), self.latent_channels, out_size)
+        options = {"out_channels": self.latent_channels, "output_device": self.output_device, "pbar": pbar, "tile_batch": tile_batch, "accumulate_device": accumulate_device}
+        samples = comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x, tile_y, overlap, upscale_amount = (1/self.downscale_ratio), **options)
+        samples += comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x * 2, tile_y // 2, overlap, upscale_amount = (1/self.downscale_ratio), **options)
+        samples += comfy.utils.tiled_scale(pixel_samples, encode_fn, tile_x // 2, tile_y * 2, overlap, upscale_amount = (1/self.downscale_ratio), **options)
         samples /= 3.0
         return samples
 
@@ -897,9 +897,43 @@ def get_tiled_scale_steps(width, height, tile_x, tile_y, overlap):
     cols = 1 if width <= tile_x else math.ceil((width - overlap) / (tile_x - overlap))
     return rows * cols
 
+# Upper bound for the number of tiles passed to the tiled function at once
+MAX_TILE_BATCH = 16
+
+def tile_blend_mask(shape, feathers, device=None, dtype=None):
+    """
+    Weights used to blend overlapping tiles: 1 in the middle and ramping down
+    linearly over the feather width at every border of each dimension.
+    Returns a [1, 1, *shape] tensor that broadcasts over batch and channels.
+    """
+    mask = torch.ones([1, 1] + list(shape), device=device, dtype=dtype)
+    for d, (size, feather) in enumerate(zip(shape, feathers)):
+        if feather >= size:
+            continue
+        ramp = torch.ones(size, device=device, dtype=dtype)
+        a = torch.arange(1, feather + 1, device=device, dtype=dtype) / feather
+        ramp[:feather] *= a
+        ramp[size - feather:] *= a.flip(0)
+        view = [1] * mask.ndim
+        view[d + 2] = size
+        mask = mask * ramp.view(view)
+    return mask
+
 @torch.inference_mode()
-def tiled_scale_multidim(samples, function, tile=(64, 64), overlap=8, upscale_amount=4, out_channels=3, output_device="cpu", downscale=False, index_formulas=None, pbar=None):
+def tiled_scale_multidim(samples, function, tile=(64, 64), overlap=8, upscale_amount=4, out_channels=3, output_device="cpu", downscale=False, index_formulas=None, pbar=None, tile_batch=1, accumulate_device=None):
+    """
+    Run function over overlapping tiles of samples and blend the results.
+
+    Tiles of the same shape are passed to function up to tile_batch at a time
+    and, when the whole input fits in one tile, batch items are grouped the
+    same way; function must treat batch items independently. The blended
+    result is accumulated on accumulate_device (default output_device) and
+    moved to output_device once per batch item.
+    """
     dims = len(tile)
+    tile_batch = max(1, tile_batch)
+    if accumulate_device is None:
+        accumulate_device = output_device
 
     if not (isinstance(upscale_amount, (tuple, list))):
         upscale_amount = [upscale_amount] * dims
@@ -956,60 +990,74 @@ def tiled_scale_multidim(samples, function, tile=(64, 64), overlap=8, upscale_am
 
     output = torch.empty([samples.shape[0], out_channels] + mult_list_upscale(samples.shape[2:]), device=output_device)
 
+    # handle entire input fitting in a single tile
+    if all(samples.shape[d+2] <= tile[d] for d in range(dims)):
+        for b in range(0, samples.shape[0], tile_batch):
+            s = samples[b:b+tile_batch]
+            output[b:b+s.shape[0]] = function(s).to(output_device)
+            if pbar is not None:
+                pbar.update(s.shape[0])
+        return output
+
+    feathers = [round(get_scale(d, overlap[d])) for d in range(dims)]
+    positions = [range(0, samples.shape[d+2] - overlap[d], tile[d] - overlap[d]) if samples.shape[d+2] > tile[d] else [0] for d in range(dims)]
+
+    # Group the tiles by input shape so equally shaped ones can run as one batch
+    tile_groups = {}
+    for it in itertools.product(*positions):
+        starts = []
+        lengths = []
+        upscaled = []
+        for d in range(dims):
+            pos = max(0, min(samples.shape[d + 2] - overlap[d], it[d]))
+            starts.append(pos)
+            lengths.append(min(tile[d], samples.shape[d + 2] - pos))
+            upscaled.append(round(get_pos(d, pos)))
+        tile_groups.setdefault(tuple(lengths), []).append((starts, upscaled))
+
+    masks = {}
     for b in range(samples.shape[0]):
         s = samples[b:b+1]
 
-        # handle entire input fitting in a single tile
-        if all(s.shape[d+2] <= tile[d] for d in range(dims)):
-            output[b:b+1] = function(s).to(output_device)
-            if pbar is not None:
-                pbar.update(1)
-            continue
-
-        out = torch.zeros([s.shape[0], out_channels] + mult_list_upscale(s.shape[2:]), device=output_device)
-        out_div = torch.zeros([s.shape[0], out_channels] + mult_list_upscale(s.shape[2:]), device=output_device)
-
-        positions = [range(0, s.shape[d+2] - overlap[d], tile[d] - overlap[d]) if s.shape[d+2] > tile[d] else [0] for d in range(dims)]
-
-        for it in itertools.product(*positions):
-            s_in = s
-            upscaled = []
-
-            for d in range(dims):
-                pos = max(0, min(s.shape[d + 2] - overlap[d], it[d]))
-                l = min(tile[d], s.shape[d + 2] - pos)
-                s_in = s_in.narrow(d + 2, pos, l)
-                upscaled.append(round(get_pos(d, pos)))
-
-            ps = function(s_in).to(output_device)
-            mask = torch.ones_like(ps)
-
-            for d in range(2, dims + 2):
-                feather = round(get_scale(d - 2, overlap[d - 2]))
-                if feather >= mask.shape[d]:
-                    continue
-                for t in range(feather):
-                    a = (t + 1) / feather
-                    mask.narrow(d, t, 1).mul_(a)
-                    mask.narrow(d, mask.shape[d] - 1 - t, 1).mul_(a)
-
-            o = out
-            o_d = out_div
-            for d in range(dims):
-                o = o.narrow(d + 2, upscaled[d], mask.shape[d + 2])
-                o_d = o_d.narrow(d + 2, upscaled[d], mask.shape[d + 2])
-
-            o.add_(ps * mask)
-            o_d.add_(mask)
-
-            if pbar is not None:
-                pbar.update(1)
-
-        output[b:b+1] = out/out_div
+        out = torch.zeros([s.shape[0], out_channels] + mult_list_upscale(s.shape[2:]), device=accumulate_device)
+        # The blend weights are the same for every channel
+        out_div = torch.zeros([s.shape[0], 1] + mult_list_upscale(s.shape[2:]), device=accumulate_device)
+
+        for lengths, group in tile_groups.items():
+            for i in range(0, len(group), tile_batch):
+                chunk = group[i:i + tile_batch]
+                tiles = []
+                for starts, _ in chunk:
+                    s_in = s
+                    for d in range(dims):
+                        s_in = s_in.narrow(d + 2, starts[d], lengths[d])
+                    tiles.append(s_in)
+
+                ps = function(torch.cat(tiles) if len(tiles) > 1 else tiles[0]).to(accumulate_device)
+
+                mask_key = (tuple(ps.shape[2:]), ps.dtype)
+                if mask_key not in masks:
+                    masks[mask_key] = tile_blend_mask(ps.shape[2:], feathers, device=accumulate_device, dtype=ps.dtype)
+                mask = masks[mask_key]
+
+                for j, (_, upscaled) in enumerate(chunk):
+                    o = out
+                    o_d = out_div
+                    for d in range(dims):
+                        o = o.narrow(d + 2, upscaled[d], mask.shape[d + 2])
+                        o_d = o_d.narrow(d + 2, upscaled[d], mask.shape[d + 2])
+
+                    o.add_(ps[j:j+1] * mask)
+                    o_d.add_(mask)
+
+                if pbar is not None:
+                    pbar.update(len(chunk))
+
+        output[b:b+1] = (out / out_div).to(output_device)
     return output
 
-def tiled_scale(samples, function, tile_x=64, tile_y=64, overlap = 8, upscale_amount = 4, out_channels = 3, output_device="cpu", pbar = None):
-    return tiled_scale_multidim(samples, function, (tile_y, tile_x), overlap=overlap, upscale_amount=upscale_amount, out_channels=out_channels, output_device=output_device, pbar=pbar)
+def tiled_scale(samples, function, tile_x=64, tile_y=64, overlap = 8, upscale_amount = 4, out_channels = 3, output_device="cpu", pbar = None, tile_batch=1, accumulate_device=None):
+    return tiled_scale_multidim(samples, function, (tile_y, tile_x), overlap=overlap, upscale_amount=upscale_amount, out_channels=out_channels, output_device=output_device, pbar=pbar, tile_batch=tile_batch, accumulate_device=accumulate_device)
 
 PROGRESS_BAR_ENABLED = True
 def set_progress_bar_enabled(enabled):
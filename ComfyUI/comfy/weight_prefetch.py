@@ -0,0 +1,130 @@
+"""
+Layer-ahead prefetching of offloaded weights for low VRAM mode.
+"""
+from __future__ import annotations
+import torch
+
+
+class WeightPrefetcher:
+    """
+    Copies the weights of the next offloaded layers to the GPU while the current one runs.
+
+    Modules loaded in low VRAM mode get their weights cast to the GPU in
+    comfy.ops.cast_bias_weight right before they are used. The prefetcher
+    learns the order in which those modules are cast during a forward pass
+    and, whenever one of them is cast, issues non blocking copies of the
+    weights of the next `layers_ahead` modules on a side stream. The copies go
+    into a ring of layers_ahead + 1 reusable GPU slots: one for the module
+    being computed and one for every prefetch in flight. A slot is only
+    refilled after the compute stream has passed the module that last used it.
+
+    Offloaded weights are pinned in host memory the first time they are
+    prefetched so the copies are actually asynchronous.
+    """
+
+    def __init__(self, device, layers_ahead):
+        if device.index is None:
+            device = torch.device(device.type, torch.cuda.current_device())
+        self.device = device
+        self.layers_ahead = layers_ahead
+        # Created on the first prefetch
+        self.stream = None
+        # slot -> {param name: reusable GPU buffer}
+        self.slots = [{} for _ in range(layers_ahead + 1)]
+        # module -> (slot, event recorded when its copies are done), oldest first
+        self.inflight = {}
+        self.order = []
+        self.position = {}
+        self.recording = []
+        self.hits = 0
+        self.misses = 0
+
+    def _learn(self, module):
+        if len(self.recording) > 1 and module is self.recording[0]:
+            # One full pass was seen, use it to predict the next ones
+            self.order = self.recording
+            self.position = {}
+            for i, m in enumerate(self.order):
+                self.position.setdefault(m, i)
+            self.recording = []
+        self.recording.append(module)
+
+    def _free_slot(self, in_use):
+        used = {slot for slot, _ in self.inflight.values()}
+        used.add(in_use)
+        for slot in range(len(self.slots)):
+            if slot not in used:
+                return slot
+        # Drop the oldest prefetch that was not used, the prediction was wrong
+        module = next(iter(self.inflight))
+        return self.inflight.pop(module)[0]
+
+    def _prefetch(self, module, slot, compute_done):
+        buffers = self.slots[slot]
+        if self.stream is None:
+            self.stream = torch.cuda.Stream(device=self.device)
+        with torch.cuda.stream(self.stream):
+            # The slot may still be read by a module that was computed before this point
+            self.stream.wait_event(compute_done)
+            for name in ("weight", "bias"):
+                param = getattr(module, name, None)
+                if param is None:
+                    buffers.pop(name, None)
+                    continue
+                if param.device.type == "cpu" and not param.is_pinned():
+                    param.data = param.data.pin_memory()
+                buf = buffers.get(name)
+                if buf is None or buf.shape != param.shape or buf.dtype != param.dtype:
+                    buf = torch.empty_like(param, device=self.device)
+                    buffers[name] = buf
+                buf.copy_(param, non_blocking=True)
+            ready = torch.cuda.Event()
+            ready.record(self.stream)
+        self.inflight[module] = (slot, ready)
+
+    def fetch(self, module):
+        """
+        Return {param name: GPU tensor} with the raw weights of module if they were
+        prefetched, or None, and start prefetching the modules expected next.
+        """
+        current = torch.cuda.current_stream(self.device)
+        compute_done = torch.cuda.Event()
+        compute_done.record(current)
+
+        self._learn(module)
+        result = None
+        in_use = -1
+        entry = self.inflight.pop(module, None)
+        if entry is not None:
+            in_use, ready = entry
+            current.wait_event(ready)
+            result = {}
+            for name, buf in self.slots[in_use].items():
+                buf.record_stream(current)
+                result[name] = buf
+            self.hits += 1
+        else:
+            self.misses += 1
+
+        index = self.position.get(module)
+        if index is not None:
+            for i in range(1, self.layers_ahead + 1):
+                upcoming = self.order[(index + i) % len(self.order)]
+                if upcoming is module or upcoming in self.inflight:
+                    continue
+                self._prefetch(upcoming, self._free_slot(in_use), compute_done)
+        return result
+
+    def reset(self):
+        self.inflight.clear()
+        self.order = []
+        self.position = {}
+        self.recording = []
+
+    def release(self):
+        """Forget the learnt order and free the GPU buffers of all slots."""
+        if self.stream is not None:
+            # Copies still in flight write into the slots
+            self.stream.synchronize()
+        self.reset()
+        self.slots = [{} for _ in range(self.layers_ahead + 1)]
@@ -1,8 +1,9 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 import io
 import av
+import torch
 from comfy_api.util import VideoContainer, VideoCodec, VideoComponents
 
 class VideoInput(ABC):
@@ -33,6 +34,34 @@ class VideoInput(ABC):
         """
         pass
 
+    def iter_frames(
+        self,
+        start_frame: int = 0,
+        frame_count: Optional[int] = None,
+        stride: int = 1,
+        dtype: torch.dtype = torch.float32,
+    ) -> Iterator[torch.Tensor]:
+        """
+        Iterate over (H, W, 3) frames, so a node can process a clip without
+        holding all of its frames in memory.
+
+        Args:
+            start_frame: Index of the first frame.
+            frame_count: Maximum number of frames, or None for all of them.
+            stride: Yield every stride-th frame from start_frame on.
+            dtype: torch.uint8 yields 0-255 values, floating types are scaled to 0-1.
+
+        Default implementation slices get_components, subclasses that can decode
+        frames one at a time should override it.
+        """
+        images = self.get_components().images
+        end_frame = None if frame_count is None else start_frame + frame_count * stride
+        for image in images[start_frame:end_frame:stride]:
+            if dtype == torch.uint8:
+                yield (image * 255).clamp(0, 255).byte()
+            else:
+                yield image.to(dtype)
+
     def get_stream_source(self) -> Union[str, io.BytesIO]:
         """
         Get a streamable source for the video. This allows processing without
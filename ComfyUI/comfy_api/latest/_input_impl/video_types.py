@@ -1,15 +1,18 @@
 from __future__ import annotations
 from av.container import InputContainer
+from concurrent.futures import ThreadPoolExecutor
 from av.subtitles.stream import SubtitleStream
 from fractions import Fraction
-from typing import Optional
+from typing import Iterator, Optional
 from comfy_api.latest._input import AudioInput, VideoInput
 import av
+import collections
 import io
 import json
 import numpy as np
 import math
 import torch
+from comfy.cli_args import args
 from comfy_api.latest._util import VideoContainer, VideoCodec, VideoComponents
 
 
@@ -52,6 +55,103 @@ def get_open_write_kwargs(
     return open_kwargs
 
 
+def check_frame_selection(start_frame: int, frame_count: Optional[int], stride: int):
+    if start_frame < 0:
+        raise ValueError(f"start_frame must be >= 0, got {start_frame}")
+    if frame_count is not None and frame_count < 0:
+        raise ValueError(f"frame_count must be >= 0, got {frame_count}")
+    if stride < 1:
+        raise ValueError(f"stride must be >= 1, got {stride}")
+
+
+def frame_to_tensor(img: np.ndarray, dtype: torch.dtype = torch.float32, out: Optional[torch.Tensor] = None) -> torch.Tensor:
+    """Convert a decoded rgb24 frame to a tensor, scaled to 0-1 unless dtype is torch.uint8."""
+    frame = torch.from_numpy(img)
+    if dtype == torch.uint8:
+        return frame if out is None else out.copy_(frame)
+    if out is None:
+        return (frame / 255.0).to(dtype)
+    return torch.div(frame, 255.0, out=out)
+
+
+def estimate_frame_count(container: InputContainer, video_stream: av.VideoStream) -> int:
+    """Number of frames of a video stream as reported by the container, or estimated from its duration."""
+    if video_stream.frames:
+        return video_stream.frames
+    if video_stream.average_rate:
+        if video_stream.duration is not None and video_stream.time_base is not None:
+            return math.ceil(video_stream.duration * video_stream.time_base * video_stream.average_rate)
+        if container.duration is not None:
+            return math.ceil(container.duration / av.time_base * video_stream.average_rate)
+    return 0
+
+
+class FrameBuffer:
+    """
+    Collects decoded frames into a preallocated (frames, H, W, 3) tensor instead
+    of stacking separate frame tensors, which would hold the clip twice. Grows in
+    chunks if the container reported fewer frames than it contains.
+    """
+
+    def __init__(self, capacity: int, dtype: torch.dtype):
+        self.capacity = capacity
+        self.dtype = dtype
+        self.chunks: list[torch.Tensor] = []
+        self.buffer: Optional[torch.Tensor] = None
+        self.count = 0
+
+    def append(self, img: np.ndarray):
+        if self.buffer is None or self.count == self.buffer.shape[0]:
+            if self.buffer is None:
+                size = self.capacity
+            else:
+                self.chunks.append(self.buffer)
+                size = sum(c.shape[0] for c in self.chunks) // 4
+            self.buffer = torch.empty((max(size, 16),) + img.shape, dtype=self.dtype)
+            self.count = 0
+        frame_to_tensor(img, self.dtype, out=self.buffer[self.count])
+        self.count += 1
+
+    def result(self) -> Optional[torch.Tensor]:
+        if self.buffer is None:
+            return None
+        last = self.buffer[:self.count]
+        if self.count < self.buffer.shape[0] * 0.9:
+            # Don't keep a mostly unused allocation alive
+            last = last.clone()
+        if len(self.chunks) == 0:
+            return last
+        return torch.cat(self.chunks + [last])
+
+
+# Frames converted to uint8 at once, and converted to YUV ahead of the encoder
+ENCODE_CHUNK_FRAMES = 16
+ENCODE_CONVERT_WORKERS = 2
+
+
+def _to_yuv420p(chunk: np.ndarray) -> list[av.VideoFrame]:
+    return [av.VideoFrame.from_ndarray(img, format='rgb24').reformat(format='yuv420p') for img in chunk]
+
+
+def iter_yuv_frames(images: torch.Tensor, chunk_frames: int = ENCODE_CHUNK_FRAMES) -> Iterator[av.VideoFrame]:
+    """
+    Yield IMAGE frames as yuv420p VideoFrames for the H.264 encoder.
+
+    The 0-1 float frames are converted to uint8 a chunk at a time, on the device
+    they are on, and the colour conversion of the next chunks runs on worker
+    threads (swscale releases the GIL) while the caller encodes the current one.
+    """
+    pending = collections.deque()
+    with ThreadPoolExecutor(max_workers=ENCODE_CONVERT_WORKERS, thread_name_prefix="video-convert") as pool:
+        for start in range(0, images.shape[0], chunk_frames):
+            chunk = (images[start:start + chunk_frames] * 255).clamp(0, 255).byte().cpu().numpy()  # shape: (N, H, W, 3)
+            pending.append(pool.submit(_to_yuv420p, chunk))
+            if len(pending) > ENCODE_CONVERT_WORKERS:
+                yield from pending.popleft().result()
+        while len(pending) > 0:
+            yield from pending.popleft().result()
+
+
 class VideoFromFile(VideoInput):
     """
     Class representing video input from a file.
@@ -133,53 +233,113 @@ class VideoFromFile(VideoInput):
         with av.open(self.__file, mode='r') as container:
             return container.format.name
 
-    def get_components_internal(self, container: InputContainer) -> VideoComponents:
-        # Get video frames
-        frames = []
-        for frame in container.decode(video=0):
-            img = frame.to_ndarray(format='rgb24')  # shape: (H, W, 3)
-            img = torch.from_numpy(img) / 255.0  # shape: (H, W, 3)
-            frames.append(img)
-
-        images = torch.stack(frames) if len(frames) > 0 else torch.zeros(0, 3, 0, 0)
-
-        # Get frame rate
-        video_stream = next(s for s in container.streams if s.type == 'video')
-        frame_rate = Fraction(video_stream.average_rate) if video_stream and video_stream.average_rate else Fraction(1)
+    def get_components_internal(
+        self,
+        container: InputContainer,
+        start_frame: int = 0,
+        frame_count: Optional[int] = None,
+        stride: int = 1,
+        dtype: torch.dtype = torch.float32,
+    ) -> VideoComponents:
+        check_frame_selection(start_frame, frame_count, stride)
+        video_stream = next((s for s in container.streams if s.type == 'video'), None)
+        if video_stream is None:
+            raise ValueError(f"No video stream found in file '{self.__file}'")
+        audio_stream = next((s for s in container.streams if s.type == 'audio'), None)
+        frame_rate = Fraction(video_stream.average_rate) if video_stream.average_rate else Fraction(1)
+
+        # Exclusive bound on the index of the decoded frames
+        end_frame = None if frame_count is None else start_frame + frame_count * stride
+        selection = len(range(start_frame, end_frame if end_frame is not None else estimate_frame_count(container, video_stream), stride))
+        frames = FrameBuffer(selection, dtype)
+        audio_frames = []
+        audio_end = 0.0
+        index = 0
+        video_done = False
+
+        # Video and audio are decoded in a single pass over the file
+        for packet in container.demux(*[s for s in (video_stream, audio_stream) if s is not None]):
+            if packet.stream.type == 'video':
+                if video_done:
+                    continue
+                for frame in packet.decode():
+                    if end_frame is not None and index >= end_frame:
+                        video_done = True
+                        break
+                    if index >= start_frame and (index - start_frame) % stride == 0:
+                        frames.append(frame.to_ndarray(format='rgb24'))  # shape: (H, W, 3)
+                    index += 1
+            else:
+                for frame in packet.decode():
+                    assert isinstance(frame, av.AudioFrame)
+                    audio_frames.append(frame.to_ndarray())  # shape: (channels, samples)
+                    if frame.time is not None:
+                        audio_end = max(audio_end, frame.time + frame.samples / (frame.sample_rate or 1))
+            if video_done and (audio_stream is None or audio_end * frame_rate >= end_frame):
+                break
+
+        images = frames.result()
+        if images is None:
+            images = torch.zeros(0, 3, 0, 0)
 
-        # Get audio if available
         audio = None
-        try:
-            container.seek(0)  # Reset the container to the beginning
-            for stream in container.streams:
-                if stream.type != 'audio':
-                    continue
-                assert isinstance(stream, av.AudioStream)
-                audio_frames = []
-                for packet in container.demux(stream):
-                    for frame in packet.decode():
-                        assert isinstance(frame, av.AudioFrame)
-                        audio_frames.append(frame.to_ndarray())  # shape: (channels, samples)
-                if len(audio_frames) > 0:
-                    audio_data = np.concatenate(audio_frames, axis=1)  # shape: (channels, total_samples)
-                    audio_tensor = torch.from_numpy(audio_data).unsqueeze(0)  # shape: (1, channels, total_samples)
-                    audio = AudioInput({
-                        "waveform": audio_tensor,
-                        "sample_rate": int(stream.sample_rate) if stream.sample_rate else 1,
-                    })
-        except StopIteration:
-            pass  # No audio stream
+        if len(audio_frames) > 0:
+            sample_rate = int(audio_stream.sample_rate) if audio_stream.sample_rate else 1
+            audio_data = np.concatenate(audio_frames, axis=1)  # shape: (channels, total_samples)
+            if start_frame != 0 or frame_count is not None:
+                # Keep the audio of the span of the selected frames
+                last_frame = start_frame + (images.shape[0] - 1) * stride + 1
+                audio_data = audio_data[:, round(start_frame / frame_rate * sample_rate):round(last_frame / frame_rate * sample_rate)]
+            audio_tensor = torch.from_numpy(audio_data).unsqueeze(0)  # shape: (1, channels, total_samples)
+            audio = AudioInput({
+                "waveform": audio_tensor,
+                "sample_rate": sample_rate,
+            })
 
         metadata = container.metadata
         return VideoComponents(images=images, audio=audio, frame_rate=frame_rate, metadata=metadata)
 
-    def get_components(self) -> VideoComponents:
+    def get_components(
+        self,
+        start_frame: int = 0,
+        frame_count: Optional[int] = None,
+        stride: int = 1,
+        dtype: torch.dtype = torch.float32,
+    ) -> VideoComponents:
+        """
+        Decode the video into a single preallocated (frames, H, W, 3) tensor.
+
+        Args:
+            start_frame: Index of the first frame to keep.
+            frame_count: Maximum number of frames to keep, or None for all of them.
+            stride: Keep every stride-th frame from start_frame on.
+            dtype: torch.uint8 keeps the 0-255 values, floating types are scaled to 0-1.
+        """
         if isinstance(self.__file, io.BytesIO):
             self.__file.seek(0)  # Reset the BytesIO object to the beginning
         with av.open(self.__file, mode='r') as container:
-            return self.get_components_internal(container)
+            return self.get_components_internal(container, start_frame, frame_count, stride, dtype)
         raise ValueError(f"No video stream found in file '{self.__file}'")
 
+    def iter_frames(
+        self,
+        start_frame: int = 0,
+        frame_count: Optional[int] = None,
+        stride: int = 1,
+        dtype: torch.dtype = torch.float32,
+    ) -> Iterator[torch.Tensor]:
+        check_frame_selection(start_frame, frame_count, stride)
+        if isinstance(self.__file, io.BytesIO):
+            self.__file.seek(0)
+        with av.open(self.__file, mode='r') as container:
+            emitted = 0
+            for index, frame in enumerate(container.decode(video=0)):
+                if frame_count is not None and emitted >= frame_count:
+                    break
+                if index >= start_frame and (index - start_frame) % stride == 0:
+                    yield frame_to_tensor(frame.to_ndarray(format='rgb24'), dtype)
+                    emitted += 1
+
     def save_to(
         self,
         path: str | io.BytesIO,
@@ -258,12 +418,24 @@ class VideoFromComponents(VideoInput):
         path: str,
         format: VideoContainer = VideoContainer.AUTO,
         codec: VideoCodec = VideoCodec.AUTO,
-        metadata: Optional[dict] = None
+        metadata: Optional[dict] = None,
+        threads: Optional[int] = None,
+        preset: Optional[str] = None,
+        crf: Optional[float] = None,
     ):
+        """
+        Encode the components as H.264 with AAC audio.
+
+        threads, preset and crf configure x264 and default to --video-encode-threads,
+        --video-encode-preset and --video-encode-crf.
+        """
         if format != VideoContainer.AUTO and format != VideoContainer.MP4:
             raise ValueError("Only MP4 format is supported for now")
         if codec != VideoCodec.AUTO and codec != VideoCodec.H264:
             raise ValueError("Only H264 codec is supported for now")
+        threads = args.video_encode_threads if threads is None else threads
+        preset = args.video_encode_preset if preset is None else preset
+        crf = args.video_encode_crf if crf is None else crf
         with av.open(path, mode='w', options={'movflags': 'use_metadata_tags'}) as output:
             # Add metadata before writing any streams
             if metadata is not None:
@@ -276,6 +448,14 @@ class VideoFromComponents(VideoInput):
             video_stream.width = self.__components.images.shape[2]
             video_stream.height = self.__components.images.shape[1]
             video_stream.pix_fmt = 'yuv420p'
+            video_stream.thread_type = 'AUTO'
+            video_stream.thread_count = threads
+            options = {}
+            if preset is not None:
+                options['preset'] = preset
+            if crf is not None:
+                options['crf'] = str(crf)
+            video_stream.options = options
 
             # Create an audio stream
             audio_sample_rate = 1
@@ -285,12 +465,8 @@ class VideoFromComponents(VideoInput):
                 audio_stream = output.add_stream('aac', rate=audio_sample_rate)
 
             # Encode video
-            for i, frame in enumerate(self.__components.images):
-                img = (frame * 255).clamp(0, 255).byte().cpu().numpy() # shape: (H, W, 3)
-                frame = av.VideoFrame.from_ndarray(img, format='rgb24')
-                frame = frame.reformat(format='yuv420p')  # Convert to YUV420P as required by h264
-                packet = video_stream.encode(frame)
-                output.mux(packet)
+            for frame in iter_yuv_frames(self.__components.images):
+                output.mux(video_stream.encode(frame))
 
             # Flush video
             packet = video_stream.encode(None)
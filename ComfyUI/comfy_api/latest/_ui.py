@@ -18,6 +18,7 @@ from PIL import Image as PILImage
 from PIL.PngImagePlugin import PngInfo
 
 import folder_paths
+import node_helpers
 
 # used for image preview
 from comfy.cli_args import args
@@ -140,17 +141,18 @@ class ImageSaveHelper:
     ) -> list[SavedResult]:
         """Saves a batch of images as individual PNG files."""
         full_output_folder, filename, counter, subfolder, _ = folder_paths.get_save_image_path(
-            filename_prefix, _get_directory_by_folder_type(folder_type), images[0].shape[1], images[0].shape[0]
+            filename_prefix, _get_directory_by_folder_type(folder_type), images[0].shape[1], images[0].shape[0], count=len(images)
         )
         results = []
+        paths = []
         metadata = ImageSaveHelper._create_png_metadata(cls)
-        for batch_number, image_tensor in enumerate(images):
-            img = ImageSaveHelper._convert_tensor_to_pil(image_tensor)
+        for batch_number in range(len(images)):
             filename_with_batch_num = filename.replace("%batch_num%", str(batch_number))
             file = f"{filename_with_batch_num}_{counter:05}_.png"
-            img.save(os.path.join(full_output_folder, file), pnginfo=metadata, compress_level=compress_level)
+            paths.append(os.path.join(full_output_folder, file))
             results.append(SavedResult(file, subfolder, folder_type))
             counter += 1
+        node_helpers.save_png_batch(images, paths, pnginfo=metadata, compress_level=compress_level)
         return results
 
     @staticmethod
@@ -271,7 +273,7 @@ class AudioSaveHelper:
         quality: str = "128k",
     ) -> list[SavedResult]:
         full_output_folder, filename, counter, subfolder, _ = folder_paths.get_save_image_path(
-            filename_prefix, _get_directory_by_folder_type(folder_type)
+            filename_prefix, _get_directory_by_folder_type(folder_type), count=len(audio["waveform"])
         )
 
         metadata = {}
@@ -0,0 +1,321 @@
+"""
+Cross-prompt micro-batching of sampler calls.
+
+Queued prompts that run the same model with the same sampling settings and
+latent size, and only differ in seed or conditioning, can share one batched
+denoising pass. The worker builds a small "sampling" prompt from the
+members' KSampler ancestors, runs it once through the executor, and then
+executes every member prompt normally with its KSampler output already in
+the outputs cache, so history, websocket events and saved files stay
+per prompt.
+
+Only deterministic samplers are fused: the noise for each member is built
+from its own seed exactly like an unbatched run, so each prompt gets the
+same result it would have gotten on its own (up to float rounding of the
+batched matmuls).
+"""
+import json
+import logging
+import math
+
+import torch
+
+from comfy_execution.graph_utils import is_link
+
+SAMPLER_CLASS = "KSampler"
+LATENT_CLASS = "EmptyLatentImage"
+
+# Inputs of the sampler that may differ between the members of a batch
+PER_MEMBER_INPUTS = ("seed", "positive", "negative", "latent_image")
+
+# Ancestral and SDE samplers draw fresh noise from a generator shared by the
+# whole batch, so their result depends on the batch position.
+DETERMINISTIC_SAMPLERS = frozenset([
+    "euler", "euler_cfg_pp", "heun", "heunpp2", "dpm_2", "lms", "dpm_fast",
+    "dpmpp_2m", "dpmpp_2m_cfg_pp", "ipndm", "ipndm_v", "deis", "res_multistep",
+    "res_multistep_cfg_pp", "gradient_estimation", "ddim", "uni_pc", "uni_pc_bh2",
+])
+
+# Conditioning tensors other than the cross attention that have a batch dimension
+BATCHED_COND_KEYS = ("pooled_output",)
+
+# Don't pad prompts of very different token lengths to a common length
+MAX_TOKEN_REPEAT = 4
+
+MAX_BATCH = 16
+
+SAMPLER_NODE_ID = "batch_sampler"
+
+def split_node_id(index):
+    return "batch_split{}".format(index)
+
+def member_node_id(index, node_id):
+    return "batch{}_{}".format(index, node_id)
+
+def find_sampler(prompt):
+    samplers = [node_id for node_id, node in prompt.items() if node.get("class_type") == SAMPLER_CLASS]
+    if len(samplers) != 1:
+        return None
+    return samplers[0]
+
+def _canonical_input(prompt, value, seen):
+    if not is_link(value):
+        return value
+    node_id, socket = value
+    if node_id in seen:
+        raise ValueError("cycle")
+    node = prompt.get(node_id)
+    if node is None:
+        raise ValueError("missing node")
+    seen = seen | {node_id}
+    inputs = {k: _canonical_input(prompt, v, seen) for k, v in node.get("inputs", {}).items()}
+    return {"class_type": node["class_type"], "inputs": inputs, "socket": socket}
+
+def batch_key(prompt):
+    """
+    Key under which queued prompts can be batched together, or None.
+
+    Two prompts with the same key have one KSampler fed by the same model
+    subgraph, the same sampling settings and an EmptyLatentImage of the same
+    size; they may only differ in seed and conditioning.
+    """
+    sampler_id = find_sampler(prompt)
+    if sampler_id is None:
+        return None
+    inputs = prompt[sampler_id].get("inputs", {})
+    if inputs.get("sampler_name") not in DETERMINISTIC_SAMPLERS:
+        return None
+    latent = inputs.get("latent_image")
+    if not is_link(latent):
+        return None
+    latent_node = prompt.get(latent[0])
+    if latent_node is None or latent_node.get("class_type") != LATENT_CLASS:
+        return None
+    if any(is_link(v) for v in latent_node.get("inputs", {}).values()):
+        return None
+
+    if any(name not in inputs for name in PER_MEMBER_INPUTS):
+        return None
+
+    try:
+        shared = {k: _canonical_input(prompt, v, frozenset()) for k, v in inputs.items() if k not in PER_MEMBER_INPUTS}
+        return json.dumps([shared, latent_node["inputs"]], sort_keys=True)
+    except (ValueError, TypeError):
+        return None
+
+def get_ancestors(prompt, node_id):
+    ancestors = set()
+    stack = [node_id]
+    while stack:
+        for value in prompt[stack.pop()].get("inputs", {}).values():
+            if is_link(value) and value[0] not in ancestors and value[0] in prompt:
+                ancestors.add(value[0])
+                stack.append(value[0])
+    return ancestors
+
+def _rename_links(inputs, index):
+    return {k: [member_node_id(index, v[0]), v[1]] if is_link(v) else v for k, v in inputs.items()}
+
+def build_sampling_prompt(prompts):
+    """
+    Merge the sampler ancestors of each prompt into one prompt that samples
+    them as a single batch and splits the result again.
+
+    Returns the merged prompt and the ids of the split nodes, one per member.
+    """
+    merged = {}
+    sampler_inputs = None
+    for index, prompt in enumerate(prompts):
+        sampler_id = find_sampler(prompt)
+        for node_id in get_ancestors(prompt, sampler_id):
+            node = prompt[node_id]
+            merged[member_node_id(index, node_id)] = {"class_type": node["class_type"], "inputs": _rename_links(node["inputs"], index)}
+
+        inputs = _rename_links(prompt[sampler_id]["inputs"], index)
+        if sampler_inputs is None:
+            sampler_inputs = {k: v for k, v in inputs.items() if k not in PER_MEMBER_INPUTS}
+        for name in PER_MEMBER_INPUTS:
+            sampler_inputs["{}_{}".format(name, index)] = inputs[name]
+
+    merged[SAMPLER_NODE_ID] = {"class_type": "MicroBatchKSampler", "inputs": sampler_inputs}
+    split_ids = []
+    for index in range(len(prompts)):
+        split_ids.append(split_node_id(index))
+        merged[split_ids[-1]] = {"class_type": "MicroBatchSplit", "inputs": {"samples": [SAMPLER_NODE_ID, 0], "index": index}}
+    return merged, split_ids
+
+def _values_equal(values):
+    first = values[0]
+    try:
+        return all(v is first or bool(v == first) for v in values[1:])
+    except Exception:
+        # Tensors and other objects without a plain truth value
+        return False
+
+def batch_conditioning(conds, sizes):
+    """
+    Concatenate one conditioning per member into a single batched conditioning.
+
+    Every member must have a single conditioning entry whose extra options
+    match the others, apart from the ones in BATCHED_COND_KEYS. Returns None
+    when the conditionings can't be batched (areas, masks, control nets...).
+    """
+    import comfy.utils
+
+    if any(len(c) != 1 for c in conds):
+        return None
+    tensors = [c[0][0] for c in conds]
+    extras = [c[0][1] for c in conds]
+    if any(t.ndim != 3 or t.shape[2] != tensors[0].shape[2] for t in tensors):
+        return None
+    if any(e.keys() != extras[0].keys() for e in extras):
+        return None
+
+    # Repeating the tokens doesn't change the attention result, same as CONDCrossAttn.concat
+    lengths = [t.shape[1] for t in tensors]
+    length = math.lcm(*lengths)
+    if length // min(lengths) > MAX_TOKEN_REPEAT:
+        return None
+    cross_attn = torch.cat([comfy.utils.repeat_to_batch_size(t.repeat(1, length // t.shape[1], 1), n) for t, n in zip(tensors, sizes)])
+
+    options = {}
+    for key in extras[0]:
+        values = [e[key] for e in extras]
+        if key in BATCHED_COND_KEYS and all(isinstance(v, torch.Tensor) for v in values):
+            if any(v.shape[1:] != values[0].shape[1:] for v in values):
+                return None
+            options[key] = torch.cat([comfy.utils.repeat_to_batch_size(v, n) for v, n in zip(values, sizes)])
+        elif _values_equal(values):
+            options[key] = values[0]
+        else:
+            return None
+    return [[cross_attn, options]]
+
+class MicroBatchKSampler:
+    """Internal node: sample the latents of several prompts in one batch."""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        import comfy.samplers
+        optional = {}
+        for index in range(MAX_BATCH):
+            optional["seed_{}".format(index)] = ("INT", {"default": 0, "min": 0, "max": 0xffffffffffffffff})
+            optional["positive_{}".format(index)] = ("CONDITIONING",)
+            optional["negative_{}".format(index)] = ("CONDITIONING",)
+            optional["latent_image_{}".format(index)] = ("LATENT",)
+        return {
+            "required": {
+                "model": ("MODEL",),
+                "steps": ("INT", {"default": 20, "min": 1, "max": 10000}),
+                "cfg": ("FLOAT", {"default": 8.0, "min": 0.0, "max": 100.0}),
+                "sampler_name": (comfy.samplers.KSampler.SAMPLERS,),
+                "scheduler": (comfy.samplers.KSampler.SCHEDULERS,),
+                "denoise": ("FLOAT", {"default": 1.0, "min": 0.0, "max": 1.0}),
+            },
+            "optional": optional,
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "sample"
+    CATEGORY = "_for_testing"
+
+    def sample(self, model, steps, cfg, sampler_name, scheduler, denoise, **kwargs):
+        import comfy.sample
+        import comfy.utils
+        import latent_preview
+        import nodes
+
+        members = []
+        while "latent_image_{}".format(len(members)) in kwargs:
+            index = len(members)
+            members.append((kwargs["seed_{}".format(index)], kwargs["positive_{}".format(index)],
+                            kwargs["negative_{}".format(index)], kwargs["latent_image_{}".format(index)]))
+
+        latents = [comfy.sample.fix_empty_latent_channels(model, m[3]["samples"]) for m in members]
+        sizes = [latent.shape[0] for latent in latents]
+        positive = batch_conditioning([m[1] for m in members], sizes)
+        negative = batch_conditioning([m[2] for m in members], sizes)
+        batchable = positive is not None and negative is not None
+        batchable = batchable and all(latent.shape[1:] == latents[0].shape[1:] for latent in latents)
+        batchable = batchable and not any("noise_mask" in m[3] for m in members)
+
+        if batchable:
+            noise = torch.cat([comfy.sample.prepare_noise(latent, m[0], m[3].get("batch_index")) for latent, m in zip(latents, members)])
+            callback = latent_preview.prepare_callback(model, steps)
+            disable_pbar = not comfy.utils.PROGRESS_BAR_ENABLED
+            samples = comfy.sample.sample(model, noise, steps, cfg, sampler_name, scheduler, positive, negative, torch.cat(latents),
+                                          denoise=denoise, callback=callback, disable_pbar=disable_pbar, seed=members[0][0])
+        else:
+            logging.info("Prompt batch has conditioning that can't be batched, sampling it one prompt at a time.")
+            samples = torch.cat([nodes.common_ksampler(model, m[0], steps, cfg, sampler_name, scheduler, m[1], m[2], m[3], denoise=denoise)[0]["samples"]
+                                 for m in members])
+        return ({"samples": samples, "batch_sizes": sizes},)
+
+class MicroBatchSplit:
+    """Internal node: take one member's latents out of a MicroBatchKSampler result."""
+
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "samples": ("LATENT",),
+                "index": ("INT", {"default": 0, "min": 0, "max": MAX_BATCH - 1}),
+            }
+        }
+
+    RETURN_TYPES = ("LATENT",)
+    FUNCTION = "split"
+    CATEGORY = "_for_testing"
+
+    def split(self, samples, index):
+        sizes = samples["batch_sizes"]
+        start = sum(sizes[:index])
+        return ({"samples": samples["samples"][start:start + sizes[index]]},)
+
+# Registered as internal nodes, only the prompts built by build_sampling_prompt use them
+INTERNAL_NODE_CLASS_MAPPINGS = {
+    "MicroBatchKSampler": MicroBatchKSampler,
+    "MicroBatchSplit": MicroBatchSplit,
+}
+
+class PromptBatcher:
+    """
+    Picks queued prompts that can share a sampler call with the one about to
+    run and samples them together.
+    """
+
+    def __init__(self, max_batch):
+        import nodes
+        self.max_batch = min(max_batch, MAX_BATCH)
+        self.batches = 0
+        self.batched_prompts = 0
+        nodes.INTERNAL_NODE_CLASS_MAPPINGS.update(INTERNAL_NODE_CLASS_MAPPINGS)
+
+    def take_compatible(self, queue, item):
+        """Remove the queued prompts that can be batched with item from the queue."""
+        key = batch_key(item[2])
+        if key is None:
+            return []
+        return queue.get_matching(lambda other: batch_key(other[2]) == key, self.max_batch - 1)
+
+    def sample(self, executor, items):
+        """
+        Run the sampling of all items as one batch.
+
+        Returns {prompt_id: {sampler_node_id: output}} for the members, or an
+        empty dict if the batched run failed and every prompt has to sample on
+        its own.
+        """
+        prompts = [item[2] for item in items]
+        merged, split_ids = build_sampling_prompt(prompts)
+        batch_id = "batch-{}".format(items[0][1])
+        executor.execute(merged, batch_id, {}, split_ids)
+        outputs = [executor.caches.outputs.get(split_id) for split_id in split_ids]
+        if not executor.success or any(output is None for output in outputs):
+            logging.warning("Batched sampling of {} prompts failed, running them one at a time.".format(len(items)))
+            return {}
+
+        self.batches += 1
+        self.batched_prompts += len(items)
+        logging.info("Sampled {} prompts in one batch.".format(len(items)))
+        return {item[1]: {find_sampler(item[2]): output} for item, output in zip(items, outputs)}
@@ -1,4 +1,7 @@
+import hashlib
 import itertools
+import weakref
+import torch
 from typing import Sequence, Mapping, Dict
 from comfy_execution.graph import DynamicPrompt
 from abc import ABC, abstractmethod
@@ -6,6 +9,7 @@ from abc import ABC, abstractmethod
 import nodes
 
 from comfy_execution.graph_utils import is_link
+from comfy_execution.disk_cache import referenced_files
 
 NODE_CLASS_CONTAINS_UNIQUE_ID: Dict[str, bool] = {}
 
@@ -13,7 +17,7 @@ NODE_CLASS_CONTAINS_UNIQUE_ID: Dict[str, bool] = {}
 def include_unique_id_in_input(class_type: str) -> bool:
     if class_type in NODE_CLASS_CONTAINS_UNIQUE_ID:
         return NODE_CLASS_CONTAINS_UNIQUE_ID[class_type]
-    class_def = nodes.NODE_CLASS_MAPPINGS[class_type]
+    class_def = nodes.get_node_class(class_type)
     NODE_CLASS_CONTAINS_UNIQUE_ID[class_type] = "UNIQUE_ID" in class_def.INPUT_TYPES().get("hidden", {}).values()
     return NODE_CLASS_CONTAINS_UNIQUE_ID[class_type]
 
@@ -73,6 +77,36 @@ class CacheKeySetID(CacheKeySet):
             self.keys[node_id] = (node_id, node["class_type"])
             self.subcache_keys[node_id] = (node_id, node["class_type"])
 
+class _UnhashableValue(Exception):
+    pass
+
+def _canonical(obj):
+    # Type-tagged nested tuples whose repr() is a stable serialization
+    if isinstance(obj, float) and obj != obj:
+        # NaN never compares equal, so it must never produce a cache hit
+        raise _UnhashableValue()
+    if isinstance(obj, (int, float, str, bool, bytes, type(None))):
+        return obj
+    # Check the concrete types first; ABC checks are slow on this hot path
+    elif isinstance(obj, dict) or isinstance(obj, Mapping):
+        return ("m", tuple((_canonical(k), _canonical(v)) for k, v in sorted(obj.items())))
+    elif isinstance(obj, (list, tuple)) or isinstance(obj, Sequence):
+        return ("s", tuple([_canonical(i) for i in obj]))
+    else:
+        raise _UnhashableValue()
+
+def to_digest(obj):
+    """Return a 16-byte digest of a JSON-like value, or an Unhashable if it can't be hashed."""
+    try:
+        encoded = repr(_canonical(obj)).encode("utf-8")
+    except _UnhashableValue:
+        return Unhashable()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+# Node digests per DynamicPrompt, shared by every cache and subcache that
+# sets up keys for the same prompt execution.
+_SIGNATURE_MEMO = weakref.WeakKeyDictionary()
+
 class CacheKeySetInputSignature(CacheKeySet):
     def __init__(self, dynprompt, node_ids, is_changed_cache):
         super().__init__(dynprompt, node_ids, is_changed_cache)
@@ -92,21 +126,45 @@ class CacheKeySetInputSignature(CacheKeySet):
             self.keys[node_id] = await self.get_node_signature(self.dynprompt, node_id)
             self.subcache_keys[node_id] = (node_id, node["class_type"])
 
+    def get_signature_memo(self, dynprompt):
+        memo = _SIGNATURE_MEMO.get(dynprompt)
+        if memo is None or memo[0] is not self.is_changed_cache:
+            memo = (self.is_changed_cache, {})
+            _SIGNATURE_MEMO[dynprompt] = memo
+        return memo[1].setdefault((type(self), self.include_node_id_in_input()), {})
+
     async def get_node_signature(self, dynprompt, node_id):
-        signature = []
-        ancestors, order_mapping = self.get_ordered_ancestry(dynprompt, node_id)
-        signature.append(await self.get_immediate_node_signature(dynprompt, node_id, order_mapping))
-        for ancestor_id in ancestors:
-            signature.append(await self.get_immediate_node_signature(dynprompt, ancestor_id, order_mapping))
-        return to_hashable(signature)
-
-    async def get_immediate_node_signature(self, dynprompt, node_id, ancestor_order_mapping):
+        # Merkle-style: a node's digest covers its own inputs and the digests
+        # of the nodes it links to, so each node is hashed once per prompt.
+        digests = self.get_signature_memo(dynprompt)
+        if node_id in digests:
+            return digests[node_id]
+
+        stack = [node_id]
+        visited = set()
+        while stack:
+            current = stack[-1]
+            if current in digests:
+                stack.pop()
+                continue
+            if current not in visited:
+                visited.add(current)
+                pending = [ancestor_id for ancestor_id in self.get_linked_ancestors(dynprompt, current)
+                           if ancestor_id not in digests and ancestor_id not in visited]
+                if len(pending) > 0:
+                    stack.extend(reversed(pending))
+                    continue
+            stack.pop()
+            digests[current] = await self.get_immediate_node_signature(dynprompt, current, digests)
+        return digests[node_id]
+
+    async def get_immediate_node_signature(self, dynprompt, node_id, ancestor_digests):
         if not dynprompt.has_node(node_id):
             # This node doesn't exist -- we can't cache it.
-            return [float("NaN")]
+            return Unhashable()
         node = dynprompt.get_node(node_id)
         class_type = node["class_type"]
-        class_def = nodes.NODE_CLASS_MAPPINGS[class_type]
+        class_def = nodes.get_node_class(class_type)
         signature = [class_type, await self.is_changed_cache.get(node_id)]
         if self.include_node_id_in_input() or (hasattr(class_def, "NOT_IDEMPOTENT") and class_def.NOT_IDEMPOTENT) or include_unique_id_in_input(class_type):
             signature.append(node_id)
@@ -114,41 +172,31 @@ class CacheKeySetInputSignature(CacheKeySet):
         for key in sorted(inputs.keys()):
             if is_link(inputs[key]):
                 (ancestor_id, ancestor_socket) = inputs[key]
-                ancestor_index = ancestor_order_mapping[ancestor_id]
-                signature.append((key,("ANCESTOR", ancestor_index, ancestor_socket)))
+                ancestor_digest = ancestor_digests.get(ancestor_id)
+                if not isinstance(ancestor_digest, bytes):
+                    # Anything downstream of an uncacheable node is uncacheable
+                    return Unhashable()
+                signature.append((key, ("ANCESTOR", ancestor_digest, ancestor_socket)))
             else:
                 signature.append((key, inputs[key]))
-        return signature
+        return to_digest(signature)
 
-    # This function returns a list of all ancestors of the given node. The order of the list is
-    # deterministic based on which specific inputs the ancestor is connected by.
-    def get_ordered_ancestry(self, dynprompt, node_id):
-        ancestors = []
-        order_mapping = {}
-        self.get_ordered_ancestry_internal(dynprompt, node_id, ancestors, order_mapping)
-        return ancestors, order_mapping
-
-    def get_ordered_ancestry_internal(self, dynprompt, node_id, ancestors, order_mapping):
+    def get_linked_ancestors(self, dynprompt, node_id):
         if not dynprompt.has_node(node_id):
-            return
+            return []
         inputs = dynprompt.get_node(node_id)["inputs"]
-        input_keys = sorted(inputs.keys())
-        for key in input_keys:
-            if is_link(inputs[key]):
-                ancestor_id = inputs[key][0]
-                if ancestor_id not in order_mapping:
-                    ancestors.append(ancestor_id)
-                    order_mapping[ancestor_id] = len(ancestors) - 1
-                    self.get_ordered_ancestry_internal(dynprompt, ancestor_id, ancestors, order_mapping)
+        return [inputs[key][0] for key in sorted(inputs.keys()) if is_link(inputs[key])]
 
 class BasicCache:
-    def __init__(self, key_class):
+    def __init__(self, key_class, disk_cache=None):
         self.key_class = key_class
         self.initialized = False
         self.dynprompt: DynamicPrompt
         self.cache_key_set: CacheKeySet
         self.cache = {}
         self.subcaches = {}
+        # Optional second tier (comfy_execution.disk_cache.DiskCache) for outputs
+        self.disk_cache = disk_cache
 
     async def set_prompt(self, dynprompt, node_ids, is_changed_cache):
         self.dynprompt = dynprompt
@@ -191,7 +239,9 @@ class BasicCache:
     def _set_immediate(self, node_id, value):
         assert self.initialized
         cache_key = self.cache_key_set.get_data_key(node_id)
-        self.cache[cache_key] = value
+        self._store(cache_key, value)
+        if self.disk_cache is not None and self.disk_cache.accepts(self._get_class_type(node_id), cache_key):
+            self.disk_cache.put(cache_key, value, referenced_files(self.dynprompt, node_id))
 
     def _get_immediate(self, node_id):
         if not self.initialized:
@@ -199,14 +249,27 @@ class BasicCache:
         cache_key = self.cache_key_set.get_data_key(node_id)
         if cache_key in self.cache:
             return self.cache[cache_key]
+        elif self.disk_cache is not None and self.disk_cache.accepts(self._get_class_type(node_id), cache_key):
+            value = self.disk_cache.get(cache_key, referenced_files(self.dynprompt, node_id))
+            if value is not None:
+                self._store(cache_key, value)
+            return value
         else:
             return None
 
+    def _store(self, cache_key, value):
+        self.cache[cache_key] = value
+
+    def _get_class_type(self, node_id):
+        if not self.dynprompt.has_node(node_id):
+            return None
+        return self.dynprompt.get_node(node_id)["class_type"]
+
     async def _ensure_subcache(self, node_id, children_ids):
         subcache_key = self.cache_key_set.get_subcache_key(node_id)
         subcache = self.subcaches.get(subcache_key, None)
         if subcache is None:
-            subcache = BasicCache(self.key_class)
+            subcache = BasicCache(self.key_class, disk_cache=self.disk_cache)
             self.subcaches[subcache_key] = subcache
         await subcache.set_prompt(self.dynprompt, children_ids, self.is_changed_cache)
         return subcache
@@ -219,6 +282,16 @@ class BasicCache:
         else:
             return None
 
+    def record_lookup(self, hit):
+        """Called by the executor once per node it is about to run, hit is whether the output was cached."""
+        pass
+
+    def get_stats(self):
+        entries = len(self.cache)
+        for subcache in self.subcaches.values():
+            entries += subcache.get_stats()["entries"]
+        return {"entries": entries}
+
     def recursive_debug_dump(self):
         result = []
         for key in self.cache:
@@ -228,8 +301,8 @@ class BasicCache:
         return result
 
 class HierarchicalCache(BasicCache):
-    def __init__(self, key_class):
-        super().__init__(key_class)
+    def __init__(self, key_class, disk_cache=None):
+        super().__init__(key_class, disk_cache=disk_cache)
 
     def _get_cache_for(self, node_id):
         assert self.dynprompt is not None
@@ -266,8 +339,8 @@ class HierarchicalCache(BasicCache):
         return await cache._ensure_subcache(node_id, children_ids)
 
 class LRUCache(BasicCache):
-    def __init__(self, key_class, max_size=100):
-        super().__init__(key_class)
+    def __init__(self, key_class, max_size=100, disk_cache=None):
+        super().__init__(key_class, disk_cache=disk_cache)
         self.max_size = max_size
         self.min_generation = 0
         self.generation = 0
@@ -318,6 +391,143 @@ class LRUCache(BasicCache):
         return self
 
 
+def get_tensor_storages(value, storages=None):
+    """Map (device, storage pointer) -> bytes for every tensor in a node output.
+
+    Only containers are walked; models and other objects manage their own
+    memory through model_management.
+    """
+    if storages is None:
+        storages = {}
+    if isinstance(value, torch.Tensor):
+        storage = value.untyped_storage()
+        storages[(value.device, storage.data_ptr())] = storage.nbytes()
+    elif isinstance(value, dict):
+        for v in value.values():
+            get_tensor_storages(v, storages)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            get_tensor_storages(v, storages)
+    return storages
+
+class MemoryBudgetCache(LRUCache):
+    """
+    LRU cache bounded by the bytes of tensors it holds instead of an entry count.
+
+    Tensor storages shared between entries are only counted once. When over
+    budget, entries not used by the current prompt are evicted oldest first,
+    largest first within a generation.
+    """
+
+    def __init__(self, key_class, ram_budget, vram_budget=0, max_entries=10000, disk_cache=None):
+        super().__init__(key_class, max_size=max_entries, disk_cache=disk_cache)
+        self.ram_budget = ram_budget
+        self.vram_budget = vram_budget
+        self.entry_storages = {}
+        self.storage_refs = {}
+        self.ram_bytes = 0
+        self.vram_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _store(self, cache_key, value):
+        if cache_key in self.cache:
+            self._release(cache_key)
+        self.cache[cache_key] = value
+        storages = get_tensor_storages(value)
+        self.entry_storages[cache_key] = storages
+        for storage, nbytes in storages.items():
+            refs = self.storage_refs.get(storage)
+            if refs is None:
+                self.storage_refs[storage] = [1, nbytes]
+                self._add_bytes(storage, nbytes)
+            else:
+                refs[0] += 1
+
+    def _release(self, cache_key):
+        for storage in self.entry_storages.pop(cache_key, {}):
+            refs = self.storage_refs[storage]
+            refs[0] -= 1
+            if refs[0] == 0:
+                del self.storage_refs[storage]
+                self._add_bytes(storage, -refs[1])
+
+    def _add_bytes(self, storage, nbytes):
+        if storage[0].type == "cpu":
+            self.ram_bytes += nbytes
+        else:
+            self.vram_bytes += nbytes
+
+    def _remove(self, cache_key):
+        self._release(cache_key)
+        del self.cache[cache_key]
+        self.used_generation.pop(cache_key, None)
+        self.children.pop(cache_key, None)
+        self.evictions += 1
+
+    def _over_budget(self):
+        if self.ram_bytes > self.ram_budget:
+            return "cpu"
+        if self.vram_budget > 0 and self.vram_bytes > self.vram_budget:
+            return "vram"
+        if len(self.cache) > self.max_size:
+            return "entries"
+        return None
+
+    def _entry_bytes(self, cache_key, device_type):
+        total = 0
+        for storage, nbytes in self.entry_storages.get(cache_key, {}).items():
+            if device_type is None or (storage[0].type == "cpu") == (device_type == "cpu"):
+                total += nbytes
+        return total
+
+    def _evict(self):
+        reason = self._over_budget()
+        if reason is None:
+            return
+        # Entries used by the running prompt may still be needed
+        candidates = [key for key in self.cache if self.used_generation.get(key, 0) < self.generation]
+        device_type = reason if reason != "entries" else None
+        candidates.sort(key=lambda key: (self.used_generation.get(key, 0), -self._entry_bytes(key, device_type)))
+        for key in candidates:
+            if reason == "vram" and self._entry_bytes(key, "vram") == 0:
+                continue
+            self._remove(key)
+            reason = self._over_budget()
+            if reason is None:
+                break
+            device_type = reason if reason != "entries" else None
+
+    def clean_unused(self):
+        self._evict()
+        self._clean_subcaches()
+
+    def record_lookup(self, hit):
+        # Not counted in get, the executor reads the same output several times per node
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def set(self, node_id, value):
+        result = super().set(node_id, value)
+        # Evict right away so one large output can't push the process over budget
+        self._evict()
+        return result
+
+    def get_stats(self):
+        return {
+            "entries": len(self.cache),
+            "ram_bytes": self.ram_bytes,
+            "vram_bytes": self.vram_bytes,
+            "ram_budget": self.ram_budget,
+            "vram_budget": self.vram_budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 class DependencyAwareCache(BasicCache):
     """
     A cache implementation that tracks dependencies between nodes and manages
@@ -326,14 +536,15 @@ class DependencyAwareCache(BasicCache):
     executed.
     """
 
-    def __init__(self, key_class):
+    def __init__(self, key_class, disk_cache=None):
         """
         Initialize the DependencyAwareCache.
 
         Args:
             key_class: The class used for generating cache keys.
+            disk_cache: Optional persistent tier for node outputs.
         """
-        super().__init__(key_class)
+        super().__init__(key_class, disk_cache=disk_cache)
         self.descendants = {}  # Maps node_id -> set of descendant node_ids
         self.ancestors = {}    # Maps node_id -> set of ancestor node_ids
         self.executed_nodes = set()  # Tracks nodes that have been executed
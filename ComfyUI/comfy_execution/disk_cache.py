@@ -0,0 +1,279 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+from safetensors.torch import save_file
+
+import comfy.utils
+import folder_paths
+from comfy_execution.graph_utils import is_link
+
+# Outputs of these nodes are deterministic, expensive to recompute and made of
+# tensors, so they are worth keeping on disk across restarts.
+DEFAULT_DISK_CACHE_NODES = (
+    "CLIPTextEncode",
+    "CLIPVisionEncode",
+    "VAEEncode",
+    "VAEEncodeForInpaint",
+    "LoadImage",
+)
+
+FORMAT_VERSION = "1"
+
+def referenced_files(dynprompt, node_id):
+    """
+    Full paths of the model files named by a node and the nodes it depends on.
+
+    Loaders take a file name, so replacing a model under the same name leaves
+    the input signature unchanged; the stamps of these files go into the disk
+    key instead.
+    """
+    paths = set()
+    stack = [node_id]
+    visited = set()
+    while stack:
+        current = stack.pop()
+        if current in visited or not dynprompt.has_node(current):
+            continue
+        visited.add(current)
+        for value in dynprompt.get_node(current)["inputs"].values():
+            if is_link(value):
+                stack.append(value[0])
+            elif isinstance(value, str):
+                extension = os.path.splitext(value)[1].lower()
+                if extension == "":
+                    continue
+                for folder_name, (_, extensions) in folder_paths.folder_names_and_paths.items():
+                    if extension in extensions:
+                        path = folder_paths.get_full_path(folder_name, value)
+                        if path is not None:
+                            paths.add(path)
+    return sorted(paths)
+
+def file_stamps(paths):
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps.append((path, stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+class UnsupportedOutput(Exception):
+    pass
+
+# Non-container output objects that can be rebuilt from their attributes
+OBJECT_TYPES = ("comfy.clip_vision.Output",)
+
+def _load_object_type(name):
+    module, _, qualname = name.rpartition(".")
+    return getattr(importlib.import_module(module), qualname)
+
+def encode_output(obj, tensors, seen):
+    """Split a node output into a JSON structure and a dict of named tensors."""
+    if isinstance(obj, torch.Tensor):
+        if id(obj) not in seen:
+            name = str(len(tensors))
+            tensor = obj.detach().to("cpu")
+            if tensor is obj or not tensor.is_contiguous() or tensor.untyped_storage().nbytes() != tensor.nbytes:
+                # safetensors refuses views and tensors that share storage
+                tensor = tensor.contiguous().clone()
+            tensors[name] = tensor
+            seen[id(obj)] = name
+        return {"tensor": seen[id(obj)]}
+    elif obj is None or isinstance(obj, (bool, int, float, str)):
+        return {"value": obj}
+    elif isinstance(obj, dict):
+        if not all(isinstance(k, str) for k in obj):
+            raise UnsupportedOutput("dict with non-string keys")
+        return {"dict": [[k, encode_output(v, tensors, seen)] for k, v in obj.items()]}
+    elif isinstance(obj, list):
+        return {"list": [encode_output(v, tensors, seen) for v in obj]}
+    elif isinstance(obj, tuple):
+        return {"tuple": [encode_output(v, tensors, seen) for v in obj]}
+
+    name = "{}.{}".format(type(obj).__module__, type(obj).__qualname__)
+    if name in OBJECT_TYPES:
+        return {"object": name, "attrs": encode_output(vars(obj), tensors, seen)}
+    raise UnsupportedOutput(name)
+
+def decode_output(structure, tensors):
+    if "tensor" in structure:
+        return tensors[structure["tensor"]]
+    elif "value" in structure:
+        return structure["value"]
+    elif "dict" in structure:
+        return {k: decode_output(v, tensors) for k, v in structure["dict"]}
+    elif "list" in structure:
+        return [decode_output(v, tensors) for v in structure["list"]]
+    elif "tuple" in structure:
+        return tuple(decode_output(v, tensors) for v in structure["tuple"])
+    elif "object" in structure:
+        if structure["object"] not in OBJECT_TYPES:
+            raise UnsupportedOutput(structure["object"])
+        obj = _load_object_type(structure["object"])()
+        for k, v in decode_output(structure["attrs"], tensors).items():
+            setattr(obj, k, v)
+        return obj
+    raise UnsupportedOutput(str(structure))
+
+class DiskCache:
+    """
+    Second cache tier that keeps node outputs as safetensors files.
+
+    Entries are keyed by the node's input signature digest, so they can be
+    reused after a restart and by other ComfyUI processes sharing the same
+    directory. The key also covers the mtime and size of the model files the
+    node depends on (see ``referenced_files``), so replacing a model under the
+    same name misses instead of returning a stale entry. Files are written
+    atomically in a background thread, and the oldest entries (by last use)
+    are evicted when the directory grows past ``max_bytes``. Hits are memory
+    mapped rather than read into RAM.
+    """
+
+    def __init__(self, directory, max_bytes, class_types=DEFAULT_DISK_CACHE_NODES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.class_types = set(class_types)
+        self.lock = threading.Lock()
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk_cache")
+        self.pending = set()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._scan())
+
+    def accepts(self, class_type, key):
+        # Only content digests are stable across processes; Unhashable keys never are
+        return class_type in self.class_types and isinstance(key, bytes)
+
+    def _path(self, key, files=()):
+        stamps = file_stamps(files)
+        if len(stamps) > 0:
+            key = hashlib.blake2b(key + repr(stamps).encode("utf-8"), digest_size=16).digest()
+        return os.path.join(self.directory, key.hex() + ".safetensors")
+
+    def get(self, key, files=()):
+        path = self._path(key, files)
+        if not os.path.exists(path):
+            self.misses += 1
+            return None
+        try:
+            tensors, metadata = comfy.utils.load_torch_file(path, return_metadata=True)
+            metadata = metadata or {}
+            if metadata.get("format_version") != FORMAT_VERSION:
+                self.misses += 1
+                return None
+            value = decode_output(json.loads(metadata["structure"]), tensors)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning("Failed to read disk cache entry {}: {}".format(path, e))
+            self.misses += 1
+            return None
+
+        try:
+            # mtime is the LRU clock shared by every process using the directory
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key, value, files=()):
+        tensors = {}
+        try:
+            structure = encode_output(value, tensors, {})
+        except UnsupportedOutput as e:
+            logging.debug("Not caching output on disk, unsupported type: {}".format(e))
+            return
+
+        path = self._path(key, files)
+        with self.lock:
+            if path in self.pending:
+                return
+            self.pending.add(path)
+        self.writer.submit(self._write, path, structure, tensors)
+
+    def _write(self, path, structure, tensors):
+        tmp_path = "{}.{}.tmp".format(path, uuid.uuid4().hex)
+        try:
+            metadata = {"format_version": FORMAT_VERSION, "structure": json.dumps(structure)}
+            save_file(tensors, tmp_path, metadata=metadata)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+            with self.lock:
+                self.total_bytes += size
+                self.writes += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+        except Exception as e:
+            logging.warning("Failed to write disk cache entry {}: {}".format(path, e))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        finally:
+            with self.lock:
+                self.pending.discard(path)
+
+    def _scan(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".safetensors"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _evict(self):
+        # Rescan so files written by other processes are accounted for
+        entries = sorted(self._scan())
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                self.evictions += 1
+            except OSError:
+                pass
+        with self.lock:
+            self.total_bytes = total
+
+    def flush(self, timeout=None):
+        """Wait until queued writes are on disk."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def get_stats(self):
+        return {
+            "directory": self.directory,
+            "size_bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+        }
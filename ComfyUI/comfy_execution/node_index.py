@@ -0,0 +1,199 @@
+"""
+Persisted index of node modules, used by --lazy-node-loading.
+
+The first boot imports every node module as usual and records the class
+types each module registers together with their /object_info schema. Later
+boots register the indexed class types as placeholders and only import a
+module when one of its nodes is used by a prompt, or when its schema can't be
+served from the index.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+
+INDEX_VERSION = 1
+
+class LazyNode:
+    """Placeholder for a node class whose module hasn't been imported yet."""
+    __slots__ = ("module_path",)
+
+    def __init__(self, module_path):
+        self.module_path = module_path
+
+    def __repr__(self):
+        return "LazyNode({})".format(self.module_path)
+
+class LazyNodeMappings(dict):
+    """
+    NODE_CLASS_MAPPINGS that imports the module behind a LazyNode entry the
+    first time the class is looked up. Membership tests and key iteration
+    never import anything.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loader = None
+
+    def is_lazy(self, class_type):
+        return isinstance(dict.get(self, class_type), LazyNode)
+
+    def __getitem__(self, class_type):
+        value = super().__getitem__(class_type)
+        if isinstance(value, LazyNode):
+            if self.loader is not None:
+                self.loader(value.module_path, class_type)
+            value = dict.get(self, class_type)
+            if value is None or isinstance(value, LazyNode):
+                # The module failed to import or no longer defines the node
+                dict.pop(self, class_type, None)
+                raise KeyError(class_type)
+        return value
+
+    def get(self, class_type, default=None):
+        try:
+            return self[class_type]
+        except KeyError:
+            return default
+
+    def items(self):
+        out = []
+        for class_type in list(self.keys()):
+            value = self.get(class_type)
+            if value is not None:
+                out.append((class_type, value))
+        return out
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+def module_stamp(module_path):
+    """Modification time and size of a module file, or of all the .py files of a package."""
+    if os.path.isfile(module_path):
+        st = os.stat(module_path)
+        return [st.st_mtime_ns, st.st_size]
+    mtime = 0
+    size = 0
+    count = 0
+    for root, dirs, files in os.walk(module_path):
+        dirs[:] = [d for d in dirs if d != "__pycache__" and not d.startswith(".")]
+        for name in files:
+            if name.endswith(".py"):
+                st = os.stat(os.path.join(root, name))
+                mtime = max(mtime, st.st_mtime_ns)
+                size += st.st_size
+                count += 1
+    return [mtime, size, count]
+
+class NodeIndex:
+    def __init__(self, path, version_key):
+        self.path = path
+        self.version_key = version_key
+        self.modules = {}
+        self.class_modules = {}
+        self.dirty = False
+        self.lock = threading.RLock()
+        # Profiling for this boot: module_path -> (seconds, reason)
+        self.import_times = {}
+        self.deferred = 0
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION and data.get("version_key") == version_key:
+                self.modules = data["modules"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.warning("Ignoring node index {}: {}".format(path, e))
+
+        for module_path, entry in self.modules.items():
+            for class_type in entry["nodes"]:
+                self.class_modules[class_type] = module_path
+
+    def get_fresh(self, module_path):
+        """The index entry for a module if it can be loaded lazily and the module is unchanged."""
+        entry = self.modules.get(os.path.abspath(module_path))
+        if entry is None or entry["eager"] or len(entry["nodes"]) == 0:
+            return None
+        try:
+            if entry["stamp"] != module_stamp(module_path):
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def record(self, module_path, module_parent, class_types, display_names, eager, import_time):
+        module_path = os.path.abspath(module_path)
+        with self.lock:
+            old = self.modules.get(module_path, {})
+            info = {k: v for k, v in old.get("info", {}).items() if k in class_types} if old.get("stamp") == module_stamp(module_path) else {}
+            self.modules[module_path] = {
+                "parent": module_parent,
+                "stamp": module_stamp(module_path),
+                "nodes": list(class_types),
+                "display_names": display_names,
+                "eager": eager,
+                "import_time": import_time,
+                "info": info,
+            }
+            for class_type in class_types:
+                self.class_modules[class_type] = module_path
+            self.dirty = True
+
+    def cached_info(self, class_type):
+        """The /object_info schema of a node, or None if it has to be computed from the class."""
+        module_path = self.class_modules.get(class_type)
+        if module_path is None:
+            return None
+        cached = self.modules[module_path]["info"].get(class_type)
+        if cached is None or cached["dynamic"]:
+            return None
+        return cached["info"]
+
+    def update_info(self, node_mappings, node_info):
+        """Store the schema of the loaded nodes that don't have one in the index yet."""
+        import folder_paths
+
+        with self.lock:
+            for entry in self.modules.values():
+                for class_type in entry["nodes"]:
+                    if class_type in entry["info"] or node_mappings.is_lazy(class_type) or class_type not in node_mappings:
+                        continue
+                    # Nodes whose INPUT_TYPES read a folder list files on disk, so
+                    # their schema goes stale and can't be served from the index
+                    with folder_paths.record_folder_reads() as reads:
+                        try:
+                            info = node_info(class_type)
+                            json.dumps(info)
+                        except Exception:
+                            info = None
+                    entry["info"][class_type] = {"info": info, "dynamic": info is None or len(reads) > 0}
+                    self.dirty = True
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {"version": INDEX_VERSION, "version_key": self.version_key, "modules": self.modules}
+            tmp_path = "{}.{}.tmp".format(self.path, uuid.uuid4().hex)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except Exception as e:
+                logging.warning("Failed to write node index {}: {}".format(self.path, e))
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def log_import_times(self):
+        imported = sorted(((t, path, reason) for path, (t, reason) in self.import_times.items()), reverse=True)
+        total = sum(t for t, _, _ in imported)
+        logging.info("Lazy node loading: {} node types deferred, {} modules imported at startup in {:.2f} seconds".format(self.deferred, len(imported), total))
+        for t, path, reason in imported[:10]:
+            logging.info("{:6.2f} seconds ({}): {}".format(t, reason, path))
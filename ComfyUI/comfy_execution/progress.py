@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from typing import TypedDict, Dict, Optional, Tuple
 from typing_extensions import override
 from PIL import Image
@@ -11,6 +12,7 @@ if TYPE_CHECKING:
     from comfy_execution.graph import DynamicPrompt
 from protocol import BinaryEventTypes
 from comfy_api import feature_flags
+from comfy.cli_args import args
 
 PreviewImageTuple = Tuple[str, Image.Image, Optional[int]]
 
@@ -150,47 +152,84 @@ class CLIProgressHandler(ProgressHandler):
 class WebUIProgressHandler(ProgressHandler):
     """
     Handler that sends progress updates to the WebUI via WebSockets.
+
+    Step updates are coalesced so at most one progress_state message is sent
+    per ``min_interval`` seconds; node starts and finishes are always sent so
+    the client sees the final state. Clients that announce the
+    ``supports_progress_state_delta`` feature only receive the nodes that
+    changed since the previous message.
     """
 
-    def __init__(self, server_instance):
+    def __init__(self, server_instance, min_interval: Optional[float] = None):
         super().__init__("webui")
         self.server_instance = server_instance
+        self.registry = None
+        if min_interval is None:
+            min_interval = args.progress_state_interval / 1000.0
+        self.min_interval = min_interval
+        self.last_send = None
+        # node_id -> (state, value, max) as last sent to the client
+        self.sent_states: Dict[str, Tuple[NodeState, float, float]] = {}
 
     def set_registry(self, registry: "ProgressRegistry"):
         self.registry = registry
 
-    def _send_progress_state(self, prompt_id: str, nodes: Dict[str, NodeProgressState]):
-        """Send the current progress state to the client"""
+    def _node_message(self, prompt_id: str, node_id: str, state: NodeProgressState):
+        return {
+            "value": state["value"],
+            "max": state["max"],
+            "state": state["state"].value,
+            "node_id": node_id,
+            "prompt_id": prompt_id,
+            "display_node_id": self.registry.dynprompt.get_display_node_id(node_id),
+            "parent_node_id": self.registry.dynprompt.get_parent_node_id(node_id),
+            "real_node_id": self.registry.dynprompt.get_real_node_id(node_id),
+        }
+
+    def _send_progress_state(self, prompt_id: str, nodes: Dict[str, NodeProgressState], force: bool = False):
+        """Send the progress state of the nodes that changed since the last message"""
         if self.server_instance is None:
             return
 
+        now = time.monotonic()
+        if not force and self.last_send is not None and now - self.last_send < self.min_interval:
+            # Picked up by the next message, finishing a node always sends one
+            return
+
         # Only send info for non-pending nodes
-        active_nodes = {
-            node_id: {
-                "value": state["value"],
-                "max": state["max"],
-                "state": state["state"].value,
-                "node_id": node_id,
+        changed = []
+        for node_id, state in nodes.items():
+            if state["state"] == NodeState.Pending:
+                continue
+            current = (state["state"], state["value"], state["max"])
+            if self.sent_states.get(node_id) != current:
+                self.sent_states[node_id] = current
+                changed.append(node_id)
+        if len(changed) == 0:
+            return
+        self.last_send = now
+
+        client_id = self.server_instance.client_id
+        if feature_flags.supports_feature(self.server_instance.sockets_metadata, client_id, "supports_progress_state_delta"):
+            message = {
                 "prompt_id": prompt_id,
-                "display_node_id": self.registry.dynprompt.get_display_node_id(node_id),
-                "parent_node_id": self.registry.dynprompt.get_parent_node_id(node_id),
-                "real_node_id": self.registry.dynprompt.get_real_node_id(node_id),
+                "nodes": {node_id: self._node_message(prompt_id, node_id, nodes[node_id]) for node_id in changed},
+                "delta": True,
+            }
+        else:
+            message = {
+                "prompt_id": prompt_id,
+                "nodes": {node_id: self._node_message(prompt_id, node_id, state) for node_id, state in nodes.items() if state["state"] != NodeState.Pending},
             }
-            for node_id, state in nodes.items()
-            if state["state"] != NodeState.Pending
-        }
 
-        # Send a combined progress_state message with all node states
+        # Send a combined progress_state message with the node states
         # Include client_id to ensure message is only sent to the initiating client
-        self.server_instance.send_sync(
-            "progress_state", {"prompt_id": prompt_id, "nodes": active_nodes}, self.server_instance.client_id
-        )
+        self.server_instance.send_sync("progress_state", message, client_id)
 
     @override
     def start_handler(self, node_id: str, state: NodeProgressState, prompt_id: str):
-        # Send progress state of all nodes
         if self.registry:
-            self._send_progress_state(prompt_id, self.registry.nodes)
+            self._send_progress_state(prompt_id, self.registry.nodes, force=True)
 
     @override
     def update_handler(
@@ -202,7 +241,6 @@ class WebUIProgressHandler(ProgressHandler):
         prompt_id: str,
         image: PreviewImageTuple | None = None,
     ):
-        # Send progress state of all nodes
         if self.registry:
             self._send_progress_state(prompt_id, self.registry.nodes)
         if image:
@@ -231,9 +269,8 @@ class WebUIProgressHandler(ProgressHandler):
 
     @override
     def finish_handler(self, node_id: str, state: NodeProgressState, prompt_id: str):
-        # Send progress state of all nodes
         if self.registry:
-            self._send_progress_state(prompt_id, self.registry.nodes)
+            self._send_progress_state(prompt_id, self.registry.nodes, force=True)
 
 class ProgressRegistry:
     """
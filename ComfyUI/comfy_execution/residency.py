@@ -0,0 +1,265 @@
+"""
+Predictive model residency planning.
+
+model_management.free_memory used to pick the models to unload only by how
+much of them is offloaded already, their refcount and their size. With
+several large models in one workflow (text encoder, two diffusion models and
+a VAE for WAN) that makes them thrash in and out of VRAM.
+
+The planner predicts when every loaded model is used next, from the nodes
+that are still pending in the running prompt and from the prompts waiting in
+the queue, and free_memory unloads the model whose next use is farthest away
+first (Belady's rule), starting with models no known prompt uses. When the
+prompt worker is between prompts it also loads the model needed next into
+VRAM if that fits without unloading anything. Every eviction and pre-load is
+kept in a decision log that is reported on /system_stats.
+
+Models are matched to prompts through the loader nodes that produced them:
+a node whose inputs are all constants and that returned a ModelPatcher (or a
+CLIP/VAE wrapping one) is remembered by its class and inputs, and a queued
+prompt containing the same node will get the same model from the outputs
+cache. Models flow through nodes that return model types (LoRA loaders,
+model patches) and are used by the nodes that consume them.
+"""
+import collections
+import json
+import logging
+import time
+import weakref
+
+import comfy.model_management
+import nodes
+from comfy.model_patcher import ModelPatcher
+from comfy_execution.graph_utils import is_link
+
+# Output types of nodes that pass models through (and don't run them)
+MODEL_TYPES = frozenset(["MODEL", "CLIP", "VAE", "CLIP_VISION", "CONTROL_NET", "STYLE_MODEL", "UPSCALE_MODEL", "GLIGEN"])
+
+# Number of queued prompts looked at when predicting the next use of a model
+QUEUE_LOOKAHEAD = 8
+
+DECISION_LOG_SIZE = 200
+
+
+def find_patchers(value, found=None, depth=0):
+    """ModelPatchers in a node output, also the ones wrapped by CLIP, VAE and similar objects."""
+    if found is None:
+        found = []
+    if isinstance(value, ModelPatcher):
+        found.append(value)
+    elif isinstance(value, (list, tuple)):
+        if depth < 3:
+            for v in value:
+                find_patchers(v, found, depth + 1)
+    elif isinstance(getattr(value, "patcher", None), ModelPatcher):
+        found.append(value.patcher)
+    return found
+
+
+def node_signature(node):
+    """Identifies a node whose inputs are all constants, or None."""
+    inputs = node.get("inputs", {})
+    if any(is_link(v) for v in inputs.values()):
+        return None
+    return node.get("class_type"), json.dumps(inputs, sort_keys=True, default=str)
+
+
+def return_types(node):
+    class_def = nodes.NODE_CLASS_MAPPINGS.get(node.get("class_type"))
+    return getattr(class_def, "RETURN_TYPES", ())
+
+
+def output_type(node, slot):
+    types = return_types(node)
+    if slot < len(types) and isinstance(types[slot], str):
+        return types[slot]
+    return None
+
+
+def model_name(patcher):
+    return patcher.model.__class__.__name__
+
+
+class ResidencyPlanner:
+    def __init__(self, prompt_queue=None):
+        self.prompt_queue = prompt_queue
+        # node signature -> weakref to the ModelPatcher the node returned
+        self.sources = {}
+        self.dynprompt = None
+        self.execution_list = None
+        self.decisions = collections.deque(maxlen=DECISION_LOG_SIZE)
+        self.evictions = 0
+        self.prestaged = 0
+
+    def begin_prompt(self, dynprompt, execution_list):
+        self.dynprompt = dynprompt
+        self.execution_list = execution_list
+
+    def end_prompt(self):
+        self.dynprompt = None
+        self.execution_list = None
+
+    def register_outputs(self, node_id, outputs):
+        if outputs is None or self.dynprompt is None:
+            return
+        signature = node_signature(self.dynprompt.get_node(node_id))
+        if signature is None:
+            return
+        for slot, output in enumerate(outputs):
+            patchers = find_patchers(output)
+            if len(patchers) == 1:
+                self.sources[(signature, slot)] = weakref.ref(patchers[0])
+        for key in [k for k, ref in self.sources.items() if ref() is None]:
+            del self.sources[key]
+
+    def _models_out(self, get_node, node_id, slot, memo):
+        """The ModelPatchers in one output of a node, as far as they can be predicted."""
+        if (node_id, slot) in memo:
+            return memo[(node_id, slot)]
+        memo[(node_id, slot)] = []
+        node = get_node(node_id)
+        if node is None:
+            return []
+        signature = node_signature(node)
+        if signature is not None:
+            ref = self.sources.get((signature, slot))
+            patcher = ref() if ref is not None else None
+            if patcher is not None:
+                memo[(node_id, slot)] = [patcher]
+            return memo[(node_id, slot)]
+        # Nodes that return a model type pass on the models of the same type they get
+        out_type = output_type(node, slot)
+        if out_type not in MODEL_TYPES:
+            return []
+        models = []
+        for value in node.get("inputs", {}).values():
+            if is_link(value):
+                from_node = get_node(value[0])
+                if from_node is not None and output_type(from_node, value[1]) == out_type:
+                    models += self._models_out(get_node, value[0], value[1], memo)
+        memo[(node_id, slot)] = models
+        return models
+
+    def _models_used(self, get_node, node_id, memo):
+        """The ModelPatchers a node runs: the ones it gets as inputs if it doesn't return models itself."""
+        node = get_node(node_id)
+        if node is None or any(t in MODEL_TYPES for t in return_types(node) if isinstance(t, str)):
+            return []
+        models = []
+        for value in node.get("inputs", {}).values():
+            if is_link(value):
+                models += self._models_out(get_node, value[0], value[1], memo)
+        return models
+
+    def _queued_prompts(self):
+        if self.prompt_queue is None:
+            return []
+        with self.prompt_queue.mutex:
+            items = sorted(self.prompt_queue.queue, key=lambda item: item[0])[:QUEUE_LOOKAHEAD]
+        return [item[2] for item in items]
+
+    def next_uses(self):
+        """{id(model): ((queue position, steps ahead), patcher)} for every model with a predicted next use."""
+        uses = {}
+
+        def add(patcher, distance):
+            key = id(patcher.model)
+            if key not in uses or distance < uses[key][0]:
+                uses[key] = (distance, patcher)
+
+        if self.execution_list is not None:
+            pending = self.execution_list.pendingNodes
+            dynprompt = self.dynprompt
+
+            def get_node(node_id):
+                if not dynprompt.has_node(node_id):
+                    return None
+                return dynprompt.get_node(node_id)
+
+            depths = {}
+
+            def depth(node_id):
+                if node_id not in depths:
+                    depths[node_id] = 0
+                    node = get_node(node_id)
+                    inputs = node.get("inputs", {}).values() if node is not None else ()
+                    blockers = [v[0] for v in inputs if is_link(v) and v[0] in pending]
+                    if len(blockers) > 0:
+                        depths[node_id] = 1 + max(depth(b) for b in blockers)
+                return depths[node_id]
+
+            memo = {}
+            for node_id in list(pending):
+                for patcher in self._models_used(get_node, node_id, memo):
+                    add(patcher, (0, depth(node_id)))
+
+        for position, prompt in enumerate(self._queued_prompts()):
+            memo = {}
+            for node_id in prompt:
+                for patcher in self._models_used(prompt.get, node_id, memo):
+                    add(patcher, (position + 1, 0))
+        return uses
+
+    def eviction_rank(self, loaded_model, next_uses):
+        """Sort key prefix for free_memory: unused models first, then the ones used farthest in the future."""
+        use = next_uses.get(id(loaded_model.model.model))
+        if use is None:
+            return (0, 0, 0)
+        distance = use[0]
+        return (1, -distance[0], -distance[1])
+
+    def describe_use(self, loaded_model, next_uses):
+        use = next_uses.get(id(loaded_model.model.model))
+        if use is None:
+            return "not used by the running prompt or the next {} queued prompts".format(QUEUE_LOOKAHEAD)
+        position, steps = use[0]
+        if position == 0:
+            return "next used by the running prompt {} nodes ahead".format(steps)
+        return "next used by queued prompt {}".format(position)
+
+    def record(self, action, patcher, reason, memory=None):
+        decision = {
+            "time": time.time(),
+            "action": action,
+            "model": model_name(patcher),
+            "reason": reason,
+        }
+        if memory is not None:
+            decision["memory"] = memory
+        self.decisions.append(decision)
+        logging.info("Residency: {} {}: {}".format(action, decision["model"], reason))
+
+    def record_eviction(self, loaded_model, next_uses, memory_to_free):
+        self.evictions += 1
+        self.record("unload", loaded_model.model, self.describe_use(loaded_model, next_uses), memory_to_free)
+
+    def prestage(self):
+        """
+        Load the model needed next into VRAM if it fits without unloading anything.
+
+        Called by the prompt worker after a prompt was reported as done, so
+        the load never delays the history entry of the prompt before it.
+        """
+        next_uses = self.next_uses()
+        for distance, patcher in sorted(next_uses.values(), key=lambda use: use[0]):
+            device = patcher.load_device
+            if comfy.model_management.is_device_cpu(device):
+                continue
+            loaded = comfy.model_management.LoadedModel(patcher)
+            required = loaded.model_memory_required(device)
+            if required == 0:
+                continue
+            reserve = max(comfy.model_management.minimum_inference_memory(), comfy.model_management.extra_reserved_memory())
+            if comfy.model_management.get_free_memory(device) > required * 1.1 + reserve:
+                comfy.model_management.load_models_gpu([patcher])
+                self.prestaged += 1
+                self.record("preload", patcher, "needed {}".format("in the running prompt" if distance[0] == 0 else "by queued prompt {}".format(distance[0])), required)
+            # Only the model needed next, the ones after it may still be unloaded to make room for it
+            return
+
+    def get_stats(self):
+        return {
+            "evictions": self.evictions,
+            "preloads": self.prestaged,
+            "decisions": list(self.decisions)[-20:],
+        }
@@ -8,8 +8,8 @@ if TYPE_CHECKING:
     from comfy.sd import CLIP
 
 import comfy.hooks
+import comfy.lora_cache
 import comfy.sd
-import comfy.utils
 import folder_paths
 
 ###########################################
@@ -288,8 +288,6 @@ class ConditioningTimestepsRange:
 class CreateHookLora:
     NodeId = 'CreateHookLora'
     NodeName = 'Create Hook LoRA'
-    def __init__(self):
-        self.loaded_lora = None
 
     @classmethod
     def INPUT_TYPES(s):
@@ -318,18 +316,7 @@ class CreateHookLora:
             return (prev_hooks,)
 
         lora_path = folder_paths.get_full_path("loras", lora_name)
-        lora = None
-        if self.loaded_lora is not None:
-            if self.loaded_lora[0] == lora_path:
-                lora = self.loaded_lora[1]
-            else:
-                temp = self.loaded_lora
-                self.loaded_lora = None
-                del temp
-
-        if lora is None:
-            lora = comfy.utils.load_torch_file(lora_path, safe_load=True)
-            self.loaded_lora = (lora_path, lora)
+        lora = comfy.lora_cache.load_lora_file(lora_path)
 
         hooks = comfy.hooks.create_hook_lora(lora=lora, strength_model=strength_model, strength_clip=strength_clip)
         return (prev_hooks.clone_and_combine(hooks),)
@@ -61,14 +61,27 @@ class ImageUpscaleWithModel:
         tile = 512
         overlap = 32
 
+        # Run as many tiles per forward call as fit in the free memory, and
+        # blend them on the device if the upscaled frame fits there too
+        scale = max(upscale_model.scale, 1.0)
+        out_bytes = in_img.shape[2] * in_img.shape[3] * (3 + 1) * 4 * scale * scale
+        free = model_management.get_free_memory(device)
+        accumulate_device = device if free > out_bytes * 2 else None
+        tile_batch = max(1, min(comfy.utils.MAX_TILE_BATCH, int((free - out_bytes) / ((tile * tile * 3) * image.element_size() * scale * 384.0))))
+
         oom = True
         while oom:
             try:
                 steps = in_img.shape[0] * comfy.utils.get_tiled_scale_steps(in_img.shape[3], in_img.shape[2], tile_x=tile, tile_y=tile, overlap=overlap)
                 pbar = comfy.utils.ProgressBar(steps)
-                s = comfy.utils.tiled_scale(in_img, lambda a: upscale_model(a), tile_x=tile, tile_y=tile, overlap=overlap, upscale_amount=upscale_model.scale, pbar=pbar)
+                s = comfy.utils.tiled_scale(in_img, lambda a: upscale_model(a), tile_x=tile, tile_y=tile, overlap=overlap, upscale_amount=upscale_model.scale, pbar=pbar,
+                                            tile_batch=tile_batch, accumulate_device=accumulate_device)
                 oom = False
             except model_management.OOM_EXCEPTION as e:
+                if tile_batch > 1 or accumulate_device is not None:
+                    tile_batch = 1
+                    accumulate_device = None
+                    continue
                 tile //= 2
                 if tile < 128:
                     raise e
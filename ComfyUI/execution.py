@@ -13,6 +13,7 @@ import asyncio
 import torch
 
 import comfy.model_management
+import node_helpers
 import nodes
 from comfy_execution.caching import (
     BasicCache,
@@ -21,6 +22,7 @@ from comfy_execution.caching import (
     DependencyAwareCache,
     HierarchicalCache,
     LRUCache,
+    MemoryBudgetCache,
 )
 from comfy_execution.graph import (
     DynamicPrompt,
@@ -57,7 +59,7 @@ class IsChangedCache:
 
         node = self.dynprompt.get_node(node_id)
         class_type = node["class_type"]
-        class_def = nodes.NODE_CLASS_MAPPINGS[class_type]
+        class_def = nodes.get_node_class(class_type)
         has_is_changed = False
         is_changed_name = None
         if issubclass(class_def, _ComfyNodeInternal) and first_real_override(class_def, "fingerprint_inputs") is not None:
@@ -92,13 +94,18 @@ class CacheType(Enum):
     CLASSIC = 0
     LRU = 1
     DEPENDENCY_AWARE = 2
+    RAM_BUDGET = 3
 
 
 class CacheSet:
-    def __init__(self, cache_type=None, cache_size=None):
+    def __init__(self, cache_type=None, cache_size=None, disk_cache=None, ram_budget=0, vram_budget=0):
+        self.disk_cache = disk_cache
         if cache_type == CacheType.DEPENDENCY_AWARE:
             self.init_dependency_aware_cache()
             logging.info("Disabling intermediate node cache.")
+        elif cache_type == CacheType.RAM_BUDGET:
+            self.init_ram_budget_cache(ram_budget, vram_budget)
+            logging.info("Using memory budgeted cache")
         elif cache_type == CacheType.LRU:
             if cache_size is None:
                 cache_size = 0
@@ -111,21 +118,36 @@ class CacheSet:
 
     # Performs like the old cache -- dump data ASAP
     def init_classic_cache(self):
-        self.outputs = HierarchicalCache(CacheKeySetInputSignature)
+        self.outputs = HierarchicalCache(CacheKeySetInputSignature, disk_cache=self.disk_cache)
         self.ui = HierarchicalCache(CacheKeySetInputSignature)
         self.objects = HierarchicalCache(CacheKeySetID)
 
     def init_lru_cache(self, cache_size):
-        self.outputs = LRUCache(CacheKeySetInputSignature, max_size=cache_size)
+        self.outputs = LRUCache(CacheKeySetInputSignature, max_size=cache_size, disk_cache=self.disk_cache)
         self.ui = LRUCache(CacheKeySetInputSignature, max_size=cache_size)
         self.objects = HierarchicalCache(CacheKeySetID)
 
+    # evict by tensor bytes instead of entry count
+    def init_ram_budget_cache(self, ram_budget, vram_budget):
+        self.outputs = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget, vram_budget, disk_cache=self.disk_cache)
+        self.ui = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget, vram_budget)
+        self.objects = HierarchicalCache(CacheKeySetID)
+
     # only hold cached items while the decendents have not executed
     def init_dependency_aware_cache(self):
-        self.outputs = DependencyAwareCache(CacheKeySetInputSignature)
+        self.outputs = DependencyAwareCache(CacheKeySetInputSignature, disk_cache=self.disk_cache)
         self.ui = DependencyAwareCache(CacheKeySetInputSignature)
         self.objects = DependencyAwareCache(CacheKeySetID)
 
+    def get_stats(self):
+        stats = {
+            "outputs": self.outputs.get_stats(),
+            "ui": self.ui.get_stats(),
+        }
+        if self.disk_cache is not None:
+            stats["disk"] = self.disk_cache.get_stats()
+        return stats
+
     def recursive_debug_dump(self):
         result = {
             "outputs": self.outputs.recursive_debug_dump(),
@@ -399,8 +421,11 @@ async def execute(server, dynprompt, caches, current_item, extra_data, executed,
     parent_node_id = dynprompt.get_parent_node_id(unique_id)
     inputs = dynprompt.get_node(unique_id)['inputs']
     class_type = dynprompt.get_node(unique_id)['class_type']
-    class_def = nodes.NODE_CLASS_MAPPINGS[class_type]
-    if caches.outputs.get(unique_id) is not None:
+    class_def = nodes.get_node_class(class_type)
+    cached = caches.outputs.get(unique_id) is not None
+    if unique_id not in pending_subgraph_results and unique_id not in pending_async_nodes:
+        caches.outputs.record_lookup(cached)
+    if cached:
         if server.client_id is not None:
             cached_output = caches.ui.get(unique_id) or {}
             server.send_sync("executed", { "node": unique_id, "display_node": display_node_id, "output": cached_output.get("output",None), "prompt_id": prompt_id }, server.client_id)
@@ -535,7 +560,7 @@ async def execute(server, dynprompt, caches, current_item, extra_data, executed,
                         dynprompt.add_ephemeral_node(node_id, node_info, unique_id, display_id)
                         # Figure out if the newly created node is an output node
                         class_type = node_info["class_type"]
-                        class_def = nodes.NODE_CLASS_MAPPINGS[class_type]
+                        class_def = nodes.get_node_class(class_type)
                         if hasattr(class_def, 'OUTPUT_NODE') and class_def.OUTPUT_NODE == True:
                             new_output_ids.append(node_id)
                     for i in range(len(node_outputs)):
@@ -597,14 +622,19 @@ async def execute(server, dynprompt, caches, current_item, extra_data, executed,
     return (ExecutionResult.SUCCESS, None, None)
 
 class PromptExecutor:
-    def __init__(self, server, cache_type=False, cache_size=None):
+    def __init__(self, server, cache_type=False, cache_size=None, disk_cache=None, ram_budget=0, vram_budget=0):
         self.cache_size = cache_size
         self.cache_type = cache_type
+        self.disk_cache = disk_cache
+        self.ram_budget = ram_budget
+        self.vram_budget = vram_budget
         self.server = server
+        self.residency_planner = None
         self.reset()
 
     def reset(self):
-        self.caches = CacheSet(cache_type=self.cache_type, cache_size=self.cache_size)
+        self.caches = CacheSet(cache_type=self.cache_type, cache_size=self.cache_size, disk_cache=self.disk_cache,
+                               ram_budget=self.ram_budget, vram_budget=self.vram_budget)
         self.status_messages = []
         self.success = True
 
@@ -645,10 +675,10 @@ class PromptExecutor:
             }
             self.add_message("execution_error", mes, broadcast=False)
 
-    def execute(self, prompt, prompt_id, extra_data={}, execute_outputs=[]):
-        asyncio.run(self.execute_async(prompt, prompt_id, extra_data, execute_outputs))
+    def execute(self, prompt, prompt_id, extra_data={}, execute_outputs=[], precomputed_outputs=None):
+        asyncio.run(self.execute_async(prompt, prompt_id, extra_data, execute_outputs, precomputed_outputs))
 
-    async def execute_async(self, prompt, prompt_id, extra_data={}, execute_outputs=[]):
+    async def execute_async(self, prompt, prompt_id, extra_data={}, execute_outputs=[], precomputed_outputs=None):
         nodes.interrupt_processing(False)
 
         if "client_id" in extra_data:
@@ -668,6 +698,10 @@ class PromptExecutor:
                 await cache.set_prompt(dynamic_prompt, prompt.keys(), is_changed_cache)
                 cache.clean_unused()
 
+            # Outputs computed ahead of time, e.g. by a batched sampler run
+            for node_id, output in (precomputed_outputs or {}).items():
+                self.caches.outputs.set(node_id, output)
+
             cached_nodes = []
             for node_id in prompt:
                 if self.caches.outputs.get(node_id) is not None:
@@ -684,6 +718,8 @@ class PromptExecutor:
             current_outputs = self.caches.outputs.all_node_ids()
             for node_id in list(execute_outputs):
                 execution_list.add_node(node_id)
+            if self.residency_planner is not None:
+                self.residency_planner.begin_prompt(dynamic_prompt, execution_list)
 
             while not execution_list.is_empty():
                 node_id, error, ex = await execution_list.stage_node_execution()
@@ -701,8 +737,12 @@ class PromptExecutor:
                     execution_list.unstage_node_execution()
                 else: # result == ExecutionResult.SUCCESS:
                     execution_list.complete_node_execution()
+                    if self.residency_planner is not None:
+                        self.residency_planner.register_outputs(node_id, self.caches.outputs.get(node_id))
             else:
                 # Only execute when the while-loop ends without break
+                # Images written in the background (--async-image-writes) have to exist first
+                node_helpers.wait_for_image_writes()
                 self.add_message("execution_success", { "prompt_id": prompt_id }, broadcast=False)
 
             ui_outputs = {}
@@ -718,10 +758,29 @@ class PromptExecutor:
                 "meta": meta_outputs,
             }
             self.server.last_node_id = None
+            if self.residency_planner is not None:
+                self.residency_planner.end_prompt()
             if comfy.model_management.DISABLE_SMART_MEMORY:
                 comfy.model_management.unload_all_models()
 
 
+def get_validate_function(obj_class):
+    """
+    The custom input validation of a node class: (function name, function or
+    None, names of its arguments, whether it takes **kwargs). Inputs it takes
+    skip the built-in min, max and combo checks.
+    """
+    if issubclass(obj_class, _ComfyNodeInternal):
+        validate_function_name = "validate_inputs"
+        validate_function = first_real_override(obj_class, validate_function_name)
+    else:
+        validate_function_name = "VALIDATE_INPUTS"
+        validate_function = getattr(obj_class, validate_function_name, None)
+    if validate_function is None:
+        return validate_function_name, None, [], False
+    argspec = inspect.getfullargspec(validate_function)
+    return validate_function_name, validate_function, argspec.args, argspec.varkw is not None
+
 async def validate_inputs(prompt_id, prompt, item, validated):
     unique_id = item
     if unique_id in validated:
@@ -737,18 +796,7 @@ async def validate_inputs(prompt_id, prompt, item, validated):
     errors = []
     valid = True
 
-    validate_function_inputs = []
-    validate_has_kwargs = False
-    if issubclass(obj_class, _ComfyNodeInternal):
-        validate_function_name = "validate_inputs"
-        validate_function = first_real_override(obj_class, validate_function_name)
-    else:
-        validate_function_name = "VALIDATE_INPUTS"
-        validate_function = getattr(obj_class, validate_function_name, None)
-    if validate_function is not None:
-        argspec = inspect.getfullargspec(validate_function)
-        validate_function_inputs = argspec.args
-        validate_has_kwargs = argspec.varkw is not None
+    validate_function_name, validate_function, validate_function_inputs, validate_has_kwargs = get_validate_function(obj_class)
     received_types = {}
 
     for x in valid_inputs:
@@ -1104,6 +1152,30 @@ class PromptQueue:
             self.server.queue_updated()
             return (item, i)
 
+    def get_matching(self, match, limit, max_scan=64):
+        """Take up to limit queued items that match, in queue order, without waiting."""
+        with self.mutex:
+            taken = []
+            for item in heapq.nsmallest(max_scan, self.queue):
+                if len(taken) >= limit:
+                    break
+                if match(item):
+                    taken.append(item)
+            if len(taken) == 0:
+                return []
+
+            taken_ids = set(id(item) for item in taken)
+            self.queue = [x for x in self.queue if id(x) not in taken_ids]
+            heapq.heapify(self.queue)
+            result = []
+            for item in taken:
+                i = self.task_counter
+                self.currently_running[i] = copy.deepcopy(item)
+                self.task_counter += 1
+                result.append((item, i))
+            self.server.queue_updated()
+            return result
+
     class ExecutionStatus(NamedTuple):
         status_str: Literal['success', 'error']
         completed: bool
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
 import os
+import re
+import json
 import time
+import ctypes
+import ctypes.util
+import struct
 import mimetypes
 import logging
+import threading
+from contextlib import contextmanager
 from typing import Literal, List
 from collections.abc import Collection
 
 from comfy.cli_args import args
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
 supported_pt_extensions: set[str] = {'.ckpt', '.pt', '.pt2', '.bin', '.pth', '.safetensors', '.pkl', '.sft'}
 
 folder_names_and_paths: dict[str, tuple[list[str], set[str]]] = {}
@@ -56,6 +68,8 @@ input_directory = os.path.join(base_path, "input")
 user_directory = os.path.join(base_path, "user")
 
 filename_list_cache: dict[str, tuple[list[str], dict[str, float], float]] = {}
+# folder_index versions of the roots of each filename_list_cache entry when it was listed
+filename_list_versions: dict[str, tuple[int, ...]] = {}
 
 class CacheHelper:
     """
@@ -87,6 +101,29 @@ class CacheHelper:
 
 cache_helper = CacheHelper()
 
+# Folders read by the current thread inside record_folder_reads()
+_folder_reads = threading.local()
+
+@contextmanager
+def record_folder_reads():
+    """
+    Collect the model folders and input/output/temp directories looked up by the
+    calling thread, e.g. while a node builds its INPUT_TYPES. Pass the collected
+    entries to get_read_stamp to find out later whether their contents changed.
+    """
+    reads = set()
+    previous = getattr(_folder_reads, "reads", None)
+    _folder_reads.reads = reads
+    try:
+        yield reads
+    finally:
+        _folder_reads.reads = previous
+
+def _record_read(kind: str, name: str) -> None:
+    reads = getattr(_folder_reads, "reads", None)
+    if reads is not None:
+        reads.add((kind, name))
+
 extension_mimetypes_cache = {
     "webp" : "image",
     "fbx" : "model",
@@ -117,14 +154,17 @@ def set_input_directory(input_dir: str) -> None:
 
 def get_output_directory() -> str:
     global output_directory
+    _record_read("directory", "output")
     return output_directory
 
 def get_temp_directory() -> str:
     global temp_directory
+    _record_read("directory", "temp")
     return temp_directory
 
 def get_input_directory() -> str:
     global input_directory
+    _record_read("directory", "input")
     return input_directory
 
 def get_user_directory() -> str:
@@ -231,6 +271,7 @@ def add_model_folder_path(folder_name: str, full_folder_path: str, is_default: b
 
 def get_folder_paths(folder_name: str) -> list[str]:
     folder_name = map_legacy(folder_name)
+    _record_read("folder", folder_name)
     return folder_names_and_paths[folder_name][0][:]
 
 def recursive_search(directory: str, excluded_dir_names: list[str] | None=None) -> tuple[list[str], dict[str, float]]:
@@ -274,6 +315,220 @@ def recursive_search(directory: str, excluded_dir_names: list[str] | None=None)
     logging.debug("found {} files".format(len(result)))
     return result, dirs
 
+# inotify(7) event masks
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x01000000
+_IN_WATCH_MASK = _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR
+
+class _Inotify:
+    """Minimal inotify binding, calls on_change with the path of a changed directory, or None if events were lost."""
+    def __init__(self, on_change):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.paths: dict[int, set[str]] = {}
+        self.thread = threading.Thread(target=self.run, name="folder-watch", daemon=True)
+        self.thread.start()
+
+    def add(self, path: str) -> bool:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_WATCH_MASK)
+        if wd < 0:
+            return False
+        with self.lock:
+            self.paths.setdefault(wd, set()).add(path)
+        return True
+
+    def run(self):
+        header = struct.Struct("iIII")
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except InterruptedError:
+                continue
+            except OSError as e:
+                logging.warning("Folder watch stopped: {}".format(e))
+                self.on_change(None)
+                return
+            offset = 0
+            while offset + header.size <= len(data):
+                wd, mask, _, name_len = header.unpack_from(data, offset)
+                offset += header.size + name_len
+                if mask & _IN_Q_OVERFLOW:
+                    self.on_change(None)
+                    continue
+                with self.lock:
+                    paths = list(self.paths.get(wd, ()))
+                    if mask & _IN_IGNORED:
+                        self.paths.pop(wd, None)
+                for path in paths:
+                    self.on_change(path)
+
+class _IndexedRoot:
+    __slots__ = ("version", "listed_version", "files", "file_set", "dirs", "polled")
+
+    def __init__(self):
+        self.version = 0
+        self.listed_version = None
+        self.files: list[str] = []
+        self.file_set: set[str] = set()
+        self.dirs: dict[str, float] = {}
+        self.polled = False
+
+class FolderIndex:
+    """
+    In-memory listing of the files under model, input and output folders.
+
+    Once started, every root folder is walked once and then kept current by
+    inotify, or by a background thread comparing folder modification times
+    where inotify isn't available, so cache validation and name lookups no
+    longer touch the disk. Each root has a version that is bumped whenever
+    something under it changes. Until start() is called every call walks the
+    folder like recursive_search.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.roots: dict[str, _IndexedRoot] = {}
+        self.running = False
+        self.inotify = None
+        self.poll_interval = 2.0
+        self.poll_thread = None
+
+    def start(self, mode: str = "auto", poll_interval: float = 2.0) -> None:
+        if mode == "off" or self.running:
+            return
+        self.poll_interval = poll_interval
+        if mode == "auto":
+            try:
+                self.inotify = _Inotify(self.invalidate)
+            except (OSError, AttributeError) as e:
+                logging.info("inotify unavailable ({}), polling model and input folders instead".format(e))
+        self.running = True
+
+    def invalidate(self, path: str | None) -> None:
+        """Mark the roots containing a changed folder (or all roots for None) as out of date."""
+        if path is not None:
+            path = os.path.normpath(path)
+        with self.lock:
+            for root, indexed in self.roots.items():
+                root = os.path.normpath(root)
+                if path is None or path == root or path.startswith(root + os.sep):
+                    indexed.version += 1
+
+    def _root(self, root: str) -> _IndexedRoot:
+        indexed = self.roots.get(root)
+        if indexed is None:
+            indexed = self.roots[root] = _IndexedRoot()
+        return indexed
+
+    def versions(self, roots: list[str]) -> tuple[int, ...] | None:
+        """Current versions of some root folders, or None if the index isn't running."""
+        if not self.running:
+            return None
+        with self.lock:
+            return tuple(self._root(root).version for root in roots)
+
+    def version(self, root: str) -> int | None:
+        """Version of a root folder whose listing is up to date, or None."""
+        if not self.running:
+            return None
+        with self.lock:
+            indexed = self.roots.get(root)
+            if indexed is None or indexed.listed_version != indexed.version:
+                return None
+            return indexed.version
+
+    def search(self, root: str) -> tuple[list[str], dict[str, float]]:
+        """Like recursive_search(root, [".git"]), but only walks the folder again after it changed."""
+        if not self.running:
+            return recursive_search(root, excluded_dir_names=[".git"])
+        with self.lock:
+            indexed = self._root(root)
+            if indexed.listed_version == indexed.version:
+                return indexed.files, indexed.dirs
+            version = indexed.version
+
+        files, dirs = recursive_search(root, excluded_dir_names=[".git"])
+        polled = self.inotify is None or len(dirs) == 0
+        for path, mtime in dirs.items():
+            if polled:
+                break
+            # Returns the existing watch for folders that are already watched
+            if not self.inotify.add(path):
+                logging.info("Can't watch {}, polling it instead".format(path))
+                polled = True
+                continue
+            try:
+                # Catch changes made between the walk and the start of the watch
+                if os.path.getmtime(path) != mtime:
+                    self.invalidate(path)
+            except OSError:
+                self.invalidate(path)
+
+        with self.lock:
+            indexed.files = files
+            indexed.file_set = set(os.path.normcase(f) for f in files)
+            indexed.dirs = dirs
+            indexed.listed_version = version
+            indexed.polled = polled
+            if polled and self.poll_thread is None:
+                self.poll_thread = threading.Thread(target=self._poll_loop, name="folder-poll", daemon=True)
+                self.poll_thread.start()
+        return files, dirs
+
+    def contains(self, root: str, relative_path: str) -> bool | None:
+        """Whether a file is in an up to date listing of root, or None if the root isn't indexed."""
+        if not self.running:
+            return None
+        with self.lock:
+            indexed = self.roots.get(root)
+            if indexed is None or indexed.listed_version != indexed.version:
+                return None
+            return os.path.normcase(relative_path) in indexed.file_set
+
+    def poll(self) -> None:
+        """Check the modification times of the folders that aren't watched by inotify."""
+        with self.lock:
+            polled = [(root, indexed.dirs) for root, indexed in self.roots.items() if indexed.polled and indexed.listed_version == indexed.version]
+        for root, dirs in polled:
+            try:
+                changed = os.path.isdir(root) != (len(dirs) > 0) or any(os.path.getmtime(path) != mtime for path, mtime in dirs.items())
+            except OSError:
+                changed = True
+            if changed:
+                self.invalidate(root)
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.poll()
+            except Exception as e:
+                logging.warning("Folder poll failed: {}".format(e))
+
+folder_index = FolderIndex()
+
+def get_directory_files(directory: str) -> list[str]:
+    """Names of the files directly inside a directory, like filtering os.listdir with os.path.isfile."""
+    if not folder_index.running:
+        # Without the index a search would walk every subfolder only to drop their files
+        with os.scandir(directory) as entries:
+            return sorted(entry.name for entry in entries if entry.is_file())
+    files, _ = folder_index.search(directory)
+    return sorted(f for f in files if os.sep not in f)
+
 def filter_files_extensions(files: Collection[str], extensions: Collection[str]) -> list[str]:
     return sorted(list(filter(lambda a: os.path.splitext(a)[-1].lower() in extensions or len(extensions) == 0, files)))
 
@@ -291,6 +546,11 @@ def get_full_path(folder_name: str, filename: str) -> str | None:
     filename = os.path.relpath(os.path.join("/", filename), "/")
     for x in folders[0]:
         full_path = os.path.join(x, filename)
+        indexed = folder_index.contains(x, filename)
+        if indexed is not None:
+            if indexed:
+                return full_path
+            continue
         if os.path.isfile(full_path):
             return full_path
         elif os.path.islink(full_path):
@@ -316,7 +576,7 @@ def get_filename_list_(folder_name: str) -> tuple[list[str], dict[str, float], f
     folders = folder_names_and_paths[folder_name]
     output_folders = {}
     for x in folders[0]:
-        files, folders_all = recursive_search(x, excluded_dir_names=[".git"])
+        files, folders_all = folder_index.search(x)
         output_list.update(filter_files_extensions(files, folders[1]))
         output_folders = {**output_folders, **folders_all}
 
@@ -334,6 +594,10 @@ def cached_filename_list_(folder_name: str) -> tuple[list[str], dict[str, float]
         return None
     out = filename_list_cache[folder_name]
 
+    versions = folder_index.versions(folder_names_and_paths[folder_name][0])
+    if versions is not None:
+        return out if filename_list_versions.get(folder_name) == versions else None
+
     for x in out[1]:
         time_modified = out[1][x]
         folder = x
@@ -350,24 +614,158 @@ def cached_filename_list_(folder_name: str) -> tuple[list[str], dict[str, float]
 
 def get_filename_list(folder_name: str) -> list[str]:
     folder_name = map_legacy(folder_name)
+    _record_read("folder", folder_name)
     out = cached_filename_list_(folder_name)
     if out is None:
+        versions = folder_index.versions(folder_names_and_paths[folder_name][0]) if folder_name in folder_names_and_paths else None
         out = get_filename_list_(folder_name)
         global filename_list_cache
         filename_list_cache[folder_name] = out
+        if versions is not None:
+            filename_list_versions[folder_name] = versions
     cache_helper.set(folder_name, out)
     return list(out[0])
 
-def get_save_image_path(filename_prefix: str, output_dir: str, image_width=0, image_height=0) -> tuple[str, str, int, str, str]:
-    def map_filename(filename: str) -> tuple[int, str]:
-        prefix_len = len(os.path.basename(filename_prefix))
-        prefix = filename[:prefix_len + 1]
+def _directory_stamp(directory: str) -> tuple:
+    """Modification times of a directory and of its direct subdirectories."""
+    with os.scandir(directory) as it:
+        subdirs = sorted((entry.name, entry.stat().st_mtime_ns) for entry in it if entry.is_dir())
+    return directory, os.stat(directory).st_mtime_ns, tuple(subdirs)
+
+def get_read_stamp(read: tuple[str, str]):
+    """
+    A value that changes when the folder recorded by record_folder_reads changes,
+    or None if it can't be determined.
+    """
+    kind, name = read
+    try:
+        if kind == "folder":
+            out = cached_filename_list_(name)
+            if out is None:
+                get_filename_list(name)
+                out = filename_list_cache.get(map_legacy(name))
+            # The listing is redone whenever one of the folders changes
+            return out[2] if out is not None else None
+        if kind == "directory":
+            directory = {"input": input_directory, "output": output_directory, "temp": temp_directory}[name]
+            version = folder_index.version(directory)
+            if version is not None:
+                return version
+            return _directory_stamp(directory)
+    except (KeyError, OSError):
+        return None
+    return None
+
+# "<prefix>_<counter>" followed by "_" or the end of the name, like the files written by the save nodes
+_COUNTER_RE = re.compile(r"_(\d+)(?=_|$)")
+_RESCAN_NONE, _RESCAN_PENDING, _RESCAN_DONE = range(3)
+
+class SaveCounters:
+    """
+    Next free counter of every filename prefix in the folders get_save_image_path
+    is used on, so a save doesn't have to list the whole folder.
+
+    A folder is listed once to seed the counters of all its prefixes. After that
+    a reservation only checks that the next counter isn't taken on disk yet, to
+    notice files written by other programs. Where fcntl is available,
+    reservations are also recorded under an exclusive lock in a small file in
+    the folder, so processes sharing an output folder never hand out the same
+    counter before the files are written.
+    """
+    STATE_FILE = ".comfyui_counters.json"
+    # Seconds a reservation made by another process is remembered
+    STATE_TTL = 3600
+    MAX_SUFFIXES = 4
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # folder -> normcase(prefix) -> [next counter, suffixes seen after the counter, rescan state]
+        self.folders: dict[str, dict[str, list]] = {}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.folders.clear()
+
+    def _scan(self, folder: str) -> dict[str, list]:
+        prefixes = {}
+        for name in os.listdir(folder):
+            for m in _COUNTER_RE.finditer(name):
+                entry = prefixes.setdefault(os.path.normcase(name[:m.start()]), [1, set(), _RESCAN_NONE])
+                entry[0] = max(entry[0], int(m.group(1)) + 1)
+                if len(entry[1]) < self.MAX_SUFFIXES:
+                    entry[1].add(name[m.end():])
+        return prefixes
+
+    @contextmanager
+    def _shared_state(self, folder: str):
+        if fcntl is None:
+            if not os.path.isdir(folder):
+                raise FileNotFoundError(folder)
+            yield {}
+            return
+        try:
+            fd = os.open(os.path.join(folder, self.STATE_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        except (FileNotFoundError, NotADirectoryError):
+            raise
+        except OSError:
+            # Read only output folder, nothing else can write to it either
+            yield {}
+            return
         try:
-            digits = int(filename[prefix_len + 1:].split('_')[0])
-        except:
-            digits = 0
-        return digits, prefix
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = b""
+            while chunk := os.read(fd, 65536):
+                data += chunk
+            now = time.time()
+            try:
+                state = {k: v for k, v in json.loads(data).items() if now - v[1] < self.STATE_TTL}
+            except (ValueError, TypeError, AttributeError, IndexError):
+                state = {}
+            yield state
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, json.dumps(state).encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def reserve(self, folder: str, prefix: str, count: int = 1) -> int:
+        """Reserve count consecutive counters for files named <prefix>_<counter> in folder and return the first."""
+        folder = os.path.normpath(folder)
+        key = os.path.normcase(prefix)
+        with self.lock, self._shared_state(folder) as state:
+            prefixes = self.folders.get(folder)
+            if prefixes is None:
+                prefixes = self.folders[folder] = self._scan(folder)
+            entry = prefixes.setdefault(key, [1, set(), _RESCAN_NONE])
+            if entry[2] == _RESCAN_PENDING:
+                # Counters were handed out for a prefix without files, list the
+                # folder once more to learn how the files were named
+                scanned = self._scan(folder).get(key)
+                if scanned is not None:
+                    entry[0] = max(entry[0], scanned[0])
+                    entry[1] = scanned[1]
+                entry[2] = _RESCAN_DONE
+
+            counter = entry[0]
+            if key in state:
+                counter = max(counter, state[key][0])
+            while any(os.path.lexists(os.path.join(folder, f"{prefix}_{counter:05}{suffix}")) for suffix in entry[1]):
+                counter += 1
+            entry[0] = counter + count
+            if len(entry[1]) == 0 and entry[2] == _RESCAN_NONE:
+                entry[2] = _RESCAN_PENDING
+            state[key] = [entry[0], time.time()]
+        return counter
+
+save_counters = SaveCounters()
+
+def get_save_image_path(filename_prefix: str, output_dir: str, image_width=0, image_height=0, count: int = 1) -> tuple[str, str, int, str, str]:
+    """
+    Resolve a filename prefix to the output folder, filename and first free counter.
 
+    The counter and the count - 1 following ones are reserved for the caller, pass
+    count when saving a batch as <filename>_<counter>_, <filename>_<counter + 1>_ etc.
+    """
     def compute_vars(input: str, image_width: int, image_height: int) -> str:
         input = input.replace("%width%", str(image_width))
         input = input.replace("%height%", str(image_height))
@@ -397,12 +795,10 @@ def get_save_image_path(filename_prefix: str, output_dir: str, image_width=0, im
         raise Exception(err)
 
     try:
-        counter = max(filter(lambda a: os.path.normcase(a[1][:-1]) == os.path.normcase(filename) and a[1][-1] == "_", map(map_filename, os.listdir(full_output_folder))))[0] + 1
-    except ValueError:
-        counter = 1
+        counter = save_counters.reserve(full_output_folder, filename, count)
     except FileNotFoundError:
         os.makedirs(full_output_folder, exist_ok=True)
-        counter = 1
+        counter = save_counters.reserve(full_output_folder, filename, count)
     return full_output_folder, filename, counter, subfolder, filename_prefix
 
 def get_input_subfolders() -> list[str]:
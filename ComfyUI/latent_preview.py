@@ -6,6 +6,8 @@ import comfy.model_management
 import folder_paths
 import comfy.utils
 import logging
+import threading
+import time
 
 MAX_PREVIEW_RESOLUTION = args.preview_size
 
@@ -59,20 +61,36 @@ class Latent2RGBPreviewer(LatentPreviewer):
         return preview_to_image(latent_image)
 
 
+# (method, latent format, decoder path, device) -> previewer, so TAESD isn't reloaded for every sampler call.
+# Only the previewer for the latest key is kept so an unused TAESD decoder doesn't hold on to VRAM.
+_previewer_cache = {}
+_previewer_cache_lock = threading.Lock()
+
 def get_previewer(device, latent_format):
-    previewer = None
     method = args.preview_method
+    if method == LatentPreviewMethod.NoPreviews:
+        return None
+
+    taesd_decoder_path = None
+    if latent_format.taesd_decoder_name is not None:
+        taesd_decoder_path = next(
+            (fn for fn in folder_paths.get_filename_list("vae_approx")
+                if fn.startswith(latent_format.taesd_decoder_name)),
+            ""
+        )
+        taesd_decoder_path = folder_paths.get_full_path("vae_approx", taesd_decoder_path)
+
+    key = (method, type(latent_format), taesd_decoder_path, str(device))
+    with _previewer_cache_lock:
+        if key not in _previewer_cache:
+            _previewer_cache.clear()
+            _previewer_cache[key] = create_previewer(device, latent_format, method, taesd_decoder_path)
+        return _previewer_cache[key]
+
+def create_previewer(device, latent_format, method, taesd_decoder_path):
+    previewer = None
     if method != LatentPreviewMethod.NoPreviews:
         # TODO previewer methods
-        taesd_decoder_path = None
-        if latent_format.taesd_decoder_name is not None:
-            taesd_decoder_path = next(
-                (fn for fn in folder_paths.get_filename_list("vae_approx")
-                    if fn.startswith(latent_format.taesd_decoder_name)),
-                ""
-            )
-            taesd_decoder_path = folder_paths.get_full_path("vae_approx", taesd_decoder_path)
-
         if method == LatentPreviewMethod.Auto:
             method = LatentPreviewMethod.Latent2RGB
 
@@ -88,12 +106,31 @@ def get_previewer(device, latent_format):
                 previewer = Latent2RGBPreviewer(latent_format.latent_rgb_factors, latent_format.latent_rgb_factors_bias)
     return previewer
 
+class PreviewPolicy:
+    """Decides on which sampling steps a preview is decoded: every N steps and at most every M seconds."""
+
+    def __init__(self, step_interval=1, min_interval=0.0):
+        self.step_interval = max(step_interval, 1)
+        self.min_interval = min_interval
+        self.last_preview = None
+
+    def should_preview(self, step, total_steps):
+        # The last step is always previewed so the node shows where sampling ended
+        if step + 1 < total_steps:
+            if step % self.step_interval != 0:
+                return False
+            if self.last_preview is not None and time.monotonic() - self.last_preview < self.min_interval:
+                return False
+        self.last_preview = time.monotonic()
+        return True
+
 def prepare_callback(model, steps, x0_output_dict=None):
     preview_format = "JPEG"
     if preview_format not in ["JPEG", "PNG"]:
         preview_format = "JPEG"
 
     previewer = get_previewer(model.load_device, model.model.latent_format)
+    policy = PreviewPolicy(args.preview_step_interval, args.preview_min_interval / 1000.0)
 
     pbar = comfy.utils.ProgressBar(steps)
     def callback(step, x0, x, total_steps):
@@ -101,7 +138,7 @@ def prepare_callback(model, steps, x0_output_dict=None):
             x0_output_dict["x0"] = x0
 
         preview_bytes = None
-        if previewer:
+        if previewer and policy.should_preview(step, total_steps):
             preview_bytes = previewer.decode_latent_to_preview_image(preview_format, x0)
         pbar.update_absolute(step + 1, total_steps, preview_bytes)
     return callback
@@ -101,6 +101,7 @@ def execute_prestartup_script():
         logging.info("")
 
 apply_custom_paths()
+folder_paths.folder_index.start(args.folder_watch, args.folder_poll_interval)
 execute_prestartup_script()
 
 
@@ -172,8 +173,35 @@ def prompt_worker(q, server_instance):
         cache_type = execution.CacheType.LRU
     elif args.cache_none:
         cache_type = execution.CacheType.DEPENDENCY_AWARE
+    elif args.cache_ram > 0:
+        cache_type = execution.CacheType.RAM_BUDGET
+
+    if args.cache_vram > 0 and cache_type != execution.CacheType.RAM_BUDGET:
+        logging.warning("--cache-vram only applies together with --cache-ram, it is ignored.")
+
+    disk_cache = None
+    if args.disk_cache_dir is not None:
+        from comfy_execution.disk_cache import DiskCache, DEFAULT_DISK_CACHE_NODES
+        disk_cache = DiskCache(args.disk_cache_dir, int(args.disk_cache_size * 1024 * 1024 * 1024), class_types=args.disk_cache_nodes or DEFAULT_DISK_CACHE_NODES)
+        logging.info("Using disk cache in {} ({} GB)".format(args.disk_cache_dir, args.disk_cache_size))
+
+    gb = 1024 * 1024 * 1024
+    e = execution.PromptExecutor(server_instance, cache_type=cache_type, cache_size=args.cache_lru, disk_cache=disk_cache,
+                                 ram_budget=int(args.cache_ram * gb), vram_budget=int(args.cache_vram * gb))
+    server_instance.prompt_executor = e
+
+    if args.residency_planner:
+        from comfy_execution.residency import ResidencyPlanner
+        e.residency_planner = ResidencyPlanner(q)
+        comfy.model_management.residency_planner = e.residency_planner
+        logging.info("Unloading models by their predicted next use")
+
+    batcher = None
+    if args.batch_prompts > 1:
+        from comfy_execution.batching import PromptBatcher
+        batcher = PromptBatcher(args.batch_prompts)
+        logging.info("Batching the sampling of up to {} compatible prompts".format(batcher.max_batch))
 
-    e = execution.PromptExecutor(server_instance, cache_type=cache_type, cache_size=args.cache_lru)
     last_gc_collect = 0
     need_gc = False
     gc_collect_interval = 10.0
@@ -185,31 +213,38 @@ def prompt_worker(q, server_instance):
 
         queue_item = q.get(timeout=timeout)
         if queue_item is not None:
-            item, item_id = queue_item
-            execution_start_time = time.perf_counter()
-            prompt_id = item[1]
-            server_instance.last_prompt_id = prompt_id
-
-            e.execute(item[2], prompt_id, item[3], item[4])
-            need_gc = True
-            q.task_done(item_id,
-                        e.history_result,
-                        status=execution.PromptQueue.ExecutionStatus(
-                            status_str='success' if e.success else 'error',
-                            completed=e.success,
-                            messages=e.status_messages))
-            if server_instance.client_id is not None:
-                server_instance.send_sync("executing", {"node": None, "prompt_id": prompt_id}, server_instance.client_id)
-
-            current_time = time.perf_counter()
-            execution_time = current_time - execution_start_time
-
-            # Log Time in a more readable way after 10 minutes
-            if execution_time > 600:
-                execution_time = time.strftime("%H:%M:%S", time.gmtime(execution_time))
-                logging.info(f"Prompt executed in {execution_time}")
-            else:
-                logging.info("Prompt executed in {:.2f} seconds".format(execution_time))
+            batch = [queue_item]
+            precomputed_outputs = {}
+            if batcher is not None:
+                batch += batcher.take_compatible(q, queue_item[0])
+                if len(batch) > 1:
+                    precomputed_outputs = batcher.sample(e, [item for item, _ in batch])
+
+            for item, item_id in batch:
+                execution_start_time = time.perf_counter()
+                prompt_id = item[1]
+                server_instance.last_prompt_id = prompt_id
+
+                e.execute(item[2], prompt_id, item[3], item[4], precomputed_outputs=precomputed_outputs.get(prompt_id))
+                need_gc = True
+                q.task_done(item_id,
+                            e.history_result,
+                            status=execution.PromptQueue.ExecutionStatus(
+                                status_str='success' if e.success else 'error',
+                                completed=e.success,
+                                messages=e.status_messages))
+                if server_instance.client_id is not None:
+                    server_instance.send_sync("executing", {"node": None, "prompt_id": prompt_id}, server_instance.client_id)
+
+                current_time = time.perf_counter()
+                execution_time = current_time - execution_start_time
+
+                # Log Time in a more readable way after 10 minutes
+                if execution_time > 600:
+                    execution_time = time.strftime("%H:%M:%S", time.gmtime(execution_time))
+                    logging.info(f"Prompt executed in {execution_time}")
+                else:
+                    logging.info("Prompt executed in {:.2f} seconds".format(execution_time))
 
         flags = q.get_flags()
         free_memory = flags.get("free_memory", False)
@@ -224,6 +259,13 @@ def prompt_worker(q, server_instance):
             need_gc = True
             last_gc_collect = 0
 
+        if e.residency_planner is not None and not flags.get("unload_models", free_memory) and q.get_tasks_remaining() > 0:
+            # Idle gap before the next prompt: load the model it needs first
+            try:
+                e.residency_planner.prestage()
+            except Exception:
+                logging.exception("Pre-loading the next model failed")
+
         if need_gc:
             current_time = time.perf_counter()
             if (current_time - last_gc_collect) > gc_collect_interval:
@@ -325,6 +367,10 @@ def start_comfyui(asyncio_loop=None):
     prompt_server.add_routes()
     hijack_progress(prompt_server)
 
+    if nodes.NODE_INDEX is not None:
+        nodes.NODE_INDEX.update_info(nodes.NODE_CLASS_MAPPINGS, server.node_info)
+        nodes.NODE_INDEX.save()
+
     threading.Thread(target=prompt_worker, daemon=True, args=(prompt_server.prompt_queue, prompt_server,)).start()
 
     if args.quick_test_for_ci:
@@ -1,9 +1,14 @@
 import hashlib
+import logging
+import os
+import threading
+import concurrent.futures
+import numpy as np
 import torch
 
 from comfy.cli_args import args
 
-from PIL import ImageFile, UnidentifiedImageError
+from PIL import Image, ImageFile, UnidentifiedImageError
 
 def conditioning_set_values(conditioning, values={}, append=False):
     c = []
@@ -58,3 +63,69 @@ def image_alpha_fix(destination, source):
         destination = torch.nn.functional.pad(destination, (0, 1))
         destination[..., -1] = 1.0
     return destination, source
+
+def images_to_uint8(images):
+    """Convert a batch of IMAGE tensors, or a list of them, to uint8 arrays in a single pass."""
+    if isinstance(images, torch.Tensor):
+        return list(np.clip(255. * images.cpu().numpy(), 0, 255).astype(np.uint8))
+    return [np.clip(255. * image.cpu().numpy(), 0, 255).astype(np.uint8) for image in images]
+
+_image_save_pool = None
+_pending_image_writes = {}
+_pending_image_writes_lock = threading.Lock()
+
+def _get_image_save_pool():
+    global _image_save_pool
+    if _image_save_pool is None:
+        threads = args.image_save_threads or min(8, os.cpu_count() or 1)
+        _image_save_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="image-save")
+    return _image_save_pool
+
+def _write_png(image, path, pnginfo, compress_level):
+    Image.fromarray(image).save(path, pnginfo=pnginfo, compress_level=compress_level)
+
+def _image_write_done(path, future):
+    with _pending_image_writes_lock:
+        if _pending_image_writes.get(path) is future:
+            del _pending_image_writes[path]
+    if future.exception() is not None:
+        logging.error("Failed to write {}: {}".format(path, future.exception()))
+
+def save_png_batch(images, paths, pnginfo=None, compress_level=4):
+    """
+    Save a batch of IMAGE tensors as PNGs, the same bytes as saving them one by one with PIL.
+
+    The images are converted to uint8 together and encoded on a thread pool (zlib
+    releases the GIL). With --async-image-writes this returns before the files are
+    written, see wait_for_image_writes.
+    """
+    arrays = images_to_uint8(images)
+    if len(arrays) == 1 and not args.async_image_writes:
+        _write_png(arrays[0], paths[0], pnginfo, compress_level)
+        return
+
+    pool = _get_image_save_pool()
+    futures = []
+    for image, path in zip(arrays, paths):
+        future = pool.submit(_write_png, image, path, pnginfo, compress_level)
+        if args.async_image_writes:
+            path = os.path.normpath(path)
+            with _pending_image_writes_lock:
+                _pending_image_writes[path] = future
+            future.add_done_callback(lambda f, path=path: _image_write_done(path, f))
+        futures.append(future)
+
+    if not args.async_image_writes:
+        for future in futures:
+            future.result()
+
+def pending_image_write(path):
+    """The future of a PNG that is still being written in the background, or None."""
+    with _pending_image_writes_lock:
+        return _pending_image_writes.get(os.path.normpath(path))
+
+def wait_for_image_writes():
+    """Block until all the PNGs written in the background are on disk."""
+    with _pending_image_writes_lock:
+        futures = list(_pending_image_writes.values())
+    concurrent.futures.wait(futures)
@@ -12,6 +12,8 @@ import math
 import time
 import random
 import logging
+import asyncio
+import threading
 
 from PIL import Image, ImageOps, ImageSequence
 from PIL.PngImagePlugin import PngInfo
@@ -42,6 +44,7 @@ import importlib
 import folder_paths
 import latent_preview
 import node_helpers
+from comfy_execution.node_index import LazyNodeMappings, NodeIndex, LazyNode
 
 def before_node_execution():
     comfy.model_management.throw_exception_if_processing_interrupted()
@@ -508,7 +511,7 @@ class LoadLatent:
     @classmethod
     def INPUT_TYPES(s):
         input_dir = folder_paths.get_input_directory()
-        files = [f for f in os.listdir(input_dir) if os.path.isfile(os.path.join(input_dir, f)) and f.endswith(".latent")]
+        files = [f for f in folder_paths.get_directory_files(input_dir) if f.endswith(".latent")]
         return {"required": {"latent": [sorted(files), ]}, }
 
     CATEGORY = "_for_testing"
@@ -637,9 +640,6 @@ class CLIPSetLastLayer:
         return (clip,)
 
 class LoraLoader:
-    def __init__(self):
-        self.loaded_lora = None
-
     @classmethod
     def INPUT_TYPES(s):
         return {
@@ -664,18 +664,7 @@ class LoraLoader:
             return (model, clip)
 
         lora_path = folder_paths.get_full_path_or_raise("loras", lora_name)
-        lora = None
-        if self.loaded_lora is not None:
-            if self.loaded_lora[0] == lora_path:
-                lora = self.loaded_lora[1]
-            else:
-                self.loaded_lora = None
-
-        if lora is None:
-            lora = comfy.utils.load_torch_file(lora_path, safe_load=True)
-            self.loaded_lora = (lora_path, lora)
-
-        model_lora, clip_lora = comfy.sd.load_lora_for_models(model, clip, lora, strength_model, strength_clip)
+        model_lora, clip_lora = comfy.sd.load_lora_for_models(model, clip, lora_path, strength_model, strength_clip)
         return (model_lora, clip_lora)
 
 class LoraLoaderModelOnly(LoraLoader):
@@ -1583,23 +1572,22 @@ class SaveImage:
 
     def save_images(self, images, filename_prefix="ComfyUI", prompt=None, extra_pnginfo=None):
         filename_prefix += self.prefix_append
-        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(filename_prefix, self.output_dir, images[0].shape[1], images[0].shape[0])
-        results = list()
-        for (batch_number, image) in enumerate(images):
-            i = 255. * image.cpu().numpy()
-            img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-            metadata = None
-            if not args.disable_metadata:
-                metadata = PngInfo()
-                if prompt is not None:
-                    metadata.add_text("prompt", json.dumps(prompt))
-                if extra_pnginfo is not None:
-                    for x in extra_pnginfo:
-                        metadata.add_text(x, json.dumps(extra_pnginfo[x]))
+        full_output_folder, filename, counter, subfolder, filename_prefix = folder_paths.get_save_image_path(filename_prefix, self.output_dir, images[0].shape[1], images[0].shape[0], count=len(images))
+        metadata = None
+        if not args.disable_metadata:
+            metadata = PngInfo()
+            if prompt is not None:
+                metadata.add_text("prompt", json.dumps(prompt))
+            if extra_pnginfo is not None:
+                for x in extra_pnginfo:
+                    metadata.add_text(x, json.dumps(extra_pnginfo[x]))
 
+        results = list()
+        paths = list()
+        for batch_number in range(len(images)):
             filename_with_batch_num = filename.replace("%batch_num%", str(batch_number))
             file = f"{filename_with_batch_num}_{counter:05}_.png"
-            img.save(os.path.join(full_output_folder, file), pnginfo=metadata, compress_level=self.compress_level)
+            paths.append(os.path.join(full_output_folder, file))
             results.append({
                 "filename": file,
                 "subfolder": subfolder,
@@ -1607,6 +1595,7 @@ class SaveImage:
             })
             counter += 1
 
+        node_helpers.save_png_batch(images, paths, pnginfo=metadata, compress_level=self.compress_level)
         return { "ui": { "images": results } }
 
 class PreviewImage(SaveImage):
@@ -1627,7 +1616,7 @@ class LoadImage:
     @classmethod
     def INPUT_TYPES(s):
         input_dir = folder_paths.get_input_directory()
-        files = [f for f in os.listdir(input_dir) if os.path.isfile(os.path.join(input_dir, f))]
+        files = folder_paths.get_directory_files(input_dir)
         files = folder_paths.filter_files_content_types(files, ["image"])
         return {"required":
                     {"image": (sorted(files), {"image_upload": True})},
@@ -1704,7 +1693,7 @@ class LoadImageMask:
     @classmethod
     def INPUT_TYPES(s):
         input_dir = folder_paths.get_input_directory()
-        files = [f for f in os.listdir(input_dir) if os.path.isfile(os.path.join(input_dir, f))]
+        files = folder_paths.get_directory_files(input_dir)
         return {"required":
                     {"image": (sorted(files), {"image_upload": True}),
                      "channel": (s._color_channels, ), }
@@ -2009,6 +1998,23 @@ NODE_CLASS_MAPPINGS = {
     "LoraLoaderModelOnly": LoraLoaderModelOnly,
 }
 
+# Lets --lazy-node-loading register placeholders that import their module on first use.
+# Without the flag the mapping stays a plain dict.
+if args.lazy_node_loading:
+    NODE_CLASS_MAPPINGS = LazyNodeMappings(NODE_CLASS_MAPPINGS)
+
+# Nodes only used in prompts the executor builds itself (like the batched
+# sampling prompt). They are not listed in /object_info and don't pass prompt
+# validation, so clients can't queue them.
+INTERNAL_NODE_CLASS_MAPPINGS = {}
+
+def get_node_class(class_type):
+    """The class of a node in a prompt that is being executed, internal nodes included."""
+    class_def = INTERNAL_NODE_CLASS_MAPPINGS.get(class_type)
+    if class_def is not None:
+        return class_def
+    return NODE_CLASS_MAPPINGS[class_type]
+
 NODE_DISPLAY_NAME_MAPPINGS = {
     # Sampling
     "KSampler": "KSampler",
@@ -2083,6 +2089,9 @@ EXTENSION_WEB_DIRS = {}
 # Dictionary of successfully loaded module names and associated directories.
 LOADED_MODULE_DIRS = {}
 
+# Index of node modules when --lazy-node-loading is enabled
+NODE_INDEX: NodeIndex | None = None
+
 
 def get_module_name(module_path: str) -> str:
     """
@@ -2201,6 +2210,128 @@ async def load_custom_node(module_path: str, ignore=set(), module_parent="custom
         logging.warning(f"Cannot import {module_path} module for custom nodes: {e}")
         return False
 
+def _count_routes():
+    server_module = sys.modules.get("server")
+    if server_module is None or getattr(server_module.PromptServer, "instance", None) is None:
+        return 0
+    return len(server_module.PromptServer.instance.routes)
+
+async def load_node_module(module_path: str, ignore=set(), module_parent="custom_nodes") -> bool:
+    """
+    Load a node module, or with --lazy-node-loading register placeholders for
+    its nodes if the index has an up to date entry for it.
+    """
+    if NODE_INDEX is None:
+        return await load_custom_node(module_path, ignore, module_parent=module_parent)
+
+    entry = NODE_INDEX.get_fresh(module_path)
+    if entry is not None:
+        placeholder = LazyNode(os.path.abspath(module_path))
+        for name in entry["nodes"]:
+            if name not in ignore:
+                NODE_CLASS_MAPPINGS[name] = placeholder
+                NODE_INDEX.deferred += 1
+        NODE_DISPLAY_NAME_MAPPINGS.update({k: v for k, v in entry["display_names"].items() if k not in ignore})
+        return True
+
+    nodes_before = dict.copy(NODE_CLASS_MAPPINGS)
+    display_before = dict(NODE_DISPLAY_NAME_MAPPINGS)
+    web_dirs_before = len(EXTENSION_WEB_DIRS)
+    routes_before = _count_routes()
+    time_before = time.perf_counter()
+    success = await load_custom_node(module_path, ignore, module_parent=module_parent)
+    import_time = time.perf_counter() - time_before
+
+    added = [name for name, node_cls in dict.items(NODE_CLASS_MAPPINGS) if nodes_before.get(name) is not node_cls]
+    display_names = {k: v for k, v in NODE_DISPLAY_NAME_MAPPINGS.items() if display_before.get(k) != v}
+    # Modules that add web extensions or routes have to be imported before the server starts
+    eager = not success or len(EXTENSION_WEB_DIRS) != web_dirs_before or _count_routes() != routes_before
+    NODE_INDEX.record(module_path, module_parent, added, display_names, eager, import_time)
+    NODE_INDEX.import_times[os.path.abspath(module_path)] = (import_time, "eager" if eager else "indexed")
+    return success
+
+# module path -> threading.Event set once a lazy import of the module finished
+_lazy_imports = {}
+# .chain: the module paths whose lazy import the current thread is running, outermost first
+_lazy_import_state = threading.local()
+
+def _run_coroutine_sync(coro, import_chain=()):
+    """
+    Run a coroutine to completion from synchronous code.
+
+    Lazy modules are imported on the first lookup of one of their node
+    classes. Outside an event loop that happens on the calling thread. Inside
+    a running event loop (prompt validation in the server) asyncio.run can't
+    be nested, so the import runs on its own event loop in a helper thread
+    while the calling thread, and with it the server's event loop, waits for
+    it, as it would for any synchronous import. Modules that need the
+    server's loop at import time because they add routes or web extensions
+    are recorded as eager and never take this path.
+
+    import_chain is made visible to lookups done by the import, on whichever
+    thread it runs, so a module doesn't wait for its own import.
+    """
+    def run():
+        previous = getattr(_lazy_import_state, "chain", ())
+        _lazy_import_state.chain = import_chain
+        try:
+            return asyncio.run(coro)
+        finally:
+            _lazy_import_state.chain = previous
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return run()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(run()))
+    thread.start()
+    thread.join()
+    return result[0] if result else False
+
+def load_lazy_node_module(module_path: str, class_type: str):
+    """Import a module whose nodes were registered as placeholders."""
+    import hook_breaker_ac10a0
+
+    chain = getattr(_lazy_import_state, "chain", ())
+    with NODE_INDEX.lock:
+        if not NODE_CLASS_MAPPINGS.is_lazy(class_type):
+            return
+        if module_path in chain:
+            # Looked up while importing the module itself, its classes don't exist yet
+            return
+        importing = _lazy_imports.get(module_path)
+        if importing is None:
+            importing = _lazy_imports[module_path] = threading.Event()
+            entry = NODE_INDEX.modules[module_path]
+            # Everything except this module's own nodes was registered by someone else
+            ignore = set(NODE_CLASS_MAPPINGS.keys()) - set(entry["nodes"])
+        else:
+            entry = None
+
+    if entry is None:
+        # Another thread is importing the module. The lock isn't held while
+        # waiting, so that import can itself load other lazy modules.
+        importing.wait()
+        return
+
+    success = False
+    time_before = time.perf_counter()
+    hook_breaker_ac10a0.save_functions()
+    try:
+        success = _run_coroutine_sync(load_custom_node(module_path, ignore, module_parent=entry["parent"]), chain + (module_path,))
+    finally:
+        hook_breaker_ac10a0.restore_functions()
+        with NODE_INDEX.lock:
+            # Don't retry a module that failed to import, its nodes are gone
+            for name in entry["nodes"]:
+                if NODE_CLASS_MAPPINGS.is_lazy(name):
+                    dict.pop(NODE_CLASS_MAPPINGS, name, None)
+            del _lazy_imports[module_path]
+        importing.set()
+    import_time = time.perf_counter() - time_before
+    logging.info("Imported {} for {} in {:.2f} seconds{}".format(module_path, class_type, import_time, "" if success else " (IMPORT FAILED)"))
+
 async def init_external_custom_nodes():
     """
     Initializes the external custom nodes.
@@ -2227,7 +2358,7 @@ async def init_external_custom_nodes():
                 logging.info(f"Skipping {possible_module} due to disable_all_custom_nodes and whitelist_custom_nodes")
                 continue
             time_before = time.perf_counter()
-            success = await load_custom_node(module_path, base_node_names, module_parent="custom_nodes")
+            success = await load_node_module(module_path, base_node_names, module_parent="custom_nodes")
             node_import_times.append((time.perf_counter() - time_before, module_path, success))
 
     if len(node_import_times) > 0:
@@ -2329,7 +2460,7 @@ async def init_builtin_extra_nodes():
 
     import_failed = []
     for node_file in extras_files:
-        if not await load_custom_node(os.path.join(extras_dir, node_file), module_parent="comfy_extras"):
+        if not await load_node_module(os.path.join(extras_dir, node_file), module_parent="comfy_extras"):
             import_failed.append(node_file)
 
     return import_failed
@@ -2363,7 +2494,7 @@ async def init_builtin_api_nodes():
 
     import_failed = []
     for node_file in api_nodes_files:
-        if not await load_custom_node(os.path.join(api_nodes_dir, node_file), module_parent="comfy_api_nodes"):
+        if not await load_node_module(os.path.join(api_nodes_dir, node_file), module_parent="comfy_api_nodes"):
             import_failed.append(node_file)
 
     return import_failed
@@ -2376,9 +2507,19 @@ async def init_public_apis():
         ) for v in supported_versions
     ])
 
+def init_node_index():
+    global NODE_INDEX
+    from comfyui_version import __version__
+    path = args.node_index_path or os.path.join(folder_paths.get_user_directory(), "node_index.json")
+    NODE_INDEX = NodeIndex(path, "{} {}".format(__version__, sys.version))
+    NODE_CLASS_MAPPINGS.loader = load_lazy_node_module
+
 async def init_extra_nodes(init_custom_nodes=True, init_api_nodes=True):
     await init_public_apis()
 
+    if args.lazy_node_loading:
+        init_node_index()
+
     import_failed = await init_builtin_extra_nodes()
 
     import_failed_api = []
@@ -2390,6 +2531,9 @@ async def init_extra_nodes(init_custom_nodes=True, init_api_nodes=True):
     else:
         logging.info("Skipping loading of custom nodes")
 
+    if NODE_INDEX is not None:
+        NODE_INDEX.log_import_times()
+
     if len(import_failed_api) > 0:
         logging.warning("WARNING: some comfy_api_nodes/ nodes did not import correctly. This may be because they are missing some dependencies.\n")
         for node in import_failed_api:
@@ -26,6 +26,8 @@ import mimetypes
 from comfy.cli_args import args
 import comfy.utils
 import comfy.model_management
+import comfy.lora_cache
+import comfy.patched_weight_cache
 from comfy_api import feature_flags
 import node_helpers
 from comfyui_version import __version__
@@ -35,6 +37,7 @@ from comfy_api.internal import _ComfyNodeInternal
 from app.user_manager import UserManager
 from app.model_manager import ModelFileManager
 from app.custom_node_manager import CustomNodeManager
+from app.object_info_cache import ObjectInfoCache, etag_matches
 from typing import Optional, Union
 from api_server.routes.internal.internal_routes import InternalRoutes
 from protocol import BinaryEventTypes
@@ -56,6 +59,9 @@ async def compress_body(request: web.Request, handler):
         return response
     if response.content_type not in ["application/json", "text/plain"]:
         return response
+    if "Content-Encoding" in response.headers:
+        # Already encoded by the handler
+        return response
     if response.body and "gzip" in accept_encoding:
         response.enable_compression()
     return response
@@ -140,6 +146,59 @@ def create_origin_only_middleware():
 
     return origin_only_middleware
 
+def node_info(node_class):
+    """The /object_info schema of a node class."""
+    obj_class = nodes.NODE_CLASS_MAPPINGS[node_class]
+    if issubclass(obj_class, _ComfyNodeInternal):
+        info = obj_class.GET_NODE_INFO_V1()
+    else:
+        info = v1_node_info(node_class, obj_class)
+    # Lets clients validating prompts locally skip the checks the node does itself
+    _, validate_function, validate_function_inputs, validate_has_kwargs = execution.get_validate_function(obj_class)
+    if validate_function is not None:
+        info['validate_inputs'] = {"inputs": list(validate_function_inputs), "kwargs": validate_has_kwargs}
+    return info
+
+def v1_node_info(node_class, obj_class):
+    info = {}
+    info['input'] = obj_class.INPUT_TYPES()
+    info['input_order'] = {key: list(value.keys()) for (key, value) in info['input'].items()}
+    info['output'] = obj_class.RETURN_TYPES
+    info['output_is_list'] = obj_class.OUTPUT_IS_LIST if hasattr(obj_class, 'OUTPUT_IS_LIST') else [False] * len(obj_class.RETURN_TYPES)
+    info['output_name'] = obj_class.RETURN_NAMES if hasattr(obj_class, 'RETURN_NAMES') else info['output']
+    info['name'] = node_class
+    info['display_name'] = nodes.NODE_DISPLAY_NAME_MAPPINGS[node_class] if node_class in nodes.NODE_DISPLAY_NAME_MAPPINGS.keys() else node_class
+    info['description'] = obj_class.DESCRIPTION if hasattr(obj_class,'DESCRIPTION') else ''
+    info['python_module'] = getattr(obj_class, "RELATIVE_PYTHON_MODULE", "nodes")
+    info['category'] = 'sd'
+    if hasattr(obj_class, 'OUTPUT_NODE') and obj_class.OUTPUT_NODE == True:
+        info['output_node'] = True
+    else:
+        info['output_node'] = False
+
+    if hasattr(obj_class, 'CATEGORY'):
+        info['category'] = obj_class.CATEGORY
+
+    if hasattr(obj_class, 'OUTPUT_TOOLTIPS'):
+        info['output_tooltips'] = obj_class.OUTPUT_TOOLTIPS
+
+    if getattr(obj_class, "DEPRECATED", False):
+        info['deprecated'] = True
+    if getattr(obj_class, "EXPERIMENTAL", False):
+        info['experimental'] = True
+
+    if hasattr(obj_class, 'API_NODE'):
+        info['api_node'] = obj_class.API_NODE
+    return info
+
+def cached_node_info(node_class):
+    """Like node_info, but served from the --lazy-node-loading index if the node's module isn't imported yet."""
+    if nodes.NODE_INDEX is not None and nodes.NODE_CLASS_MAPPINGS.is_lazy(node_class):
+        info = nodes.NODE_INDEX.cached_info(node_class)
+        if info is not None:
+            return info
+    return node_info(node_class)
+
 class PromptServer():
     def __init__(self, loop):
         PromptServer.instance = self
@@ -151,6 +210,7 @@ class PromptServer():
         self.user_manager = UserManager()
         self.model_file_manager = ModelFileManager()
         self.custom_node_manager = CustomNodeManager()
+        self.object_info_cache = ObjectInfoCache(nodes.NODE_CLASS_MAPPINGS, cached_node_info)
         self.internal_routes = InternalRoutes(self)
         self.supports = ["custom_nodes_from_web"]
         self.prompt_queue = execution.PromptQueue(self)
@@ -182,6 +242,8 @@ class PromptServer():
         self.routes = routes
         self.last_node_id = None
         self.client_id = None
+        # Set by the prompt worker so cache stats can be reported
+        self.prompt_executor = None
 
         self.on_prompt_handlers = []
 
@@ -356,6 +418,8 @@ class PromptServer():
                     else:
                         with open(filepath, "wb") as f:
                             f.write(image.file.read())
+                    # Don't wait for the folder watch to see the new file
+                    folder_paths.folder_index.invalidate(full_output_folder)
 
                 return web.json_response({"name" : filename, "subfolder": subfolder, "type": image_upload_type})
             else:
@@ -442,6 +506,14 @@ class PromptServer():
                 filename = os.path.basename(filename)
                 file = os.path.join(output_dir, filename)
 
+                pending = node_helpers.pending_image_write(file)
+                if pending is not None:
+                    # Still being written with --async-image-writes
+                    try:
+                        await asyncio.wrap_future(pending)
+                    except Exception:
+                        pass
+
                 if os.path.isfile(file):
                     if 'preview' in request.rel_url.query:
                         with Image.open(file) as img:
@@ -575,6 +647,12 @@ class PromptServer():
                     }
                 ]
             }
+            if self.prompt_executor is not None:
+                system_stats["cache"] = self.prompt_executor.caches.get_stats()
+                if self.prompt_executor.residency_planner is not None:
+                    system_stats["residency"] = self.prompt_executor.residency_planner.get_stats()
+            system_stats["lora_cache"] = comfy.lora_cache.lora_cache.get_stats()
+            system_stats["patched_weight_cache"] = comfy.patched_weight_cache.patched_weight_cache.get_stats()
             return web.json_response(system_stats)
 
         @routes.get("/features")
@@ -585,59 +663,23 @@ class PromptServer():
         async def get_prompt(request):
             return web.json_response(self.get_queue_info())
 
-        def node_info(node_class):
-            obj_class = nodes.NODE_CLASS_MAPPINGS[node_class]
-            if issubclass(obj_class, _ComfyNodeInternal):
-                return obj_class.GET_NODE_INFO_V1()
-            info = {}
-            info['input'] = obj_class.INPUT_TYPES()
-            info['input_order'] = {key: list(value.keys()) for (key, value) in obj_class.INPUT_TYPES().items()}
-            info['output'] = obj_class.RETURN_TYPES
-            info['output_is_list'] = obj_class.OUTPUT_IS_LIST if hasattr(obj_class, 'OUTPUT_IS_LIST') else [False] * len(obj_class.RETURN_TYPES)
-            info['output_name'] = obj_class.RETURN_NAMES if hasattr(obj_class, 'RETURN_NAMES') else info['output']
-            info['name'] = node_class
-            info['display_name'] = nodes.NODE_DISPLAY_NAME_MAPPINGS[node_class] if node_class in nodes.NODE_DISPLAY_NAME_MAPPINGS.keys() else node_class
-            info['description'] = obj_class.DESCRIPTION if hasattr(obj_class,'DESCRIPTION') else ''
-            info['python_module'] = getattr(obj_class, "RELATIVE_PYTHON_MODULE", "nodes")
-            info['category'] = 'sd'
-            if hasattr(obj_class, 'OUTPUT_NODE') and obj_class.OUTPUT_NODE == True:
-                info['output_node'] = True
-            else:
-                info['output_node'] = False
-
-            if hasattr(obj_class, 'CATEGORY'):
-                info['category'] = obj_class.CATEGORY
-
-            if hasattr(obj_class, 'OUTPUT_TOOLTIPS'):
-                info['output_tooltips'] = obj_class.OUTPUT_TOOLTIPS
-
-            if getattr(obj_class, "DEPRECATED", False):
-                info['deprecated'] = True
-            if getattr(obj_class, "EXPERIMENTAL", False):
-                info['experimental'] = True
-
-            if hasattr(obj_class, 'API_NODE'):
-                info['api_node'] = obj_class.API_NODE
-            return info
-
         @routes.get("/object_info")
         async def get_object_info(request):
-            with folder_paths.cache_helper:
-                out = {}
-                for x in nodes.NODE_CLASS_MAPPINGS:
-                    try:
-                        out[x] = node_info(x)
-                    except Exception:
-                        logging.error(f"[ERROR] An error occurred while retrieving information for the '{x}' node.")
-                        logging.error(traceback.format_exc())
-                return web.json_response(out)
+            etag, body, gzip_body = self.object_info_cache.get()
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+            if etag_matches(request.headers.get("If-None-Match"), etag):
+                return web.Response(status=304, headers=headers)
+            if "gzip" in request.headers.get("Accept-Encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+                body = gzip_body
+            return web.Response(body=body, content_type="application/json", headers=headers)
 
         @routes.get("/object_info/{node_class}")
         async def get_object_info_node(request):
             node_class = request.match_info.get("node_class", None)
             out = {}
             if (node_class is not None) and (node_class in nodes.NODE_CLASS_MAPPINGS):
-                out[node_class] = node_info(node_class)
+                out[node_class] = cached_node_info(node_class)
             return web.json_response(out)
 
         @routes.get("/history")
@@ -851,10 +893,8 @@ class PromptServer():
         message.extend(data)
         return message
 
-    async def send_image(self, image_data, sid=None):
-        image_type = image_data[0]
-        image = image_data[1]
-        max_size = image_data[2]
+    @staticmethod
+    def encode_preview_image(image_type, image, max_size):
         if max_size is not None:
             if hasattr(Image, 'Resampling'):
                 resampling = Image.Resampling.BILINEAR
@@ -862,31 +902,26 @@ class PromptServer():
                 resampling = Image.Resampling.LANCZOS
 
             image = ImageOps.contain(image, (max_size, max_size), resampling)
+
+        bytesIO = BytesIO()
+        image.save(bytesIO, format=image_type, quality=95, compress_level=1)
+        return bytesIO.getvalue()
+
+    async def send_image(self, image_data, sid=None):
+        image_type = image_data[0]
         type_num = 1
         if image_type == "JPEG":
             type_num = 1
         elif image_type == "PNG":
             type_num = 2
 
-        bytesIO = BytesIO()
-        header = struct.pack(">I", type_num)
-        bytesIO.write(header)
-        image.save(bytesIO, format=image_type, quality=95, compress_level=1)
-        preview_bytes = bytesIO.getvalue()
+        # Resizing and encoding take long enough to stall the event loop
+        image_bytes = await asyncio.to_thread(self.encode_preview_image, image_type, image_data[1], image_data[2])
+        preview_bytes = struct.pack(">I", type_num) + image_bytes
         await self.send_bytes(BinaryEventTypes.PREVIEW_IMAGE, preview_bytes, sid=sid)
 
     async def send_image_with_metadata(self, image_data, metadata=None, sid=None):
         image_type = image_data[0]
-        image = image_data[1]
-        max_size = image_data[2]
-        if max_size is not None:
-            if hasattr(Image, 'Resampling'):
-                resampling = Image.Resampling.BILINEAR
-            else:
-                resampling = Image.Resampling.LANCZOS
-
-            image = ImageOps.contain(image, (max_size, max_size), resampling)
-
         mimetype = "image/png" if image_type == "PNG" else "image/jpeg"
 
         # Prepare metadata
@@ -900,9 +935,7 @@ class PromptServer():
         metadata_length = len(metadata_json)
 
         # Prepare image data
-        bytesIO = BytesIO()
-        image.save(bytesIO, format=image_type, quality=95, compress_level=1)
-        image_bytes = bytesIO.getvalue()
+        image_bytes = await asyncio.to_thread(self.encode_preview_image, image_type, image_data[1], image_data[2])
 
         # Combine metadata and image
         combined_data = bytearray()
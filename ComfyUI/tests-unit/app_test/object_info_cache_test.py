@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import folder_paths
+from app.object_info_cache import ObjectInfoCache, etag_matches
+
+
+@pytest.fixture
+def models_folder(tmp_path):
+    models_dir = tmp_path / "loras"
+    models_dir.mkdir()
+    (models_dir / "a.safetensors").write_bytes(b"")
+    original = folder_paths.folder_names_and_paths.get("test_loras")
+    folder_paths.folder_names_and_paths["test_loras"] = ([str(models_dir)], {".safetensors"})
+    yield models_dir
+    folder_paths.filename_list_cache.pop("test_loras", None)
+    if original is None:
+        folder_paths.folder_names_and_paths.pop("test_loras", None)
+    else:
+        folder_paths.folder_names_and_paths["test_loras"] = original
+
+
+class StaticNode:
+    pass
+
+
+class LoaderNode:
+    pass
+
+
+def make_cache(calls):
+    mappings = {"Static": StaticNode, "Loader": LoaderNode}
+
+    def node_info(class_type):
+        calls.append(class_type)
+        if class_type == "Loader":
+            return {"name": class_type, "files": folder_paths.get_filename_list("test_loras")}
+        return {"name": class_type}
+
+    return mappings, ObjectInfoCache(mappings, node_info)
+
+
+def test_payload_is_cached(models_folder):
+    calls = []
+    _, cache = make_cache(calls)
+    etag, body, gzip_body = cache.get()
+    assert json.loads(body) == {"Static": {"name": "Static"}, "Loader": {"name": "Loader", "files": ["a.safetensors"]}}
+    assert gzip.decompress(gzip_body) == body
+    assert cache.get()[0] == etag
+    assert calls == ["Static", "Loader"]
+
+
+def test_only_classes_reading_changed_folders_are_recomputed(models_folder):
+    calls = []
+    _, cache = make_cache(calls)
+    etag = cache.get()[0]
+    calls.clear()
+
+    (models_folder / "b.safetensors").write_bytes(b"")
+    # Make sure the directory mtime changes even on filesystems with coarse timestamps
+    st = os.stat(models_folder)
+    os.utime(models_folder, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    new_etag, body, _ = cache.get()
+    assert calls == ["Loader"]
+    assert new_etag != etag
+    assert json.loads(body)["Loader"]["files"] == ["a.safetensors", "b.safetensors"]
+
+
+def test_added_and_removed_classes(models_folder):
+    calls = []
+    mappings, cache = make_cache(calls)
+    etag = cache.get()[0]
+    calls.clear()
+
+    mappings["Extra"] = StaticNode
+    del mappings["Static"]
+    new_etag, body, _ = cache.get()
+    assert calls == ["Extra"]
+    assert new_etag != etag
+    assert list(json.loads(body)) == ["Loader", "Extra"]
+
+
+def test_etag_matches():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"x"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -237,3 +237,76 @@ def test_duration_consistency(video_components):
     manual_duration = float(components.images.shape[0] / components.frame_rate)
 
     assert duration == pytest.approx(manual_duration)
+
+
+@pytest.fixture
+def video_with_audio_file(tmp_path):
+    """8x8 video with 10 frames at 10fps and one second of mono audio"""
+    path = str(tmp_path / "clip.mp4")
+    images = torch.rand(10, 8, 8, 3)
+    audio = AudioInput({"waveform": torch.rand(1, 1, 8000), "sample_rate": 8000})
+    VideoFromComponents(VideoComponents(images=images, audio=audio, frame_rate=Fraction(10))).save_to(path)
+    return path
+
+
+def decode_reference(path):
+    """Frames decoded one by one and stacked, like get_components used to"""
+    with av.open(path) as container:
+        return torch.stack([torch.from_numpy(f.to_ndarray(format="rgb24")) / 255.0 for f in container.decode(video=0)])
+
+
+def test_video_from_file_components_match_reference(video_with_audio_file):
+    components = VideoFromFile(video_with_audio_file).get_components()
+    reference = decode_reference(video_with_audio_file)
+    assert components.images.dtype == torch.float32
+    assert torch.equal(components.images, reference)
+    assert components.frame_rate == Fraction(10)
+    assert components.audio["sample_rate"] == 8000
+    assert components.audio["waveform"].shape[-1] >= 8000
+
+
+def test_video_from_file_frame_selection(video_with_audio_file):
+    video = VideoFromFile(video_with_audio_file)
+    reference = decode_reference(video_with_audio_file)
+
+    components = video.get_components(start_frame=2, frame_count=3, stride=2)
+    assert torch.equal(components.images, reference[2:8:2])
+    # Audio of frames 2 to 6 at 10 fps
+    assert components.audio["waveform"].shape[-1] == 4000
+
+    uint8 = video.get_components(stride=3, dtype=torch.uint8).images
+    assert uint8.dtype == torch.uint8
+    assert torch.equal(uint8.float() / 255.0, reference[::3])
+
+    with pytest.raises(ValueError):
+        video.get_components(stride=0)
+
+
+def test_video_iter_frames(video_with_audio_file):
+    reference = decode_reference(video_with_audio_file)
+    frames = list(VideoFromFile(video_with_audio_file).iter_frames(start_frame=1, frame_count=4))
+    assert torch.equal(torch.stack(frames), reference[1:5])
+
+    from_components = VideoFromComponents(VideoComponents(images=reference, frame_rate=Fraction(10)))
+    frames = list(from_components.iter_frames(stride=4))
+    assert torch.equal(torch.stack(frames), reference[::4])
+
+
+def test_yuv_frames_match_per_frame_conversion():
+    from comfy_api.latest._input_impl.video_types import iter_yuv_frames
+
+    images = torch.rand(7, 8, 8, 3)
+    frames = list(iter_yuv_frames(images, chunk_frames=3))
+    assert len(frames) == 7
+    for image, frame in zip(images, frames):
+        img = (image * 255).clamp(0, 255).byte().cpu().numpy()
+        expected = av.VideoFrame.from_ndarray(img, format="rgb24").reformat(format="yuv420p")
+        assert (frame.to_ndarray() == expected.to_ndarray()).all()
+
+
+def test_video_from_components_encoder_options(tmp_path, sample_images):
+    path = str(tmp_path / "out.mp4")
+    video = VideoFromComponents(VideoComponents(images=sample_images, frame_rate=Fraction(30)))
+    video.save_to(path, threads=1, preset="ultrafast", crf=30)
+    components = VideoFromFile(path).get_components()
+    assert components.images.shape == sample_images.shape
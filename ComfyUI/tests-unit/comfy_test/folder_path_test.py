@@ -116,6 +116,45 @@ def test_get_save_image_path(temp_dir):
         assert filename_prefix == "test"
 
 
+def test_save_image_path_counters(temp_dir):
+    for name in ["test_00003_.png", "test_00007_.png", "other_00042_.png", "test_x_00100_.png"]:
+        open(os.path.join(temp_dir, name), "w").close()
+    counters = folder_paths.SaveCounters()
+    assert counters.reserve(temp_dir, "test", count=2) == 8
+    assert counters.reserve(temp_dir, "test") == 10
+    assert counters.reserve(temp_dir, "other") == 43
+    assert counters.reserve(temp_dir, "test_x") == 101
+    assert counters.reserve(temp_dir, "new") == 1
+
+
+def test_save_image_path_counters_skip_existing_files(temp_dir):
+    open(os.path.join(temp_dir, "test_00001_.png"), "w").close()
+    counters = folder_paths.SaveCounters()
+    counter = counters.reserve(temp_dir, "test")
+    assert counter == 2
+    # A batch saved without reserving all of its counters, or files written by something else
+    for i in range(counter, counter + 3):
+        open(os.path.join(temp_dir, f"test_{i:05}_.png"), "w").close()
+    assert counters.reserve(temp_dir, "test") == 5
+
+    # Counters of a new prefix are found once its first files exist
+    assert counters.reserve(temp_dir, "new", count=2) == 1
+    for i in range(1, 4):
+        open(os.path.join(temp_dir, f"new_{i:05}_.webp"), "w").close()
+    assert counters.reserve(temp_dir, "new") == 4
+
+
+def test_save_image_path_counters_are_shared_between_processes(temp_dir):
+    if folder_paths.fcntl is None:
+        pytest.skip("needs fcntl")
+    # Separate registries behave like separate processes saving to the same folder
+    first = folder_paths.SaveCounters()
+    second = folder_paths.SaveCounters()
+    assert first.reserve(temp_dir, "test", count=4) == 1
+    assert second.reserve(temp_dir, "test") == 5
+    assert first.reserve(temp_dir, "test") == 6
+
+
 def test_base_path_changes(set_base_dir):
     test_dir = os.path.abspath("/test/dir")
     set_base_dir(test_dir)
@@ -0,0 +1,55 @@
+import json
+import os
+
+import numpy as np
+import torch
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+import node_helpers
+from comfy.cli_args import args
+
+
+def make_images():
+    images = torch.rand(3, 24, 32, 3)
+    images[0, 0] = 1.5
+    images[1, 0] = -0.5
+    return images
+
+
+def make_metadata():
+    metadata = PngInfo()
+    metadata.add_text("prompt", json.dumps({"1": {"class_type": "SaveImage"}}))
+    return metadata
+
+
+def save_one_by_one(images, paths, metadata):
+    for image, path in zip(images, paths):
+        i = 255. * image.cpu().numpy()
+        img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
+        img.save(path, pnginfo=metadata, compress_level=4)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_batch_is_byte_identical(tmp_path):
+    images = make_images()
+    metadata = make_metadata()
+    expected = [str(tmp_path / f"expected_{i}.png") for i in range(len(images))]
+    paths = [str(tmp_path / f"batch_{i}.png") for i in range(len(images))]
+    save_one_by_one(images, expected, metadata)
+    node_helpers.save_png_batch(images, paths, pnginfo=metadata, compress_level=4)
+    assert [read(p) for p in paths] == [read(p) for p in expected]
+
+
+def test_async_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(args, "async_image_writes", True)
+    images = make_images()
+    paths = [str(tmp_path / f"async_{i}.png") for i in range(len(images))]
+    node_helpers.save_png_batch(images, paths, compress_level=1)
+    node_helpers.wait_for_image_writes()
+    assert all(os.path.isfile(p) for p in paths)
+    assert all(node_helpers.pending_image_write(p) is None for p in paths)
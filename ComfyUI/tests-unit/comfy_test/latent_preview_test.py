@@ -0,0 +1,34 @@
+import pytest
+import torch
+
+from comfy.cli_args import args, LatentPreviewMethod
+
+if not torch.cuda.is_available():
+    args.cpu = True
+
+import comfy.latent_formats  # noqa: E402
+import latent_preview  # noqa: E402
+
+
+@pytest.fixture
+def latent2rgb(monkeypatch):
+    monkeypatch.setattr(args, "preview_method", LatentPreviewMethod.Latent2RGB)
+    latent_preview._previewer_cache.clear()
+    yield
+    latent_preview._previewer_cache.clear()
+
+
+def test_previewer_is_reused(latent2rgb):
+    device = torch.device("cpu")
+    first = latent_preview.get_previewer(device, comfy.latent_formats.SD15())
+    assert isinstance(first, latent_preview.Latent2RGBPreviewer)
+    assert latent_preview.get_previewer(device, comfy.latent_formats.SD15()) is first
+
+
+def test_only_latest_format_is_kept(latent2rgb):
+    device = torch.device("cpu")
+    sd15 = latent_preview.get_previewer(device, comfy.latent_formats.SD15())
+    sdxl = latent_preview.get_previewer(device, comfy.latent_formats.SDXL())
+    assert sdxl is not sd15
+    assert list(latent_preview._previewer_cache.values()) == [sdxl]
+    assert latent_preview.get_previewer(device, comfy.latent_formats.SD15()) is not sd15
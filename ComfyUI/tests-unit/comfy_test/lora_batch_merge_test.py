@@ -0,0 +1,73 @@
+import torch
+
+from comfy.cli_args import args
+
+if not torch.cuda.is_available():
+    # model_management picks the torch device on import
+    args.cpu = True
+
+import comfy.float  # noqa: E402
+import comfy.lora  # noqa: E402
+from comfy.weight_adapter.lora import LoRAAdapter  # noqa: E402
+
+
+def make_patches(weight, rank=4, alpha=2.0, strength=0.8, dora_scale=None):
+    up = torch.randn(weight.shape[0], rank)
+    down = torch.randn(rank, weight[0].numel())
+    adapter = LoRAAdapter(set(), (up, down, alpha, None, dora_scale, None))
+    return [(strength, adapter, 1.0, None, None)]
+
+
+def test_batched_merge_matches_calculate_weight():
+    torch.manual_seed(0)
+    weights = [torch.randn(16, 8) for _ in range(3)]
+    patches_list = []
+    for weight in weights:
+        patches = make_patches(weight) + make_patches(weight, rank=2, alpha=None, strength=0.3)
+        patches_list.append(patches)
+    signatures = {comfy.lora.lora_batch_signature(p, w) for p, w in zip(patches_list, weights)}
+    assert len(signatures) == 1 and None not in signatures
+
+    batched = comfy.lora.calculate_weights_batched(patches_list, torch.stack(weights))
+    for i, (weight, patches) in enumerate(zip(weights, patches_list)):
+        expected = comfy.lora.calculate_weight(patches, weight.clone(), "w{}".format(i))
+        torch.testing.assert_close(batched[i], expected)
+
+
+def test_conv_weights_are_batched():
+    weight = torch.randn(8, 4, 3, 3)
+    patches = make_patches(weight)
+    assert comfy.lora.lora_batch_signature(patches, weight) is not None
+    batched = comfy.lora.calculate_weights_batched([patches], weight.unsqueeze(0).clone())
+    torch.testing.assert_close(batched[0], comfy.lora.calculate_weight(patches, weight.clone(), "conv"))
+
+
+def test_signature_rejects_unsupported_patches():
+    weight = torch.randn(16, 8)
+    assert comfy.lora.lora_batch_signature(make_patches(weight, dora_scale=torch.ones(16, 1)), weight) is None
+    assert comfy.lora.lora_batch_signature([(1.0, (torch.randn(16, 8),), 1.0, None, None)], weight) is None
+    assert comfy.lora.lora_batch_signature(make_patches(torch.randn(8, 8)), weight) is None
+    assert comfy.lora.lora_batch_signature(make_patches(weight, strength=0.5), weight) != comfy.lora.lora_batch_signature(make_patches(weight), weight)
+
+
+def test_stochastic_rounding_batched_matches():
+    values = torch.randn(3, 16, 8)
+    seeds = [1, 2, 3]
+    for dtype in (torch.bfloat16, torch.float8_e4m3fn):
+        out = comfy.float.stochastic_rounding_batched(values, dtype, seeds)
+        for i, seed in enumerate(seeds):
+            assert torch.equal(out[i].float(), comfy.float.stochastic_rounding(values[i], dtype, seed=seed).float())
+
+
+def test_batched_patched_weights_do_not_share_storage():
+    import comfy.model_patcher
+
+    model = torch.nn.Sequential(*[torch.nn.Linear(8, 16) for _ in range(4)])
+    patcher = comfy.model_patcher.ModelPatcher(model, torch.device("cpu"), torch.device("cpu"))
+    keys = ["{}.weight".format(i) for i in range(4)]
+    patcher.add_patches({key: make_patches(model[i].weight)[0][1] for i, key in enumerate(keys)}, 0.8)
+    patcher.patch_weights_to_device(keys, device_to=torch.device("cpu"))
+    # Layers are unloaded one by one, a shared storage would only be freed with the last of them
+    storages = {model[i].weight.untyped_storage().data_ptr() for i in range(4)}
+    assert len(storages) == 4
+    patcher.unpatch_model(torch.device("cpu"))
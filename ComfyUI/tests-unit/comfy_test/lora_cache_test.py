@@ -0,0 +1,71 @@
+import os
+
+import torch
+from safetensors.torch import save_file
+
+from comfy.cli_args import args
+
+if not torch.cuda.is_available():
+    # model_management picks the torch device on import
+    args.cpu = True
+
+import comfy.lora_cache  # noqa: E402
+import comfy.sd  # noqa: E402
+from comfy.lora_cache import LoraFileCache  # noqa: E402
+
+
+def make_lora(path, value, numel=256):
+    save_file({"lora_unet_a.lora_down.weight": torch.full((numel,), value)}, path)
+    return path
+
+
+def test_hits_and_misses(tmp_path):
+    path = make_lora(str(tmp_path / "a.safetensors"), 1.0)
+    cache = LoraFileCache(budget=1 << 20)
+    first = cache.load(path)
+    assert cache.load(path) is first
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes"] == 256 * 4
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = make_lora(str(tmp_path / "a.safetensors"), 1.0)
+    cache = LoraFileCache(budget=1 << 20)
+    cache.load(path)
+    make_lora(path, 2.0, numel=512)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    sd = cache.load(path)
+    assert sd["lora_unet_a.lora_down.weight"][0] == 2.0
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_budget_evicts_least_recently_used(tmp_path):
+    paths = [make_lora(str(tmp_path / f"{i}.safetensors"), float(i)) for i in range(3)]
+    cache = LoraFileCache(budget=2 * 256 * 4)
+    cache.load(paths[0])
+    cache.load(paths[1])
+    cache.load(paths[0])
+    cache.load(paths[2])
+    stats = cache.get_stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    cache.load(paths[0])
+    assert cache.get_stats()["hits"] == 2
+
+
+def test_most_recent_kept_over_budget(tmp_path):
+    path = make_lora(str(tmp_path / "a.safetensors"), 1.0)
+    cache = LoraFileCache(budget=0)
+    cache.load(path)
+    cache.load(path)
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_conversion_does_not_modify_cached_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(comfy.lora_cache, "lora_cache", LoraFileCache(budget=1 << 20))
+    path = str(tmp_path / "wan_fun.safetensors")
+    key = "lora_unet__blocks_0_cross_attn_k.lora_down.weight"
+    save_file({key: torch.zeros(4, 4)}, path)
+    comfy.sd.load_lora_for_models(None, None, path, 1.0, 1.0)
+    assert list(comfy.lora_cache.load_lora_file(path).keys()) == [key]
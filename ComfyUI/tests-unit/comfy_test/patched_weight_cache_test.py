@@ -0,0 +1,61 @@
+import gc
+
+import torch
+
+from comfy.patched_weight_cache import PatchedWeightCache
+
+
+class Model(torch.nn.Module):
+    pass
+
+
+def diff_patches(diff, strength=1.0):
+    return [(strength, (diff,), 1.0, None, None)]
+
+
+def test_hit_copies_cached_weight():
+    cache = PatchedWeightCache(budget=1 << 20)
+    model, weight, diff = Model(), torch.zeros(4, 4), torch.ones(4, 4)
+    handle = cache.make_key(model, "w", weight, diff_patches(diff), "cpu")
+    assert cache.get(handle, "cpu") is None
+    patched = weight + diff
+    cache.put(handle, patched)
+
+    again = cache.make_key(model, "w", weight, diff_patches(diff), "cpu")
+    out = cache.get(again, "cpu")
+    assert torch.equal(out, patched)
+    assert out.data_ptr() != patched.data_ptr()
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["bytes"]) == (1, 1, patched.nbytes)
+
+
+def test_different_patches_miss():
+    cache = PatchedWeightCache(budget=1 << 20)
+    model, weight, diff = Model(), torch.zeros(4, 4), torch.ones(4, 4)
+    cache.put(cache.make_key(model, "w", weight, diff_patches(diff), "cpu"), weight + diff)
+    assert cache.get(cache.make_key(model, "w", weight, diff_patches(diff, 0.5), "cpu"), "cpu") is None
+    assert cache.get(cache.make_key(model, "w", weight, diff_patches(torch.ones(4, 4)), "cpu"), "cpu") is None
+    assert cache.get(cache.make_key(Model(), "w", weight, diff_patches(diff), "cpu"), "cpu") is None
+
+
+def test_freed_patch_tensor_invalidates_entry():
+    cache = PatchedWeightCache(budget=1 << 20)
+    model, weight, diff = Model(), torch.zeros(4, 4), torch.ones(4, 4)
+    handle = cache.make_key(model, "w", weight, diff_patches(diff), "cpu")
+    cache.put(handle, weight + diff)
+    del diff
+    gc.collect()
+    assert cache.get(handle, "cpu") is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_budget_and_disabled():
+    weight = torch.zeros(4, 4)
+    cache = PatchedWeightCache(budget=2 * weight.nbytes)
+    model = Model()
+    diffs = [torch.ones(4, 4) for _ in range(3)]
+    for diff in diffs:
+        cache.put(cache.make_key(model, "w", weight, diff_patches(diff), "cpu"), weight + diff)
+    assert cache.get_stats()["entries"] == 2
+    assert cache.get_stats()["evictions"] == 1
+    assert PatchedWeightCache(budget=0).make_key(model, "w", weight, diff_patches(diffs[0]), "cpu") is None
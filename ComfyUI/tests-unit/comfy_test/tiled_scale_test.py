@@ -0,0 +1,50 @@
+import torch
+
+import comfy.utils
+
+
+def upscale_fn(a):
+    return torch.nn.functional.interpolate(a, scale_factor=2, mode="nearest") * 0.5
+
+
+def test_blend_mask_ramps_at_borders():
+    mask = comfy.utils.tile_blend_mask((6, 3), (2, 4))
+    assert mask.shape == (1, 1, 6, 3)
+    # Feathers wider than the tile are skipped, like before
+    assert torch.equal(mask[0, 0, :, 0], torch.tensor([0.5, 1.0, 1.0, 1.0, 1.0, 0.5]))
+    assert torch.equal(mask[0, 0, 2], torch.ones(3))
+
+
+def test_identity_tiles_blend_back_to_input():
+    x = torch.rand(1, 3, 100, 70)
+    out = comfy.utils.tiled_scale(x, lambda a: a, tile_x=32, tile_y=32, overlap=8, upscale_amount=1)
+    assert torch.allclose(out, x, atol=1e-6)
+
+
+def test_tile_batch_does_not_change_result():
+    x = torch.rand(2, 3, 90, 130)
+    steps = 2 * comfy.utils.get_tiled_scale_steps(130, 90, 32, 32, 8)
+    pbar = comfy.utils.ProgressBar(steps)
+    single = comfy.utils.tiled_scale(x, upscale_fn, tile_x=32, tile_y=32, overlap=8, upscale_amount=2, pbar=pbar)
+    assert pbar.current == steps
+    batched = comfy.utils.tiled_scale(x, upscale_fn, tile_x=32, tile_y=32, overlap=8, upscale_amount=2, tile_batch=7)
+    assert torch.allclose(single, batched, atol=1e-6)
+
+
+def test_single_tile_inputs_are_batched_over_items():
+    calls = []
+
+    def fn(a):
+        calls.append(a.shape[0])
+        return upscale_fn(a)
+
+    x = torch.rand(5, 3, 16, 16)
+    out = comfy.utils.tiled_scale(x, fn, tile_x=32, tile_y=32, overlap=8, upscale_amount=2, tile_batch=2)
+    assert calls == [2, 2, 1]
+    assert torch.allclose(out, upscale_fn(x))
+
+
+def test_multidim_tiles():
+    x = torch.rand(1, 2, 9, 40, 50)
+    out = comfy.utils.tiled_scale_multidim(x, lambda a: a, tile=(4, 16, 16), overlap=(1, 4, 4), upscale_amount=1, out_channels=2, tile_batch=4)
+    assert torch.allclose(out, x, atol=1e-6)
@@ -0,0 +1,141 @@
+import pytest
+import torch
+
+from comfy.cli_args import args
+
+if not torch.cuda.is_available():
+    args.cpu = True
+
+import comfy.model_patcher  # noqa: E402
+import comfy.ops  # noqa: E402
+from comfy.weight_prefetch import WeightPrefetcher  # noqa: E402
+
+requires_cuda = pytest.mark.skipif(not torch.cuda.is_available(), reason="weight prefetching needs a CUDA device")
+
+# Only the CUDA tests touch the device, the bookkeeping runs without one
+DEVICE = torch.device("cuda", 0)
+
+
+def make_model(layers=6, width=64):
+    torch.manual_seed(0)
+    model = torch.nn.Sequential(*[comfy.ops.manual_cast.Linear(width, width) for _ in range(layers)])
+    for m in model:
+        torch.nn.init.normal_(m.weight)
+        torch.nn.init.normal_(m.bias)
+        m.comfy_cast_weights = True
+    return model
+
+
+@requires_cuda
+@pytest.mark.parametrize("layers_ahead", [1, 2])
+def test_prefetched_forward_matches(layers_ahead):
+    device = torch.device("cuda", torch.cuda.current_device())
+    model = make_model()
+    x = torch.randn(4, 64, device=device)
+    with torch.no_grad():
+        expected = model(x)
+
+        prefetcher = WeightPrefetcher(device, layers_ahead)
+        for m in model:
+            m.weight_prefetcher = prefetcher
+        outputs = [model(x) for _ in range(3)]
+
+    for out in outputs:
+        torch.testing.assert_close(out, expected)
+    # The first pass only learns the order, later ones are served from the prefetch slots
+    assert prefetcher.hits >= 2 * len(model) - layers_ahead
+    assert all(m.weight.is_pinned() for m in model)
+
+
+@requires_cuda
+def test_mispredicted_module_is_cast_normally():
+    device = torch.device("cuda", torch.cuda.current_device())
+    model = make_model()
+    x = torch.randn(4, 64, device=device)
+    prefetcher = WeightPrefetcher(device, 1)
+    for m in model:
+        m.weight_prefetcher = prefetcher
+    with torch.no_grad():
+        model(x)
+        model(x)
+        # Run the layers in a different order than the one that was learnt
+        y = x
+        for m in reversed(model):
+            y = m(y)
+        expected = x
+        for m in reversed(model):
+            expected = torch.nn.functional.linear(expected, m.weight.to(device), m.bias.to(device))
+    torch.testing.assert_close(y, expected)
+
+
+def test_order_is_learnt_after_one_pass():
+    prefetcher = WeightPrefetcher(DEVICE, 2)
+    a, b, c = torch.nn.Linear(1, 1), torch.nn.Linear(1, 1), torch.nn.Linear(1, 1)
+    for m in (a, b, c):
+        prefetcher._learn(m)
+    assert prefetcher.order == []
+    prefetcher._learn(a)
+    assert prefetcher.order == [a, b, c]
+    assert prefetcher.position == {a: 0, b: 1, c: 2}
+    assert prefetcher.recording == [a]
+
+
+def test_free_slot_skips_busy_slots_and_drops_oldest_prefetch():
+    prefetcher = WeightPrefetcher(DEVICE, 2)
+    a, b = torch.nn.Linear(1, 1), torch.nn.Linear(1, 1)
+    prefetcher.inflight = {a: (0, None), b: (2, None)}
+    assert prefetcher._free_slot(in_use=-1) == 1
+    # Every slot is taken: the oldest prefetch was mispredicted and gives its slot up
+    assert prefetcher._free_slot(in_use=1) == 0
+    assert list(prefetcher.inflight) == [b]
+
+
+def test_release_frees_slots():
+    prefetcher = WeightPrefetcher(DEVICE, 1)
+    m = torch.nn.Linear(1, 1)
+    prefetcher._learn(m)
+    prefetcher.slots[0]["weight"] = torch.zeros(4)
+    prefetcher.inflight[m] = (0, None)
+    prefetcher.release()
+    assert prefetcher.slots == [{}, {}]
+    assert prefetcher.inflight == {}
+    assert prefetcher.recording == []
+
+
+class FakePrefetcher:
+    def __init__(self):
+        self.released = False
+
+    def reset(self):
+        pass
+
+    def release(self):
+        self.released = True
+
+
+def make_patcher():
+    model = torch.nn.Sequential(torch.nn.Linear(4, 4), torch.nn.Linear(4, 4))
+    patcher = comfy.model_patcher.ModelPatcher(model, torch.device("cpu"), torch.device("cpu"))
+    prefetcher = FakePrefetcher()
+    model.weight_prefetcher = prefetcher
+    for m in model:
+        m.weight_prefetcher = prefetcher
+    return patcher, prefetcher
+
+
+def assert_released(patcher, prefetcher):
+    assert prefetcher.released
+    assert patcher.model.weight_prefetcher is None
+    assert all(m.weight_prefetcher is None for m in patcher.model)
+
+
+@pytest.mark.parametrize("action", ["unpatch", "detach", "full_load"])
+def test_prefetcher_is_released(action):
+    patcher, prefetcher = make_patcher()
+    if action == "unpatch":
+        patcher.unpatch_model(torch.device("cpu"))
+    elif action == "detach":
+        patcher.detach()
+    else:
+        patcher.load(torch.device("cpu"), full_load=True)
+    assert_released(patcher, prefetcher)
@@ -0,0 +1,105 @@
+import torch
+
+from comfy_execution.batching import (
+    MicroBatchSplit,
+    batch_conditioning,
+    batch_key,
+    build_sampling_prompt,
+)
+
+
+def make_prompt(text="a cat", seed=1, sampler_name="euler", steps=20, width=512, lora=None):
+    prompt = {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": text, "clip": ["1", 1]}},
+        "3": {"class_type": "CLIPTextEncode", "inputs": {"text": "", "clip": ["1", 1]}},
+        "4": {"class_type": "EmptyLatentImage", "inputs": {"width": width, "height": 512, "batch_size": 1}},
+        "5": {"class_type": "KSampler", "inputs": {
+            "model": ["1", 0], "positive": ["2", 0], "negative": ["3", 0], "latent_image": ["4", 0],
+            "seed": seed, "steps": steps, "cfg": 7.0, "sampler_name": sampler_name, "scheduler": "normal", "denoise": 1.0,
+        }},
+        "6": {"class_type": "VAEDecode", "inputs": {"samples": ["5", 0], "vae": ["1", 2]}},
+        "7": {"class_type": "SaveImage", "inputs": {"images": ["6", 0], "filename_prefix": "ComfyUI"}},
+    }
+    if lora is not None:
+        prompt["8"] = {"class_type": "LoraLoaderModelOnly", "inputs": {"model": ["1", 0], "lora_name": lora, "strength_model": 1.0}}
+        prompt["5"]["inputs"]["model"] = ["8", 0]
+    return prompt
+
+
+def test_prompts_differing_in_seed_and_text_share_a_key():
+    key = batch_key(make_prompt())
+    assert key is not None
+    assert batch_key(make_prompt(text="a dog", seed=42)) == key
+
+
+def test_sampling_settings_and_model_split_keys():
+    key = batch_key(make_prompt())
+    assert batch_key(make_prompt(steps=30)) != key
+    assert batch_key(make_prompt(width=768)) != key
+    assert batch_key(make_prompt(lora="a.safetensors")) != key
+    assert batch_key(make_prompt(lora="a.safetensors")) != batch_key(make_prompt(lora="b.safetensors"))
+
+
+def test_stochastic_samplers_are_not_batched():
+    assert batch_key(make_prompt(sampler_name="euler_ancestral")) is None
+    assert batch_key(make_prompt(sampler_name="dpmpp_sde")) is None
+
+
+def test_prompts_with_several_samplers_are_not_batched():
+    prompt = make_prompt()
+    prompt["9"] = dict(prompt["5"])
+    assert batch_key(prompt) is None
+
+
+def test_sampling_prompt_keeps_only_sampler_ancestors():
+    merged, split_ids = build_sampling_prompt([make_prompt(seed=1), make_prompt(text="a dog", seed=2)])
+    assert split_ids == ["batch_split0", "batch_split1"]
+    assert "batch0_6" not in merged and "batch0_7" not in merged
+    sampler = merged["batch_sampler"]["inputs"]
+    assert sampler["model"] == ["batch0_1", 0]
+    assert sampler["seed_1"] == 2
+    assert sampler["positive_1"] == ["batch1_2", 0]
+    assert merged["batch1_2"]["inputs"] == {"text": "a dog", "clip": ["batch1_1", 1]}
+    assert merged["batch_split1"]["inputs"] == {"samples": ["batch_sampler", 0], "index": 1}
+
+
+def test_conditioning_is_padded_and_batched():
+    conds = [
+        [[torch.ones(1, 77, 8), {"pooled_output": torch.ones(1, 4)}]],
+        [[torch.zeros(1, 154, 8), {"pooled_output": torch.zeros(1, 4)}]],
+    ]
+    batched = batch_conditioning(conds, [2, 1])
+    cross_attn, options = batched[0]
+    assert cross_attn.shape == (3, 154, 8)
+    assert options["pooled_output"].shape == (3, 4)
+    assert torch.equal(cross_attn[1], torch.ones(154, 8))
+
+
+def test_conditioning_with_different_options_is_not_batched():
+    conds = [
+        [[torch.ones(1, 77, 8), {"strength": 1.0}]],
+        [[torch.ones(1, 77, 8), {"strength": 0.5}]],
+    ]
+    assert batch_conditioning(conds, [1, 1]) is None
+    assert batch_conditioning([conds[0], conds[0] + conds[1]], [1, 1]) is None
+
+
+def test_split_returns_member_latents():
+    samples = {"samples": torch.arange(5).view(5, 1), "batch_sizes": [2, 3]}
+    (out,) = MicroBatchSplit().split(samples, 1)
+    assert out["samples"].flatten().tolist() == [2, 3, 4]
+
+
+def test_internal_nodes_are_not_published():
+    from comfy.cli_args import args
+    if not torch.cuda.is_available():
+        args.cpu = True
+    import nodes
+    from comfy_execution.batching import PromptBatcher
+
+    PromptBatcher(4)
+    assert "MicroBatchKSampler" not in nodes.NODE_CLASS_MAPPINGS
+    assert "MicroBatchSplit" not in nodes.NODE_CLASS_MAPPINGS
+    assert nodes.get_node_class("MicroBatchSplit") is MicroBatchSplit
+    assert nodes.get_node_class("KSampler") is nodes.KSampler
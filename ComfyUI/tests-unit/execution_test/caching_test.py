@@ -0,0 +1,174 @@
+import asyncio
+import torch
+from unittest.mock import patch, MagicMock
+
+
+class FakeNode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {"required": {}}
+
+
+# Mock nodes module to prevent CUDA initialization during import
+mock_nodes = MagicMock()
+mock_nodes.NODE_CLASS_MAPPINGS = {
+    name: type(name, (FakeNode,), {})
+    for name in ("CheckpointLoaderSimple", "CLIPTextEncode", "EmptyLatentImage", "KSampler", "LatentUpscaleBy")
+}
+mock_nodes.get_node_class = mock_nodes.NODE_CLASS_MAPPINGS.__getitem__
+
+with patch.dict('sys.modules', {'nodes': mock_nodes}):
+    from comfy_execution.caching import CacheKeySetInputSignature, MemoryBudgetCache, Unhashable, to_digest
+    from comfy_execution.graph import DynamicPrompt
+
+
+class FakeIsChangedCache:
+    def __init__(self, values=None):
+        self.values = values or {}
+
+    async def get(self, node_id):
+        return self.values.get(node_id, False)
+
+
+def make_prompt(text="a cat", seed=1):
+    return {
+        "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}},
+        "2": {"class_type": "CLIPTextEncode", "inputs": {"text": text, "clip": ["1", 1]}},
+        "3": {"class_type": "CLIPTextEncode", "inputs": {"text": "", "clip": ["1", 1]}},
+        "4": {"class_type": "EmptyLatentImage", "inputs": {"width": 512, "height": 512, "batch_size": 1}},
+        "5": {"class_type": "KSampler", "inputs": {
+            "model": ["1", 0], "positive": ["2", 0], "negative": ["3", 0], "latent_image": ["4", 0],
+            "seed": seed, "steps": 20, "cfg": 7.0, "sampler_name": "euler", "scheduler": "normal", "denoise": 1.0,
+        }},
+    }
+
+
+def get_keys(prompt, is_changed=None):
+    dynprompt = DynamicPrompt(prompt)
+    key_set = CacheKeySetInputSignature(dynprompt, prompt.keys(), is_changed or FakeIsChangedCache())
+    asyncio.run(key_set.add_keys(prompt.keys()))
+    return key_set.keys
+
+
+def test_digests_are_fixed_size_bytes():
+    keys = get_keys(make_prompt())
+    assert all(isinstance(key, bytes) and len(key) == 16 for key in keys.values())
+
+
+def test_keys_are_stable_across_prompts():
+    assert get_keys(make_prompt()) == get_keys(make_prompt())
+
+
+def test_change_only_invalidates_descendants():
+    before = get_keys(make_prompt(text="a cat"))
+    after = get_keys(make_prompt(text="a dog"))
+    assert before["1"] == after["1"]
+    assert before["3"] == after["3"]
+    assert before["4"] == after["4"]
+    assert before["2"] != after["2"]
+    assert before["5"] != after["5"]
+
+
+def test_identical_subgraphs_share_keys():
+    keys = get_keys(make_prompt(text=""))
+    assert keys["2"] == keys["3"]
+
+
+def test_value_types_are_distinguished():
+    assert to_digest([1]) != to_digest(["1"])
+    assert to_digest({"a": [1, 2]}) != to_digest({"a": [2, 1]})
+
+
+def test_nan_is_never_cacheable():
+    keys = get_keys(make_prompt(), FakeIsChangedCache({"4": float("NaN")}))
+    assert isinstance(keys["4"], Unhashable)
+    assert isinstance(keys["5"], Unhashable)
+    assert isinstance(keys["2"], bytes)
+
+
+def test_missing_ancestor_is_not_cacheable():
+    prompt = make_prompt()
+    prompt["5"]["inputs"]["latent_image"] = ["99", 0]
+    keys = get_keys(prompt)
+    assert isinstance(keys["5"], Unhashable)
+
+
+def test_memo_shared_for_same_prompt():
+    prompt = make_prompt()
+    dynprompt = DynamicPrompt(prompt)
+    is_changed = FakeIsChangedCache()
+    first = CacheKeySetInputSignature(dynprompt, prompt.keys(), is_changed)
+    second = CacheKeySetInputSignature(dynprompt, prompt.keys(), is_changed)
+    asyncio.run(first.add_keys(prompt.keys()))
+    assert first.get_signature_memo(dynprompt) is second.get_signature_memo(dynprompt)
+    asyncio.run(second.add_keys(["5"]))
+    assert second.keys["5"] == first.keys["5"]
+
+
+def test_deep_chain_does_not_recurse():
+    prompt = {"0": {"class_type": "EmptyLatentImage", "inputs": {"width": 512, "height": 512, "batch_size": 1}}}
+    for i in range(1, 5000):
+        prompt[str(i)] = {"class_type": "LatentUpscaleBy", "inputs": {
+            "samples": [str(i - 1), 0], "upscale_method": "nearest-exact", "scale_by": 1.0}}
+    keys = get_keys(prompt)
+    assert len(set(keys.values())) == 5000
+
+
+def latent_prompt(sizes):
+    return {
+        str(i): {"class_type": "EmptyLatentImage", "inputs": {"width": size, "height": size, "batch_size": 1}}
+        for i, size in enumerate(sizes)
+    }
+
+
+def run_prompt(cache, prompt, outputs):
+    asyncio.run(cache.set_prompt(DynamicPrompt(prompt), prompt.keys(), FakeIsChangedCache()))
+    cache.clean_unused()
+    for node_id, value in outputs.items():
+        cached = cache.get(node_id) is not None
+        cache.record_lookup(cached)
+        if not cached:
+            cache.set(node_id, value)
+
+
+def tensor_of(nbytes):
+    return torch.zeros(nbytes // 4, dtype=torch.float32)
+
+
+def test_budget_counts_shared_tensors_once():
+    cache = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget=10_000)
+    shared = tensor_of(4000)
+    run_prompt(cache, latent_prompt([64, 128]), {"0": [[{"samples": shared}]], "1": [[shared, shared[10:]]]})
+    assert cache.ram_bytes == 4000
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_budget_evicts_old_generations_largest_first():
+    cache = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget=10_000)
+    run_prompt(cache, latent_prompt([64, 128]), {"0": [[tensor_of(1000)]], "1": [[tensor_of(6000)]]})
+    run_prompt(cache, latent_prompt([256]), {"0": [[tensor_of(6000)]]})
+    # The large entry from the previous prompt goes first, the small one stays
+    assert cache.ram_bytes == 7000
+    assert cache.evictions == 1
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_budget_never_evicts_current_prompt():
+    cache = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget=1000)
+    run_prompt(cache, latent_prompt([64, 128]), {"0": [[tensor_of(4000)]], "1": [[tensor_of(4000)]]})
+    assert cache.get_stats()["entries"] == 2
+    run_prompt(cache, latent_prompt([256]), {"0": [[tensor_of(400)]]})
+    assert cache.get_stats()["entries"] == 1
+    assert cache.ram_bytes == 400
+
+
+def test_budget_hit_and_miss_stats():
+    cache = MemoryBudgetCache(CacheKeySetInputSignature, ram_budget=10_000)
+    prompt = latent_prompt([64])
+    run_prompt(cache, prompt, {"0": [[tensor_of(100)]]})
+    run_prompt(cache, prompt, {"0": [[tensor_of(100)]]})
+    # Reading an output again, e.g. as the input of another node, is not another lookup
+    cache.get("0")
+    stats = cache.get_stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
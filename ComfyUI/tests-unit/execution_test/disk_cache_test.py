@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+import torch
+
+import folder_paths
+from unittest.mock import patch, MagicMock
+
+
+class FakeNode:
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {"required": {}}
+
+
+# Mock nodes module to prevent CUDA initialization during import
+mock_nodes = MagicMock()
+mock_nodes.NODE_CLASS_MAPPINGS = {
+    name: type(name, (FakeNode,), {})
+    for name in ("CheckpointLoaderSimple", "CLIPTextEncode", "PreviewAny")
+}
+mock_nodes.get_node_class = mock_nodes.NODE_CLASS_MAPPINGS.__getitem__
+
+with patch.dict('sys.modules', {'nodes': mock_nodes}):
+    from comfy_execution.caching import CacheKeySetInputSignature, HierarchicalCache
+    from comfy_execution.disk_cache import DiskCache, decode_output, encode_output
+    from comfy_execution.graph import DynamicPrompt
+
+
+class FakeIsChangedCache:
+    async def get(self, node_id):
+        return False
+
+
+PROMPT = {
+    "1": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": "model.safetensors"}},
+    "2": {"class_type": "CLIPTextEncode", "inputs": {"text": "a cat", "clip": ["1", 1]}},
+    "3": {"class_type": "PreviewAny", "inputs": {"source": ["2", 0]}},
+}
+
+
+def make_conditioning():
+    cond = torch.randn(1, 77, 16)
+    return [[[cond, {"pooled_output": torch.randn(1, 16), "strength": 1.0}]]]
+
+
+def assert_same_output(a, b):
+    assert torch.equal(a[0][0][0], b[0][0][0])
+    assert torch.equal(a[0][0][1]["pooled_output"], b[0][0][1]["pooled_output"])
+    assert a[0][0][1]["strength"] == b[0][0][1]["strength"]
+
+
+def new_cache(disk_cache):
+    cache = HierarchicalCache(CacheKeySetInputSignature, disk_cache=disk_cache)
+    asyncio.run(cache.set_prompt(DynamicPrompt(PROMPT), PROMPT.keys(), FakeIsChangedCache()))
+    return cache
+
+
+def test_encode_roundtrip():
+    shared = torch.randn(4, 4)
+    value = {"samples": shared, "same": shared, "view": shared[1:], "batch": (1, 2.5, "x", None, True)}
+    tensors = {}
+    structure = encode_output(value, tensors, {})
+    assert len(tensors) == 2
+    decoded = decode_output(structure, tensors)
+    assert torch.equal(decoded["samples"], shared)
+    assert torch.equal(decoded["view"], shared[1:])
+    assert decoded["batch"] == (1, 2.5, "x", None, True)
+
+
+def test_outputs_survive_restart(tmp_path):
+    disk_cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024 * 1024)
+    cache = new_cache(disk_cache)
+    output = make_conditioning()
+    cache.set("2", output)
+    cache.set("3", [["not cached on disk"]])
+    assert disk_cache.flush(timeout=10)
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A new process (new caches, new DiskCache) gets the output from disk
+    restarted = new_cache(DiskCache(str(tmp_path), max_bytes=1024 * 1024 * 1024))
+    assert_same_output(restarted.get("2"), output)
+    assert restarted.get("3") is None
+    assert restarted.disk_cache.hits == 1
+
+
+def test_unsupported_outputs_are_skipped(tmp_path):
+    disk_cache = DiskCache(str(tmp_path), max_bytes=1024 * 1024 * 1024)
+    cache = new_cache(disk_cache)
+    cache.set("2", [[object()]])
+    assert disk_cache.flush(timeout=10)
+    assert os.listdir(tmp_path) == []
+
+
+def test_lru_eviction(tmp_path):
+    disk_cache = DiskCache(str(tmp_path), max_bytes=3 * 4096 + 2048, class_types=["CLIPTextEncode"])
+    for i in range(6):
+        key = bytes([i]) * 16
+        disk_cache.put(key, [[torch.zeros(1024)]])
+        assert disk_cache.flush(timeout=10)
+        os.utime(disk_cache._path(key), (i, i))
+    assert disk_cache.evictions > 0
+    assert disk_cache.total_bytes <= disk_cache.max_bytes
+    assert disk_cache.get(bytes([5]) * 16) is not None
+    assert disk_cache.get(bytes([0]) * 16) is None
+
+
+
+def test_replaced_model_misses(tmp_path, monkeypatch):
+    models = tmp_path / "checkpoints"
+    models.mkdir()
+    model = models / "model.safetensors"
+    model.write_bytes(b"old weights")
+    monkeypatch.setitem(folder_paths.folder_names_and_paths, "checkpoints", ([str(models)], {".safetensors"}))
+
+    disk_cache = DiskCache(str(tmp_path / "cache"), max_bytes=1024 * 1024 * 1024)
+    output = make_conditioning()
+    new_cache(disk_cache).set("2", output)
+    assert disk_cache.flush(timeout=10)
+    assert_same_output(new_cache(disk_cache).get("2"), output)
+
+    # Same name, different file: the entry made from the old model is not used
+    model.write_bytes(b"new, larger weights")
+    assert new_cache(disk_cache).get("2") is None
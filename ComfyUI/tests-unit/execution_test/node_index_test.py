@@ -0,0 +1,146 @@
+import os
+
+from comfy_execution.node_index import LazyNode, LazyNodeMappings, NodeIndex
+
+
+class RealNode:
+    pass
+
+
+def make_mappings(loaded):
+    mappings = LazyNodeMappings({"Core": RealNode})
+    mappings["Extra"] = LazyNode("/nodes/extra.py")
+
+    def loader(module_path, class_type):
+        loaded.append((module_path, class_type))
+        mappings["Extra"] = RealNode
+
+    mappings.loader = loader
+    return mappings
+
+
+def test_membership_does_not_import():
+    loaded = []
+    mappings = make_mappings(loaded)
+    assert "Extra" in mappings
+    assert list(mappings) == ["Core", "Extra"]
+    assert mappings.is_lazy("Extra")
+    assert loaded == []
+
+
+def test_lookup_imports_once():
+    loaded = []
+    mappings = make_mappings(loaded)
+    assert mappings["Extra"] is RealNode
+    assert mappings.get("Extra") is RealNode
+    assert loaded == [("/nodes/extra.py", "Extra")]
+    assert not mappings.is_lazy("Extra")
+
+
+def test_failed_import_removes_placeholder():
+    mappings = LazyNodeMappings()
+    mappings["Broken"] = LazyNode("/nodes/broken.py")
+    mappings.loader = lambda module_path, class_type: None
+    assert mappings.get("Broken") is None
+    assert "Broken" not in mappings
+
+
+def write_module(tmp_path, name="nodes_extra.py", text="NODE_CLASS_MAPPINGS = {}\n"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_index_round_trip(tmp_path):
+    module_path = write_module(tmp_path)
+    index_path = str(tmp_path / "index" / "node_index.json")
+    index = NodeIndex(index_path, "v1")
+    index.record(module_path, "comfy_extras", ["Extra"], {"Extra": "Extra Node"}, eager=False, import_time=0.5)
+    mappings = LazyNodeMappings({"Extra": RealNode})
+    index.update_info(mappings, lambda class_type: {"name": class_type})
+    index.save()
+
+    reloaded = NodeIndex(index_path, "v1")
+    entry = reloaded.get_fresh(module_path)
+    assert entry["nodes"] == ["Extra"]
+    assert entry["display_names"] == {"Extra": "Extra Node"}
+    assert reloaded.cached_info("Extra") == {"name": "Extra"}
+
+
+def test_index_is_invalidated(tmp_path):
+    module_path = write_module(tmp_path)
+    index_path = str(tmp_path / "node_index.json")
+    index = NodeIndex(index_path, "v1")
+    index.record(module_path, "comfy_extras", ["Extra"], {}, eager=False, import_time=0.1)
+    index.save()
+
+    assert NodeIndex(index_path, "v2").get_fresh(module_path) is None
+    with open(module_path, "a") as f:
+        f.write("# changed\n")
+    assert NodeIndex(index_path, "v1").get_fresh(module_path) is None
+
+
+def test_eager_and_empty_modules_are_not_lazy(tmp_path):
+    index = NodeIndex(str(tmp_path / "node_index.json"), "v1")
+    eager = write_module(tmp_path, "eager.py")
+    empty = write_module(tmp_path, "canary.py")
+    index.record(eager, "custom_nodes", ["Eager"], {}, eager=True, import_time=0.1)
+    index.record(empty, "comfy_api_nodes", [], {}, eager=False, import_time=0.1)
+    assert index.get_fresh(eager) is None
+    assert index.get_fresh(empty) is None
+
+
+def test_nodes_reading_folders_are_not_cached(tmp_path):
+    import folder_paths
+
+    module_path = write_module(tmp_path)
+    index = NodeIndex(str(tmp_path / "node_index.json"), "v1")
+    index.record(module_path, "comfy_extras", ["Static", "Loader"], {}, eager=False, import_time=0.1)
+    mappings = LazyNodeMappings({"Static": RealNode, "Loader": RealNode})
+
+    def node_info(class_type):
+        if class_type == "Loader":
+            folder_paths.get_folder_paths("checkpoints")
+        return {"name": class_type}
+
+    index.update_info(mappings, node_info)
+    assert index.cached_info("Static") == {"name": "Static"}
+    assert index.cached_info("Loader") is None
+    assert os.path.basename(index.class_modules["Loader"]) == "nodes_extra.py"
+
+
+def test_lazy_import_can_load_other_lazy_modules(tmp_path, monkeypatch):
+    import asyncio
+    import threading
+
+    import torch
+    from comfy.cli_args import args
+    if not torch.cuda.is_available():
+        args.cpu = True
+    import nodes
+
+    node_text = "class {0}:\n    pass\n\nNODE_CLASS_MAPPINGS = {{'{0}': {0}}}\n"
+    # Module A looks up a node of module B, and one of its own, while it is imported
+    a_path = write_module(tmp_path, "lazy_a.py", "import nodes\nB = nodes.NODE_CLASS_MAPPINGS['LazyB']\n"
+                          "OWN = nodes.NODE_CLASS_MAPPINGS.get('LazyA')\n" + node_text.format("LazyA"))
+    b_path = write_module(tmp_path, "lazy_b.py", node_text.format("LazyB"))
+
+    index = NodeIndex(str(tmp_path / "node_index.json"), "v1")
+    index.record(a_path, "custom_nodes", ["LazyA"], {}, eager=False, import_time=0.1)
+    index.record(b_path, "custom_nodes", ["LazyB"], {}, eager=False, import_time=0.1)
+    mappings = LazyNodeMappings({"Core": RealNode, "LazyA": LazyNode(a_path), "LazyB": LazyNode(b_path)})
+    mappings.loader = nodes.load_lazy_node_module
+    monkeypatch.setattr(nodes, "NODE_CLASS_MAPPINGS", mappings)
+    monkeypatch.setattr(nodes, "NODE_INDEX", index)
+
+    async def lookup():
+        # Inside a running loop, like prompt validation in the server
+        return mappings["LazyA"]
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(asyncio.run(lookup())), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "lazy import deadlocked"
+    assert result[0].__name__ == "LazyA"
+    assert mappings["LazyB"].__name__ == "LazyB"
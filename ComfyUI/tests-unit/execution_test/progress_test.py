@@ -0,0 +1,76 @@
+from comfy_execution.progress import ProgressRegistry, WebUIProgressHandler
+
+
+class FakeDynPrompt:
+    def get_display_node_id(self, node_id):
+        return node_id
+
+    def get_parent_node_id(self, node_id):
+        return None
+
+    def get_real_node_id(self, node_id):
+        return node_id
+
+
+class FakeServer:
+    def __init__(self, feature_flags=None):
+        self.client_id = "client"
+        self.sockets_metadata = {"client": {"feature_flags": feature_flags or {}}}
+        self.messages = []
+
+    def send_sync(self, event, data, sid=None):
+        if event == "progress_state":
+            self.messages.append(data)
+
+
+def make_registry(server, min_interval=0.1):
+    registry = ProgressRegistry("prompt", FakeDynPrompt())
+    handler = WebUIProgressHandler(server, min_interval=min_interval)
+    handler.set_registry(registry)
+    registry.register_handler(handler)
+    return registry
+
+
+def test_step_updates_are_coalesced():
+    server = FakeServer()
+    registry = make_registry(server, min_interval=60)
+    registry.start_progress("1")
+    for step in range(20):
+        registry.update_progress("1", step, 20)
+    registry.finish_progress("1")
+    # start and finish are always sent, the steps fall inside the window
+    assert len(server.messages) == 2
+    assert server.messages[-1]["nodes"]["1"]["state"] == "finished"
+
+
+def test_updates_are_sent_after_the_window():
+    server = FakeServer()
+    registry = make_registry(server, min_interval=0)
+    registry.start_progress("1")
+    registry.update_progress("1", 1, 20)
+    registry.update_progress("1", 1, 20)
+    registry.update_progress("1", 2, 20)
+    # The repeated update didn't change anything
+    assert [m["nodes"]["1"]["value"] for m in server.messages] == [0.0, 1, 2]
+
+
+def test_legacy_clients_get_full_state():
+    server = FakeServer()
+    registry = make_registry(server, min_interval=0)
+    registry.start_progress("1")
+    registry.finish_progress("1")
+    registry.start_progress("2")
+    assert set(server.messages[-1]["nodes"]) == {"1", "2"}
+    assert "delta" not in server.messages[-1]
+
+
+def test_delta_clients_get_changed_nodes_only():
+    server = FakeServer({"supports_progress_state_delta": True})
+    registry = make_registry(server, min_interval=0)
+    registry.start_progress("1")
+    registry.finish_progress("1")
+    registry.start_progress("2")
+    registry.update_progress("2", 5, 10)
+    assert set(server.messages[-2]["nodes"]) == {"2"}
+    assert server.messages[-1]["delta"] is True
+    assert server.messages[-1]["nodes"]["2"]["value"] == 5
@@ -0,0 +1,94 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from comfy.cli_args import args
+
+if not torch.cuda.is_available():
+    # model_management picks the torch device on import
+    args.cpu = True
+
+import comfy.model_management  # noqa: E402
+from comfy.model_patcher import ModelPatcher  # noqa: E402
+from comfy_execution.graph import DynamicPrompt  # noqa: E402
+from comfy_execution.residency import ResidencyPlanner  # noqa: E402
+
+
+def make_prompt(text="a cat"):
+    return {
+        "1": {"class_type": "UNETLoader", "inputs": {"unet_name": "high.safetensors", "weight_dtype": "default"}},
+        "2": {"class_type": "UNETLoader", "inputs": {"unet_name": "low.safetensors", "weight_dtype": "default"}},
+        "3": {"class_type": "CLIPLoader", "inputs": {"clip_name": "umt5.safetensors", "type": "wan"}},
+        "4": {"class_type": "VAELoader", "inputs": {"vae_name": "wan.safetensors"}},
+        "5": {"class_type": "CLIPTextEncode", "inputs": {"text": text, "clip": ["3", 0]}},
+        "6": {"class_type": "LoraLoaderModelOnly", "inputs": {"model": ["1", 0], "lora_name": "style.safetensors", "strength_model": 1.0}},
+        "7": {"class_type": "KSamplerAdvanced", "inputs": {"model": ["6", 0], "positive": ["5", 0], "negative": ["5", 0], "latent_image": ["9", 0]}},
+        "8": {"class_type": "KSamplerAdvanced", "inputs": {"model": ["2", 0], "positive": ["5", 0], "negative": ["5", 0], "latent_image": ["7", 0]}},
+        "9": {"class_type": "EmptyLatentImage", "inputs": {"width": 64, "height": 64, "batch_size": 1}},
+        "10": {"class_type": "VAEDecode", "inputs": {"samples": ["8", 0], "vae": ["4", 0]}},
+    }
+
+
+def make_patcher():
+    return ModelPatcher(torch.nn.Linear(4, 4), torch.device("cpu"), torch.device("cpu"))
+
+
+class Queue:
+    def __init__(self, prompts):
+        self.mutex = threading.RLock()
+        self.queue = [(i, "p{}".format(i), prompt, {}, []) for i, prompt in enumerate(prompts)]
+
+
+def run_loaders(planner, prompt):
+    patchers = {node_id: make_patcher() for node_id in ("1", "2", "4")}
+    clip = SimpleNamespace(patcher=make_patcher())
+    planner.begin_prompt(DynamicPrompt(prompt), SimpleNamespace(pendingNodes={}))
+    for node_id, patcher in patchers.items():
+        planner.register_outputs(node_id, [[patcher]])
+    planner.register_outputs("3", [[clip]])
+    patchers["3"] = clip.patcher
+    return patchers
+
+
+def test_next_use_of_running_and_queued_prompts():
+    prompt = make_prompt()
+    planner = ResidencyPlanner(Queue([make_prompt("a dog")]))
+    patchers = run_loaders(planner, prompt)
+    # The text encoder ran, the samplers and the decoder are still pending
+    planner.begin_prompt(DynamicPrompt(prompt), SimpleNamespace(pendingNodes={"6": True, "7": True, "8": True, "10": True}))
+    uses = planner.next_uses()
+    distance = {node_id: uses[id(p.model)][0] for node_id, p in patchers.items()}
+    assert distance == {"1": (0, 1), "2": (0, 2), "3": (1, 0), "4": (0, 3)}
+
+
+def test_eviction_order_is_farthest_next_use_first():
+    prompt = make_prompt()
+    planner = ResidencyPlanner(Queue([make_prompt("a dog")]))
+    patchers = run_loaders(planner, prompt)
+    planner.begin_prompt(DynamicPrompt(prompt), SimpleNamespace(pendingNodes={"6": True, "7": True, "8": True, "10": True}))
+    unused = make_patcher()
+    candidates = {name: comfy.model_management.LoadedModel(p) for name, p in [("unused", unused)] + [(k, v) for k, v in patchers.items()]}
+    uses = planner.next_uses()
+    order = sorted(candidates, key=lambda name: planner.eviction_rank(candidates[name], uses))
+    assert order == ["unused", "3", "4", "2", "1"]
+
+    planner.record_eviction(candidates["3"], uses, 1024)
+    decision = planner.get_stats()["decisions"][-1]
+    assert decision["action"] == "unload"
+    assert decision["reason"] == "next used by queued prompt 1"
+
+
+def test_unknown_models_have_no_next_use():
+    planner = ResidencyPlanner(Queue([make_prompt()]))
+    assert planner.next_uses() == {}
+
+
+def test_end_prompt_does_not_preload(monkeypatch):
+    # Pre-loading is left to the prompt worker's idle gap, after the prompt was reported
+    planner = ResidencyPlanner(Queue([make_prompt()]))
+    run_loaders(planner, make_prompt())
+    monkeypatch.setattr(comfy.model_management, "load_models_gpu", lambda *a, **k: pytest.fail("model loaded"))
+    planner.end_prompt()
+    assert planner.dynprompt is None
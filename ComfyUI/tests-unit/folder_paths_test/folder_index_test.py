@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+
+import pytest
+
+import folder_paths
+from folder_paths import FolderIndex
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("test")
+
+
+def bump_mtime(path):
+    # Folder mtimes can be too coarse to notice a change made right after a listing
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def wait_for(predicate, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def root(tmp_path):
+    touch(str(tmp_path / "a.safetensors"))
+    touch(str(tmp_path / "sub" / "b.safetensors"))
+    return str(tmp_path)
+
+
+def test_not_running_walks_every_time(root):
+    index = FolderIndex()
+    files, _ = index.search(root)
+    assert sorted(files) == ["a.safetensors", os.path.join("sub", "b.safetensors")]
+    assert index.versions([root]) is None
+    assert index.contains(root, "a.safetensors") is None
+
+
+def test_polled_index(root):
+    index = FolderIndex()
+    index.start("poll")
+    files, _ = index.search(root)
+    version = index.version(root)
+    assert version is not None
+    assert index.contains(root, os.path.join("sub", "b.safetensors"))
+    assert not index.contains(root, "missing.safetensors")
+
+    touch(os.path.join(root, "sub", "c.safetensors"))
+    bump_mtime(os.path.join(root, "sub"))
+    index.poll()
+    assert index.version(root) is None
+    assert index.contains(root, "a.safetensors") is None
+    files, _ = index.search(root)
+    assert os.path.join("sub", "c.safetensors") in files
+    assert index.version(root) == version + 1
+
+
+def test_invalidate(root):
+    index = FolderIndex()
+    index.start("poll")
+    index.search(root)
+    index.invalidate(os.path.join(root, "sub"))
+    assert index.version(root) is None
+    index.invalidate(os.path.join(os.path.dirname(root), "other"))
+    index.search(root)
+    assert index.version(root) is not None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+def test_inotify_index(root):
+    index = FolderIndex()
+    index.start("auto")
+    assert index.inotify is not None
+    index.search(root)
+    assert index.version(root) is not None
+
+    touch(os.path.join(root, "sub", "c.safetensors"))
+    assert wait_for(lambda: index.version(root) is None)
+    files, _ = index.search(root)
+    assert os.path.join("sub", "c.safetensors") in files
+
+    # New folders are watched after the next listing
+    touch(os.path.join(root, "new", "d.safetensors"))
+    assert wait_for(lambda: index.version(root) is None)
+    index.search(root)
+    touch(os.path.join(root, "new", "e.safetensors"))
+    assert wait_for(lambda: index.version(root) is None)
+
+
+def test_filename_list_uses_index(root, monkeypatch):
+    index = FolderIndex()
+    index.start("poll")
+    monkeypatch.setattr(folder_paths, "folder_index", index)
+    monkeypatch.setitem(folder_paths.folder_names_and_paths, "test_models", ([root], {".safetensors"}))
+    try:
+        assert folder_paths.get_filename_list("test_models") == ["a.safetensors", os.path.join("sub", "b.safetensors")]
+        assert folder_paths.get_full_path("test_models", "sub/b.safetensors") == os.path.join(root, "sub", "b.safetensors")
+        assert folder_paths.get_full_path("test_models", "missing.safetensors") is None
+
+        touch(os.path.join(root, "c.safetensors"))
+        # Without a poll or an event the index still serves the old listing
+        assert "c.safetensors" not in folder_paths.get_filename_list("test_models")
+        index.invalidate(root)
+        assert "c.safetensors" in folder_paths.get_filename_list("test_models")
+        assert folder_paths.get_directory_files(root) == ["a.safetensors", "c.safetensors"]
+    finally:
+        folder_paths.filename_list_cache.pop("test_models", None)
+        folder_paths.filename_list_versions.pop("test_models", None)
+
+
+def test_directory_files_without_index_do_not_walk(root, monkeypatch):
+    index = FolderIndex()
+    index.start("off")
+    monkeypatch.setattr(folder_paths, "folder_index", index)
+    monkeypatch.setattr(index, "search", lambda *args, **kwargs: pytest.fail("walked subfolders"))
+    assert folder_paths.get_directory_files(root) == ["a.safetensors"]
@@ -0,0 +1,180 @@
+from typing import Dict, Any, Optional, List, Tuple, Callable
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_WRITES = 500
+
+# A pending write: ("set" | "merge", data)
+PendingWrite = Tuple[str, Dict[str, Any]]
+
+def merge_writes(older: Optional[PendingWrite], op: str, data: Dict[str, Any]) -> PendingWrite:
+    """Coalesce a new write for a document into the one already pending"""
+    if older is None or op == "set":
+        return (op, dict(data))
+    older_op, older_data = older
+    return (older_op, {**older_data, **data})
+
+class FirestoreSink:
+    """Commits coalesced writes to Firestore in batch writes (blocking)"""
+
+    def __init__(self, db_factory: Optional[Callable] = None):
+        self.db_factory = db_factory
+        self.db = None
+
+    def commit(self, writes: List[Tuple[str, str, str, Dict[str, Any]]]):
+        if self.db is None:
+            if self.db_factory is None:
+                # Imported here so the write-behind layer works with MemorySink without firebase_admin
+                from firebase.firebaseAdmin import get_db
+                self.db_factory = get_db
+            self.db = self.db_factory()
+        batch = self.db.batch()
+        for collection, doc_id, op, data in writes:
+            ref = self.db.collection(collection).document(doc_id)
+            if op == "set":
+                batch.set(ref, data)
+            else:
+                # merge instead of update so a write never fails the whole
+                # batch because its document does not exist yet
+                batch.set(ref, data, merge=True)
+        batch.commit()
+
+class MemorySink:
+    """Local stand-in for Firestore that records documents and batches"""
+
+    def __init__(self):
+        self.documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.batches: List[List[Tuple[str, str, str, Dict[str, Any]]]] = []
+        self._lock = threading.Lock()
+
+    def commit(self, writes: List[Tuple[str, str, str, Dict[str, Any]]]):
+        with self._lock:
+            self.batches.append(list(writes))
+            for collection, doc_id, op, data in writes:
+                key = (collection, doc_id)
+                if op == "set":
+                    self.documents[key] = dict(data)
+                else:
+                    self.documents.setdefault(key, {}).update(data)
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self.documents.get((collection, doc_id))
+            return dict(doc) if doc is not None else None
+
+class FirestoreWriteBehind:
+    """Async write-behind buffer for Firestore documents
+
+    Writes return immediately and are coalesced per document, so a burst of
+    status/progress updates for one job becomes a single write. Pending
+    writes are flushed every ``flush_interval`` seconds (or as soon as a
+    full batch is waiting) in batch writes that run in a worker thread, so
+    the blocking Firestore client never stalls the event loop.
+    """
+
+    def __init__(self, sink=None, flush_interval: float = 0.5, max_retries: int = 5):
+        self.sink = sink or FirestoreSink()
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._pending: Dict[Tuple[str, str], PendingWrite] = {}
+        self._retries: Dict[Tuple[str, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._closing = False
+        self.stats = {"writes": 0, "committed": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._closing = False
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def set(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        """Queue a full document write"""
+        self._queue(collection, doc_id, "set", data)
+
+    def update(self, collection: str, doc_id: str, data: Dict[str, Any]):
+        """Queue a partial update; later values win over earlier pending ones"""
+        self._queue(collection, doc_id, "merge", data)
+
+    def _queue(self, collection: str, doc_id: str, op: str, data: Dict[str, Any]):
+        self._ensure_started()
+        key = (collection, doc_id)
+        self._pending[key] = merge_writes(self._pending.get(key), op, data)
+        self.stats["writes"] += 1
+        if len(self._pending) >= MAX_BATCH_WRITES:
+            self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Commit everything pending now"""
+        if not self._pending:
+            return
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            writes = [(c, d, op, data) for (c, d), (op, data) in pending.items()]
+
+            for start in range(0, len(writes), MAX_BATCH_WRITES):
+                chunk = writes[start:start + MAX_BATCH_WRITES]
+                try:
+                    await asyncio.to_thread(self.sink.commit, chunk)
+                    self.stats["batches"] += 1
+                    self.stats["committed"] += len(chunk)
+                    for collection, doc_id, _, _ in chunk:
+                        self._retries.pop((collection, doc_id), None)
+                except Exception as e:
+                    self.stats["failed_batches"] += 1
+                    logger.error(f"Firestore batch write failed ({len(chunk)} writes): {e}")
+                    self._requeue(chunk)
+
+    def _requeue(self, chunk):
+        for collection, doc_id, op, data in chunk:
+            key = (collection, doc_id)
+            retries = self._retries.get(key, 0) + 1
+            if retries > self.max_retries:
+                self._retries.pop(key, None)
+                self.stats["dropped"] += 1
+                logger.error(f"Dropping Firestore write for {collection}/{doc_id} after {self.max_retries} retries")
+                continue
+            self._retries[key] = retries
+            # Writes queued while the batch was in flight are newer
+            newer = self._pending.get(key)
+            merged = (op, dict(data))
+            if newer is not None:
+                merged = merge_writes(merged, newer[0], newer[1])
+            self._pending[key] = merged
+
+    async def close(self):
+        """Stop the flush loop and commit what is left"""
+        if self._task is not None:
+            # Let an in-flight batch finish instead of cancelling it
+            self._closing = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+# Global write-behind buffer shared by all services
+firestore_writer = FirestoreWriteBehind()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Microbenchmark: per-job workflow preparation, before and after template caching
+
+Run from python_service/:  python benchmarks/benchWorkflowTemplate.py
+"""
+import copy
+import json
+import os
+import sys
+import timeit
+
+python_service_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(python_service_root, 'utils'))
+
+from comfyUi.services.workflowTemplate import WorkflowTemplateCache
+
+IMG2VID_PATH = os.path.join(
+    python_service_root, 'img2vid', 'workflows',
+    'workflow-wan22-image-2-video-nsfw-axtxs1ISH3F3mrVSCSyt-civet_flawless_61-openart.ai.json'
+)
+INSTANTID_PATH = os.path.join(python_service_root, 'text2Image', 'workflows', 'instantid_workflow.json')
+
+
+def img2vid_before():
+    with open(IMG2VID_PATH, 'r') as f:
+        workflow = copy.deepcopy(json.load(f))
+    for node in workflow["nodes"]:
+        if node.get("id") == 137:
+            node["widgets_values"][0] = "input.png"
+        elif node.get("id") == 140:
+            node["widgets_values"][0] = "a prompt"
+    return workflow
+
+
+def instantid_before():
+    with open(INSTANTID_PATH, 'r') as f:
+        workflow_str = json.dumps(json.load(f))
+    workflow_str = workflow_str.replace("{reference_image}", "face.png")
+    workflow_str = workflow_str.replace("{user_prompt}", "a prompt")
+    workflow_str = workflow_str.replace("{timestamp}", "42")
+    return json.loads(workflow_str)
+
+
+def main(number: int = 2000):
+    cache = WorkflowTemplateCache()
+    slots = {"image": (137, 0), "prompt": (140, 0)}
+    placeholders = ("reference_image", "user_prompt", "timestamp")
+
+    def img2vid_after():
+        return cache.get(IMG2VID_PATH, widget_slots=slots).instantiate({"image": "input.png", "prompt": "a prompt"})
+
+    def instantid_after():
+        return cache.get(INSTANTID_PATH, placeholders=placeholders).instantiate(
+            {"reference_image": "face.png", "user_prompt": "a prompt", "timestamp": "42"})
+
+    assert img2vid_after() == img2vid_before()
+    assert instantid_after() == instantid_before()
+
+    for name, before, after in (("img2vid", img2vid_before, img2vid_after),
+                                ("instantid", instantid_before, instantid_after)):
+        t_before = min(timeit.repeat(before, number=number, repeat=3)) / number
+        t_after = min(timeit.repeat(after, number=number, repeat=3)) / number
+        print(f"{name:10s} before: {t_before * 1e6:9.1f} us/job   after: {t_after * 1e6:7.1f} us/job   "
+              f"speedup: {t_before / t_after:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
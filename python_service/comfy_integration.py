@@ -1,11 +1,18 @@
 import sys
 import os
 import json
-import uuid
 from typing import Dict, Any, Optional
 import asyncio
 import logging
 
+# Add utils path for ComfyUI utilities
+utils_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from comfyUi.services.comfyClient import comfy_client
+from comfyUi.services.validateWorkflow import prepare_api_prompt
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -14,21 +21,31 @@ class ComfyUIManager:
         self.initialized = False
         self.execution = None
         self.server = None
+        self.client = comfy_client
         
     async def initialize(self):
         """Initialize ComfyUI execution engine"""
         try:
             logger.info("Initializing ComfyUI...")
             
-            # For now, mark as initialized without full ComfyUI import
-            # This allows the service to start while we work on proper integration
+            # ComfyUI may still be booting; the websocket listener keeps
+            # reconnecting in the background so jobs can be submitted later
             self.initialized = True
-            logger.info("ComfyUI basic initialization complete (full integration pending)")
+            try:
+                await self.client.start()
+                logger.info(f"Connected to ComfyUI at {self.client.comfy_url}")
+            except ConnectionError as e:
+                logger.warning(f"ComfyUI not reachable yet, will keep retrying: {e}")
             
         except Exception as e:
             logger.error(f"Failed to initialize ComfyUI: {e}")
             raise e
     
+    async def shutdown(self):
+        """Close the shared ComfyUI client"""
+        await self.client.close()
+        self.initialized = False
+    
     def _setup_comfy_config(self):
         """Set up basic ComfyUI configuration"""
         # Basic ComfyUI setup - can be expanded based on needs
@@ -39,7 +56,10 @@ class ComfyUIManager:
         return {
             "initialized": self.initialized,
             "execution_available": self.execution is not None,
-            "server_available": self.server is not None
+            "server_available": self.server is not None,
+            "websocket_connected": self.client.connected,
+            "active_jobs": self.client.active_jobs,
+            "queue_remaining": self.client.queue_remaining
         }
     
     async def execute_workflow(self, workflow: Dict[str, Any]) -> Dict[str, Any]:
@@ -48,22 +68,17 @@ class ComfyUIManager:
             raise RuntimeError("ComfyUI not initialized")
         
         try:
-            # Generate unique prompt ID
-            prompt_id = str(uuid.uuid4())
+            prompt = await prepare_api_prompt(workflow)
+            tracker = await self.client.submit(prompt)
             
-            logger.info(f"Executing workflow with prompt_id: {prompt_id}")
+            logger.info(f"Executing workflow with prompt_id: {tracker.prompt_id}")
             
-            # This is a placeholder for actual workflow execution
-            # Will be implemented with proper ComfyUI workflow execution
-            result = {
-                "prompt_id": prompt_id,
-                "status": "queued",
-                "workflow": workflow,
-                "message": "Workflow execution not fully implemented yet"
+            return {
+                "prompt_id": tracker.prompt_id,
+                "status": tracker.status,
+                "client_id": self.client.client_id
             }
             
-            return result
-            
         except Exception as e:
             logger.error(f"Workflow execution failed: {e}")
             raise e
@@ -73,10 +88,15 @@ class ComfyUIManager:
         if not self.initialized:
             return {"error": "ComfyUI not initialized"}
         
-        return {
-            "queue_running": [],
-            "queue_pending": []
-        }
+        try:
+            queue = await self.client.get_json("/queue")
+            return {
+                "queue_running": queue.get("queue_running", []),
+                "queue_pending": queue.get("queue_pending", [])
+            }
+        except Exception as e:
+            logger.error(f"Queue status check failed: {e}")
+            return {"error": str(e)}
 
 # Global ComfyUI manager instance
 comfy_manager = ComfyUIManager()
\ No newline at end of file
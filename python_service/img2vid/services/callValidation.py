@@ -77,6 +77,21 @@ class ValidationService:
             
         except Exception as e:
             logger.error(f"Direct JSON validation failed: {e}")
+            return {
+                "valid": False,
+                "details": {},
+                "errors": [str(e)],
+                "comfy_response": {}
+            }
+    
+    async def validate_job_workflow(self, template, values: Dict[str, Any],
+                                    checks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate a job's workflow using the cached template validation"""
+        try:
+            return await self.comfy_util.validate_template_instance(template, values, checks)
+            
+        except Exception as e:
+            logger.error(f"Job workflow validation failed: {e}")
             return {
                 "valid": False,
                 "details": {},
@@ -1,44 +1,74 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable
 import logging
+import sys
+import os
+
+# Add utils path for ComfyUI utilities
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from comfyUi.services.comfyClient import comfy_client, ComfySubmissionError
+from comfyUi.services.validateWorkflow import prepare_api_prompt
 
 logger = logging.getLogger(__name__)
 
 class CallComfyJobHandlerService:
     """Service for handling ComfyUI job submission and tracking"""
-    
+
     def __init__(self):
-        # TODO: Initialize ComfyUI client when ready
-        pass
-    
-    async def submit_job(self, job_id: str, workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Shared keep-alive client; one session and one /ws for all jobs
+        self.client = comfy_client
+
+    async def submit_job(self, job_id: str, workflow_data: Dict[str, Any],
+                         on_event: Optional[Callable] = None) -> Dict[str, Any]:
         """Submit job to ComfyUI for processing"""
         try:
             logger.info(f"Submitting job to ComfyUI: {job_id}")
-            
-            # TODO: Implement actual ComfyUI submission
-            # For now, just mock the submission
-            logger.info(f"Mock ComfyUI submission for job: {job_id}")
-            logger.info(f"Workflow has {len(workflow_data.get('nodes', []))} nodes")
-            logger.info(f"Job will use client_id: {job_id}")
-            
-            # Mock successful submission
-            print(f"=> Sending job to ComfyUI: {job_id}")
-            print(f"=> Workflow nodes: {len(workflow_data.get('nodes', []))}")
-            print(f"=> ComfyUI client_id: {job_id}")
-            print(f"=> Status: Job queued for processing...")
-            
+
+            prompt = await prepare_api_prompt(workflow_data)
+            tracker = await self.client.submit(
+                prompt,
+                job_id=job_id,
+                extra_data={"job_id": job_id},
+                on_event=on_event
+            )
+
+            logger.info(f"Job {job_id} queued in ComfyUI as prompt {tracker.prompt_id}")
+
             return {
                 "success": True,
                 "job_id": job_id,
-                "client_id": job_id,
+                "prompt_id": tracker.prompt_id,
+                "client_id": self.client.client_id,
                 "status": "queued",
                 "message": "Job submitted to ComfyUI successfully"
             }
-            
+
+        except ComfySubmissionError as e:
+            logger.error(f"ComfyUI rejected job {job_id}: {e}")
+            return {
+                "success": False,
+                "job_id": job_id,
+                "error": str(e),
+                "node_errors": e.node_errors
+            }
         except Exception as e:
             logger.error(f"Failed to submit job to ComfyUI: {e}")
             return {
                 "success": False,
                 "job_id": job_id,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+    def get_job_status(self, prompt_id: str) -> Optional[Dict[str, Any]]:
+        """Get the live status of a job still tracked over the websocket"""
+        tracker = self.client.get_tracker(prompt_id)
+        return tracker.to_dict() if tracker else None
+
+    async def wait_for_completion(self, prompt_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for a submitted job to finish"""
+        tracker = self.client.get_tracker(prompt_id)
+        if tracker is None:
+            raise KeyError(f"Prompt is not being tracked: {prompt_id}")
+        return await tracker.wait(timeout)
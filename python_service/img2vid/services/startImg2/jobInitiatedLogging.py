@@ -10,25 +10,16 @@ python_service_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.di
 if python_service_root not in sys.path:
     sys.path.insert(0, python_service_root)
 
-from firebase.firebaseAdmin import get_db
+from firebase.firestoreWriter import firestore_writer
 
 logger = logging.getLogger(__name__)
 
 class JobInitiatedLoggingService:
     """Service for creating and managing job documents in Firestore"""
     
-    def __init__(self):
-        self.db = None
-    
-    def _get_db(self):
-        """Get Firestore database instance"""
-        if not self.db:
-            try:
-                self.db = get_db()
-            except Exception as e:
-                logger.error(f"Failed to get Firebase database: {e}")
-                raise e
-        return self.db
+    def __init__(self, writer=None):
+        # Writes are buffered and committed in batches off the event loop
+        self.writer = writer or firestore_writer
     
     async def create_job_document(self, file_name: str, prompt: str, uid: Optional[str] = None) -> str:
         """Create job document in Firestore and return job_id"""
@@ -54,11 +45,10 @@ class JobInitiatedLoggingService:
                 job_doc["uid"] = uid
                 logger.info(f"Job associated with user: {uid}")
             
-            # Save to Firestore
-            db = self._get_db()
-            db.collection('jobs').document(job_id).set(job_doc)
+            # Queue the write; it is committed with the next batch
+            self.writer.set('jobs', job_id, job_doc)
             
-            logger.info(f"Job document created successfully: {job_id}")
+            logger.info(f"Job document queued: {job_id}")
             logger.info(f"Job details - file: {file_name}, uid: {uid}, status: pending")
             
             return job_id
@@ -68,9 +58,9 @@ class JobInitiatedLoggingService:
             raise e
     
     async def update_job_status(self, job_id: str, status: str, **kwargs) -> bool:
-        """Update job status in Firestore"""
+        """Update job status in Firestore; pending updates for a job are coalesced"""
         try:
-            logger.info(f"Updating job status: {job_id} -> {status}")
+            logger.debug(f"Updating job status: {job_id} -> {status}")
             
             update_data = {
                 "status": status,
@@ -80,11 +70,9 @@ class JobInitiatedLoggingService:
             # Add any additional fields
             update_data.update(kwargs)
             
-            # Update Firestore document
-            db = self._get_db()
-            db.collection('jobs').document(job_id).update(update_data)
+            # Queue the update; later updates overwrite earlier pending fields
+            self.writer.update('jobs', job_id, update_data)
             
-            logger.info(f"Job status updated successfully: {job_id}")
             return True
             
         except Exception as e:
@@ -1,11 +1,30 @@
 from typing import Dict, Any
 import logging
-import json
+import sys
 import os
-import copy
+
+# Add utils path for ComfyUI utilities
+utils_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from comfyUi.services.workflowTemplate import workflow_templates, WorkflowTemplate
 
 logger = logging.getLogger(__name__)
 
+# Parameter slots in the WAN 2.2 workflow: name -> (node id, widgets_values index)
+WORKFLOW_SLOTS = {
+    "image": (137, 0),   # LoadImage
+    "prompt": (140, 0),  # Textbox
+}
+
+# Per-job checks on slot values; the rest of the template is validated once
+WORKFLOW_SLOT_CHECKS = {
+    "image": {"type": str, "min_length": 1, "max_length": 255, "filename": True,
+              "extensions": (".png", ".jpg", ".jpeg", ".webp")},
+    "prompt": {"type": str, "min_length": 1, "max_length": 10000},
+}
+
 class UpdateWorkflowService:
     """Service for updating workflow JSON with user parameters"""
     
@@ -22,15 +41,9 @@ class UpdateWorkflowService:
         try:
             logger.info(f"Updating workflow for job: {job_id}")
             
-            # Load workflow template
-            workflow_template = await self._load_workflow_template()
-            
-            # Create deep copy to avoid modifying original
-            workflow = copy.deepcopy(workflow_template)
-            
-            # Update workflow with user parameters
-            self._update_image_node(workflow, file_name)
-            self._update_prompt_node(workflow, prompt)
+            # Compiled once per template version; only the slot nodes are copied
+            template = await self.load_template()
+            workflow = template.instantiate({"image": file_name, "prompt": prompt})
             
             logger.info(f"Workflow updated successfully for job: {job_id}")
             logger.info(f"Updated parameters - image: {file_name}, prompt: {prompt}")
@@ -41,60 +54,11 @@ class UpdateWorkflowService:
             logger.error(f"Failed to update workflow: {e}")
             raise e
     
-    async def _load_workflow_template(self) -> Dict[str, Any]:
-        """Load workflow template from file"""
+    async def load_template(self) -> WorkflowTemplate:
+        """Load compiled workflow template, re-reading the file only when it changes"""
         try:
-            if not os.path.exists(self.template_path):
-                raise FileNotFoundError(f"Workflow template not found: {self.template_path}")
-            
-            with open(self.template_path, 'r') as f:
-                template = json.load(f)
-            
-            logger.info("Workflow template loaded successfully")
-            return template
+            return workflow_templates.get(self.template_path, widget_slots=WORKFLOW_SLOTS)
             
         except Exception as e:
             logger.error(f"Failed to load workflow template: {e}")
             raise e
-    
-    def _update_image_node(self, workflow: Dict[str, Any], file_name: str):
-        """Update LoadImage node (137) with new filename"""
-        try:
-            # Node 137 is the LoadImage node
-            nodes = workflow.get("nodes", [])
-            node_found = False
-            
-            # Find node 137 in nodes array
-            for node in nodes:
-                if node.get("id") == 137:
-                    node_found = True
-                    if "widgets_values" in node and len(node["widgets_values"]) > 0:
-                        node["widgets_values"][0] = file_name
-                        logger.info(f"Updated LoadImage node with filename: {file_name}")
-                    else:
-                        logger.warning(f"LoadImage node (137) found but no widgets_values: {node}")
-                    break
-            
-            if not node_found:
-                logger.warning("LoadImage node (137) not found in workflow")
-                
-        except Exception as e:
-            logger.error(f"Failed to update image node: {e}")
-            raise e
-    
-    def _update_prompt_node(self, workflow: Dict[str, Any], prompt: str):
-        """Update Textbox node (140) with new prompt"""
-        try:
-            # Node 140 is the Textbox node for prompt
-            for node in workflow["nodes"]:
-                if node.get("id") == 140:
-                    if "widgets_values" in node and len(node["widgets_values"]) > 0:
-                        node["widgets_values"][0] = prompt
-                        logger.info(f"Updated Textbox node with prompt: {prompt[:100]}...")
-                    break
-            else:
-                logger.warning("Textbox node (140) not found in workflow")
-                
-        except Exception as e:
-            logger.error(f"Failed to update prompt node: {e}")
-            raise e
\ No newline at end of file
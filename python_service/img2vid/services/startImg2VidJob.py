@@ -10,7 +10,7 @@ if startimg2_path not in sys.path:
     sys.path.insert(0, startimg2_path)
 
 from jobInitiatedLogging import JobInitiatedLoggingService
-from updateWorkflow import UpdateWorkflowService
+from updateWorkflow import UpdateWorkflowService, WORKFLOW_SLOT_CHECKS
 from startImg2.callComfyJobHandler import CallComfyJobHandlerService
 from callValidation import ValidationService
 
@@ -48,8 +48,13 @@ class StartImg2VidJobService:
             
             logger.info(f"Workflow updated for job: {job_id}")
             
-            # Step 3: Validate updated workflow
-            validation_result = await self.validation_service.validate_workflow_json(updated_workflow)
+            # Step 3: Validate updated workflow (template validated once per version)
+            template = await self.workflow_service.load_template()
+            validation_result = await self.validation_service.validate_job_workflow(
+                template,
+                {"image": file_name, "prompt": prompt},
+                WORKFLOW_SLOT_CHECKS
+            )
             
             if not validation_result.get("valid", False):
                 logger.error(f"Workflow validation failed for job {job_id}: {validation_result.get('errors', [])}")
@@ -68,13 +73,36 @@ class StartImg2VidJobService:
             # Step 4: Submit job to ComfyUI
             comfy_result = await self.comfy_service.submit_job(
                 job_id=job_id,
-                workflow_data=updated_workflow
+                workflow_data=updated_workflow,
+                on_event=self._on_comfy_event
             )
             
+            if not comfy_result.get("success", False):
+                logger.error(f"ComfyUI submission failed for job {job_id}: {comfy_result.get('error')}")
+                await self.logging_service.update_job_status(
+                    job_id, "failed", error=comfy_result.get("error", "ComfyUI submission failed")
+                )
+                return {
+                    "job_id": job_id,
+                    "status": "failed",
+                    "error": comfy_result.get("error", "ComfyUI submission failed"),
+                    "node_errors": comfy_result.get("node_errors", {}),
+                    "workflow_updated": True,
+                    "workflow_validated": True,
+                    "comfy_submitted": False
+                }
+            
             logger.info(f"Job submitted to ComfyUI: {job_id}")
+            # Events may already have arrived over /ws while the POST was in flight
+            live = self.comfy_service.get_job_status(comfy_result.get("prompt_id"))
+            if live is None or live["status"] == "queued":
+                await self.logging_service.update_job_status(
+                    job_id, "queued", prompt_id=comfy_result.get("prompt_id")
+                )
             
             return {
                 "job_id": job_id,
+                "prompt_id": comfy_result.get("prompt_id"),
                 "status": "pending",
                 "workflow_updated": True,
                 "workflow_validated": True,
@@ -91,4 +119,17 @@ class StartImg2VidJobService:
                 "workflow_updated": False,
                 "workflow_validated": False,
                 "comfy_submitted": False
-            }
\ No newline at end of file
+            }
+    
+    async def _on_comfy_event(self, tracker, event_type: str, data: Dict[str, Any]):
+        """Mirror ComfyUI progress into the job document"""
+        if event_type == "execution_start":
+            await self.logging_service.update_job_status(tracker.job_id, "running", progress=0)
+        elif event_type == "progress":
+            progress = tracker.progress
+            percent = int(100 * progress["value"] / progress["max"]) if progress["max"] else 0
+            await self.logging_service.update_job_status(tracker.job_id, "running", progress=percent)
+        elif tracker.done:
+            status = {"success": "completed", "interrupted": "cancelled"}.get(tracker.status, "failed")
+            extra = {"progress": 100} if status == "completed" else {"error": tracker.error}
+            await self.logging_service.update_job_status(tracker.job_id, status, **extra)
\ No newline at end of file
@@ -11,11 +11,35 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from comfy_integration import comfy_manager
 from firebase.firebaseAdmin import initialize_firebase, test_firebase_connection, get_db
+from firebase.firestoreWriter import firestore_writer
 from pythonBrain.controllers.routingController import RoutingController
+from pythonBrain.controllers.jobDispatcher import JobDispatcher, ServiceLimits, DispatcherSaturatedError
 
 app = FastAPI(title="Image Worker Python Service", version="1.0.0")
 router = RoutingController()
 
+def min_free_vram(env_name: str, default_gb: float) -> int:
+    """Free VRAM (bytes) ComfyUI must report before a job is admitted, from <env_name> in GB"""
+    return int(float(os.getenv(env_name, default_gb)) * (1024 ** 3))
+
+# Video jobs hold the GPU for minutes, so only a short ComfyUI backlog is accepted.
+# The VRAM floors only apply while ComfyUI has prompts queued; an idle ComfyUI
+# keeps its last models loaded but unloads them as the next job needs.
+dispatcher = JobDispatcher({
+    "img2vid": ServiceLimits(concurrency=2, max_queue=16, max_comfy_queue=4, expected_job_seconds=120,
+                             min_free_vram=min_free_vram("IMG2VID_MIN_FREE_VRAM_GB", 2)),
+    "text2Image": ServiceLimits(concurrency=4, max_queue=32, max_comfy_queue=16, expected_job_seconds=15,
+                                min_free_vram=min_free_vram("TEXT2IMAGE_MIN_FREE_VRAM_GB", 1)),
+})
+
+def saturated_exception(e: DispatcherSaturatedError) -> HTTPException:
+    """Map a rejected job to a 429/503 the load balancer can retry elsewhere"""
+    return HTTPException(
+        status_code=e.status_code,
+        detail={"error": e.reason, "retry_after": e.retry_after},
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize ComfyUI and Firebase on startup"""
@@ -32,6 +56,15 @@ async def startup_event():
         print(f"Warning: Firebase initialization failed: {e}")
         print("Service will start but Firebase features will be unavailable")
 
+    await dispatcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the job dispatcher, flush pending Firestore writes and close the ComfyUI client"""
+    await dispatcher.stop()
+    await firestore_writer.close()
+    await comfy_manager.shutdown()
+
 class Text2ImageValidationRequest(BaseModel):
     workflowName: str
 
@@ -61,7 +94,8 @@ async def health():
         "status": "healthy",
         "models_loaded": comfy_health.get("initialized", False),
         "comfyui": comfy_health,
-        "firebase": firebase_health
+        "firebase": firebase_health,
+        "dispatcher": dispatcher.stats()
     }
 
 @app.post("/text2image/validate")
@@ -108,8 +142,8 @@ async def validate_img2vid_workflow(request: Img2VidValidationRequest):
 async def start_img2vid_job(request: Img2VidStartJobRequest):
     """Start img2vid job"""
     try:
-        # Route through pythonBrain
-        result = await router.route_request(
+        # Route through pythonBrain, subject to admission control
+        result = await dispatcher.dispatch("img2vid", lambda: router.route_request(
             service="img2vid",
             task="startJob",
             data={
@@ -117,7 +151,7 @@ async def start_img2vid_job(request: Img2VidStartJobRequest):
                 "prompt": request.prompt,
                 "uid": request.uid
             }
-        )
+        ))
         
         return {
             "success": True,
@@ -126,6 +160,8 @@ async def start_img2vid_job(request: Img2VidStartJobRequest):
             "message": "Job started successfully"
         }
         
+    except DispatcherSaturatedError as e:
+        raise saturated_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -133,8 +169,8 @@ async def start_img2vid_job(request: Img2VidStartJobRequest):
 async def start_instantid_job(request: InstantIDStartJobRequest):
     """Start InstantID job"""
     try:
-        # Route through pythonBrain
-        result = await router.route_request(
+        # Route through pythonBrain, subject to admission control
+        result = await dispatcher.dispatch("text2Image", lambda: router.route_request(
             service="text2Image",
             task="startJobInstantID",
             data={
@@ -142,7 +178,7 @@ async def start_instantid_job(request: InstantIDStartJobRequest):
                 "prompt": request.prompt,
                 "uid": request.uid
             }
-        )
+        ))
         
         return {
             "success": True,
@@ -151,6 +187,8 @@ async def start_instantid_job(request: InstantIDStartJobRequest):
             "message": "InstantID job started successfully"
         }
         
+    except DispatcherSaturatedError as e:
+        raise saturated_exception(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
         
@@ -0,0 +1,209 @@
+from typing import Dict, Any, Optional, Callable, Awaitable
+import logging
+import asyncio
+import math
+import time
+import sys
+import os
+
+# Add utils path for ComfyUI utilities
+python_service_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+utils_path = os.path.join(python_service_root, 'utils')
+if utils_path not in sys.path:
+    sys.path.append(utils_path)
+
+from comfyUi.services.comfyClient import comfy_client
+
+logger = logging.getLogger(__name__)
+
+class DispatcherSaturatedError(Exception):
+    """Raised when a job is not admitted; maps to a 429/503 with Retry-After"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(reason)
+
+class ServiceLimits:
+    """Admission limits for one service"""
+
+    def __init__(self, concurrency: int = 2, max_queue: int = 32, max_comfy_queue: int = 8,
+                 min_free_vram: int = 0, expected_job_seconds: float = 30):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        # Reject while ComfyUI's PromptQueue holds at least this many prompts
+        self.max_comfy_queue = max_comfy_queue
+        # Reject while ComfyUI is busy and the GPU has less free VRAM than this
+        # (bytes, 0 disables). An idle ComfyUI keeps its last models loaded and
+        # frees them for the next job, so low free VRAM alone doesn't mean saturated.
+        self.min_free_vram = min_free_vram
+        # Rough GPU time per job, used for the Retry-After hint
+        self.expected_job_seconds = expected_job_seconds
+
+class JobDispatcher:
+    """Bounded asyncio dispatcher for job pipelines
+
+    Each service gets its own bounded queue drained by a fixed number of
+    workers. Jobs are only admitted while the local queue has room and
+    ComfyUI is not saturated (queue_remaining and free VRAM), otherwise the
+    caller gets DispatcherSaturatedError with a retry hint right away so the
+    load balancer can send the request to another pod.
+    """
+
+    def __init__(self, limits: Dict[str, ServiceLimits], client=None, stats_ttl: float = 2.0):
+        self.limits = limits
+        self.client = client or comfy_client
+        self.stats_ttl = stats_ttl
+
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._workers: Dict[str, list] = {}
+        self._running: Dict[str, int] = {name: 0 for name in limits}
+        self._counters: Dict[str, Dict[str, int]] = {
+            name: {"accepted": 0, "rejected": 0, "completed": 0, "failed": 0} for name in limits
+        }
+        self._system_stats: Optional[Dict[str, Any]] = None
+        self._system_stats_at = 0.0
+        self._comfy_queue: Optional[int] = None
+        self._comfy_queue_at = 0.0
+
+    async def start(self):
+        """Start the worker tasks for every service"""
+        for name, limits in self.limits.items():
+            if name in self._queues:
+                continue
+            queue = asyncio.Queue(maxsize=limits.max_queue)
+            self._queues[name] = queue
+            self._workers[name] = [
+                asyncio.create_task(self._worker(name, queue)) for _ in range(limits.concurrency)
+            ]
+        logger.info(f"Job dispatcher started for services: {list(self.limits)}")
+
+    async def stop(self):
+        """Cancel all workers; queued jobs fail with CancelledError"""
+        for workers in self._workers.values():
+            for task in workers:
+                task.cancel()
+        for workers in self._workers.values():
+            await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, _, future = queue.get_nowait()
+                if not future.done():
+                    future.cancel()
+        self._workers.clear()
+        self._queues.clear()
+
+    async def dispatch(self, service: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Admit a job, queue it and wait for its result"""
+        if service not in self.limits:
+            raise ValueError(f"Unknown service: {service}")
+        if service not in self._queues:
+            await self.start()
+
+        try:
+            await self._admit(service)
+        except DispatcherSaturatedError as e:
+            self._counters[service]["rejected"] += 1
+            logger.warning(f"Rejected {service} job: {e.reason} (retry after {e.retry_after}s)")
+            raise
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queues[service].put_nowait((job, time.monotonic(), future))
+        except asyncio.QueueFull:
+            self._counters[service]["rejected"] += 1
+            raise DispatcherSaturatedError(429, f"{service} queue is full", self._local_retry_after(service))
+
+        self._counters[service]["accepted"] += 1
+        return await future
+
+    async def _worker(self, service: str, queue: asyncio.Queue):
+        while True:
+            job, queued_at, future = await queue.get()
+            if future.cancelled():
+                queue.task_done()
+                continue
+
+            self._running[service] += 1
+            try:
+                result = await job()
+                if not future.done():
+                    future.set_result(result)
+                self._counters[service]["completed"] += 1
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                self._counters[service]["failed"] += 1
+            finally:
+                self._running[service] -= 1
+                queue.task_done()
+                logger.debug(f"{service} job finished after {time.monotonic() - queued_at:.2f}s")
+
+    async def _admit(self, service: str):
+        limits = self.limits[service]
+
+        if self._queues[service].full():
+            raise DispatcherSaturatedError(429, f"{service} queue is full", self._local_retry_after(service))
+
+        try:
+            comfy_queue = await self._get_comfy_queue()
+        except Exception as e:
+            raise DispatcherSaturatedError(503, f"ComfyUI unavailable: {e}", 5)
+
+        if comfy_queue is not None and comfy_queue >= limits.max_comfy_queue:
+            excess = comfy_queue - limits.max_comfy_queue + 1
+            retry_after = math.ceil(excess * limits.expected_job_seconds)
+            raise DispatcherSaturatedError(503, f"ComfyUI queue is full ({comfy_queue} pending)",
+                                           max(1, min(retry_after, 300)))
+
+        if limits.min_free_vram and comfy_queue:
+            stats = await self._get_system_stats()
+            devices = (stats or {}).get("devices", [])
+            if devices and devices[0].get("vram_free", 0) < limits.min_free_vram:
+                raise DispatcherSaturatedError(
+                    503, "Not enough free VRAM",
+                    max(1, min(math.ceil(limits.expected_job_seconds), 300)))
+
+    def _local_retry_after(self, service: str) -> int:
+        limits = self.limits[service]
+        backlog = self._queues[service].qsize() if service in self._queues else 0
+        return max(1, min(math.ceil(backlog * limits.expected_job_seconds / limits.concurrency), 300))
+
+    async def _get_comfy_queue(self) -> Optional[int]:
+        """ComfyUI queue depth; pushed over /ws when connected, else polled"""
+        if self.client.connected and self.client.queue_remaining is not None:
+            return self.client.queue_remaining
+
+        if time.monotonic() - self._comfy_queue_at > self.stats_ttl:
+            info = await self.client.get_json("/prompt")
+            self._comfy_queue = info.get("exec_info", {}).get("queue_remaining")
+            self._comfy_queue_at = time.monotonic()
+        return self._comfy_queue
+
+    async def _get_system_stats(self) -> Optional[Dict[str, Any]]:
+        if time.monotonic() - self._system_stats_at > self.stats_ttl:
+            try:
+                self._system_stats = await self.client.get_json("/system_stats")
+            except Exception as e:
+                logger.warning(f"Failed to read ComfyUI system stats: {e}")
+                self._system_stats = None
+            self._system_stats_at = time.monotonic()
+        return self._system_stats
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, running jobs and counters per service"""
+        return {
+            name: {
+                "queued": self._queues[name].qsize() if name in self._queues else 0,
+                "running": self._running[name],
+                "concurrency": limits.concurrency,
+                "max_queue": limits.max_queue,
+                **self._counters[name],
+            }
+            for name, limits in self.limits.items()
+        }
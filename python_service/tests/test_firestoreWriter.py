@@ -0,0 +1,118 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from firebase import firestoreWriter  # noqa: E402
+from firebase.firestoreWriter import FirestoreWriteBehind, MemorySink  # noqa: E402
+
+
+class FlakySink(MemorySink):
+    """MemorySink whose first commits fail"""
+
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    def commit(self, writes):
+        if self.failures > 0:
+            self.failures -= 1
+            raise RuntimeError("unavailable")
+        super().commit(writes)
+
+
+def make_writer(sink):
+    # Long interval so only explicit flushes commit
+    return FirestoreWriteBehind(sink=sink, flush_interval=60)
+
+
+def test_updates_to_one_document_are_coalesced():
+    sink = MemorySink()
+
+    async def run():
+        writer = make_writer(sink)
+        writer.set("jobs", "a", {"status": "queued", "progress": 0})
+        writer.update("jobs", "a", {"status": "running"})
+        writer.update("jobs", "a", {"progress": 50})
+        writer.update("jobs", "b", {"status": "queued"})
+        assert writer.pending == 2
+        await writer.flush()
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert sink.batches == [[
+        ("jobs", "a", "set", {"status": "running", "progress": 50}),
+        ("jobs", "b", "merge", {"status": "queued"}),
+    ]]
+    assert sink.get("jobs", "a") == {"status": "running", "progress": 50}
+    assert writer.stats["writes"] == 4
+    assert writer.stats["committed"] == 2
+
+
+def test_batches_are_capped(monkeypatch):
+    monkeypatch.setattr(firestoreWriter, "MAX_BATCH_WRITES", 3)
+    sink = MemorySink()
+
+    async def run():
+        writer = make_writer(sink)
+        for i in range(7):
+            writer.update("jobs", str(i), {"n": i})
+        await writer.close()
+
+    asyncio.run(run())
+    assert [len(batch) for batch in sink.batches] == [3, 3, 1]
+    assert len(sink.documents) == 7
+
+
+def test_failed_batch_is_requeued_and_retried():
+    sink = FlakySink(failures=1)
+
+    async def run():
+        writer = make_writer(sink)
+        writer.update("jobs", "a", {"status": "running", "progress": 10})
+        await writer.flush()
+        assert writer.pending == 1
+        # Written while the failed batch was in flight, so it is newer
+        writer.update("jobs", "a", {"progress": 20})
+        await writer.flush()
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert sink.get("jobs", "a") == {"status": "running", "progress": 20}
+    assert writer.stats["failed_batches"] == 1
+    assert writer.stats["dropped"] == 0
+    assert writer.pending == 0
+
+
+def test_write_is_dropped_after_max_retries():
+    sink = FlakySink(failures=10)
+
+    async def run():
+        writer = FirestoreWriteBehind(sink=sink, flush_interval=60, max_retries=2)
+        writer.update("jobs", "a", {"status": "running"})
+        for _ in range(3):
+            await writer.flush()
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.stats["dropped"] == 1
+    assert writer.pending == 0
+    assert sink.get("jobs", "a") is None
+
+
+def test_close_flushes_pending_writes():
+    sink = MemorySink()
+
+    async def run():
+        writer = make_writer(sink)
+        writer.set("jobs", "a", {"status": "done"})
+        await writer.close()
+        return writer
+
+    writer = asyncio.run(run())
+    assert sink.get("jobs", "a") == {"status": "done"}
+    assert writer.pending == 0
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pythonBrain.controllers.jobDispatcher import JobDispatcher, ServiceLimits, DispatcherSaturatedError  # noqa: E402
+
+GB = 1024 ** 3
+
+
+class FakeClient:
+    """Answers the polled ComfyUI endpoints the dispatcher reads"""
+
+    def __init__(self, vram_free, queue_remaining=0):
+        self.connected = False
+        self.queue_remaining = None
+        self.responses = {
+            "/prompt": {"exec_info": {"queue_remaining": queue_remaining}},
+            "/system_stats": {"devices": [{"name": "cuda:0", "vram_free": vram_free}]},
+        }
+
+    async def get_json(self, path):
+        return self.responses[path]
+
+
+async def run_job(dispatcher):
+    async def job():
+        return "done"
+    try:
+        return await dispatcher.dispatch("img2vid", job)
+    finally:
+        await dispatcher.stop()
+
+
+def test_rejects_when_vram_is_low():
+    dispatcher = JobDispatcher({"img2vid": ServiceLimits(min_free_vram=2 * GB, expected_job_seconds=120)},
+                               client=FakeClient(vram_free=GB, queue_remaining=1))
+    with pytest.raises(DispatcherSaturatedError) as e:
+        asyncio.run(run_job(dispatcher))
+    assert e.value.status_code == 503
+    assert e.value.retry_after == 120
+    assert dispatcher.stats()["img2vid"]["rejected"] == 1
+
+
+def test_admits_when_vram_is_free():
+    dispatcher = JobDispatcher({"img2vid": ServiceLimits(min_free_vram=2 * GB)},
+                               client=FakeClient(vram_free=8 * GB))
+    assert asyncio.run(run_job(dispatcher)) == "done"
+
+
+def test_idle_comfy_admits_despite_low_vram():
+    # Models stay loaded after a job, so an idle pod reports little free VRAM
+    dispatcher = JobDispatcher({"img2vid": ServiceLimits(min_free_vram=2 * GB)},
+                               client=FakeClient(vram_free=GB, queue_remaining=0))
+    assert asyncio.run(run_job(dispatcher)) == "done"
@@ -0,0 +1,98 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utils"))
+
+from comfyUi.services.localValidation import validate_node_input, validate_prompt  # noqa: E402
+
+SCHEMAS = {
+    "LoadImage": {
+        "input": {"required": {"image": [["cat.png", "dog.png"], {"image_upload": True}]}},
+        "output": ["IMAGE", "MASK"],
+        "output_node": False,
+    },
+    "PreviewAny": {
+        "input": {"required": {"source": ["*", {}]}},
+        "output": [],
+        "output_node": True,
+    },
+    "PreviewImage": {
+        "input": {"required": {"images": ["IMAGE", {}]}},
+        "output": [],
+        "output_node": True,
+    },
+    "AnyPassthrough": {
+        "input": {"required": {"value": ["*", {}]}},
+        "output": ["*"],
+        "output_node": False,
+    },
+}
+
+
+def test_wildcard_matches_every_type():
+    assert validate_node_input("IMAGE", "*")
+    assert validate_node_input("*", "LATENT")
+    assert not validate_node_input("IMAGE", "LATENT")
+
+
+def test_wildcard_input_link_is_valid():
+    prompt = {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "cat.png"}},
+        "2": {"class_type": "PreviewAny", "inputs": {"source": ["1", 0]}},
+    }
+    valid, error, good_outputs, node_errors = validate_prompt(prompt, SCHEMAS)
+    assert valid, (error, node_errors)
+    assert good_outputs == ["2"]
+
+
+def test_wildcard_output_link_is_valid():
+    prompt = {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "cat.png"}},
+        "2": {"class_type": "AnyPassthrough", "inputs": {"value": ["1", 0]}},
+        "3": {"class_type": "PreviewImage", "inputs": {"images": ["2", 0]}},
+    }
+    valid, error, _, node_errors = validate_prompt(prompt, SCHEMAS)
+    assert valid, (error, node_errors)
+
+
+def test_type_mismatch_is_rejected():
+    prompt = {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "cat.png"}},
+        "2": {"class_type": "PreviewImage", "inputs": {"images": ["1", 1]}},
+    }
+    valid, _, _, node_errors = validate_prompt(prompt, SCHEMAS)
+    assert not valid
+    assert node_errors["2"]["errors"][0]["type"] == "return_type_mismatch"
+
+
+def test_inputs_taken_by_validate_inputs_skip_builtin_checks():
+    schemas = dict(SCHEMAS)
+    schemas["LoadText"] = {
+        "input": {"required": {"path": [["a.txt"], {}], "size": ["INT", {"min": 1, "max": 8}]}},
+        "output": ["STRING"],
+        "output_node": True,
+    }
+    prompt = {"1": {"class_type": "LoadText", "inputs": {"path": "new.txt", "size": 64}}}
+    valid, _, _, node_errors = validate_prompt(prompt, schemas)
+    assert not valid
+    assert {e["type"] for e in node_errors["1"]["errors"]} == {"value_not_in_list", "value_bigger_than_max"}
+
+    # The node checks "path" itself, so only "size" is checked here
+    schemas["LoadText"]["validate_inputs"] = {"inputs": ["s", "path"], "kwargs": False}
+    valid, _, _, node_errors = validate_prompt(prompt, schemas)
+    assert [e["type"] for e in node_errors["1"]["errors"]] == ["value_bigger_than_max"]
+
+    schemas["LoadText"]["validate_inputs"] = {"inputs": ["s"], "kwargs": True}
+    valid, error, _, node_errors = validate_prompt(prompt, schemas)
+    assert valid, (error, node_errors)
+
+
+def test_input_types_argument_skips_link_type_check():
+    schemas = dict(SCHEMAS)
+    schemas["PreviewImage"] = dict(SCHEMAS["PreviewImage"], validate_inputs={"inputs": ["s", "input_types"], "kwargs": False})
+    prompt = {
+        "1": {"class_type": "LoadImage", "inputs": {"image": "cat.png"}},
+        "2": {"class_type": "PreviewImage", "inputs": {"images": ["1", 1]}},
+    }
+    valid, error, _, node_errors = validate_prompt(prompt, schemas)
+    assert valid, (error, node_errors)
@@ -2,7 +2,6 @@ from typing import Dict, Any
 import logging
 import sys
 import os
-import json
 
 # Add current directory to path for imports
 current_dir = os.path.dirname(__file__)
@@ -10,6 +9,17 @@ if current_dir not in sys.path:
     sys.path.append(current_dir)
 
 from callValidation import ValidationService
+from comfyUi.services.workflowTemplate import workflow_templates
+
+# Placeholders substituted into the InstantID workflow inputs
+WORKFLOW_PLACEHOLDERS = ("reference_image", "user_prompt", "timestamp")
+
+# Per-job checks on placeholder values; the rest of the template is validated once
+WORKFLOW_SLOT_CHECKS = {
+    "reference_image": {"type": str, "min_length": 1, "max_length": 255, "filename": True,
+                        "extensions": (".png", ".jpg", ".jpeg", ".webp")},
+    "user_prompt": {"type": str, "min_length": 1, "max_length": 10000},
+}
 
 logger = logging.getLogger(__name__)
 
@@ -38,8 +48,12 @@ class StartJobInstantIDService:
             
             logger.info(f"Workflow updated for job: {job_id}")
             
-            # Step 3: Validate updated workflow
-            validation_result = await self.validation_service.validate_workflow_json(updated_workflow)
+            # Step 3: Validate updated workflow (template validated once per version)
+            validation_result = await self.validation_service.validate_job_workflow(
+                self._load_template(),
+                {"reference_image": reference_image, "user_prompt": prompt},
+                WORKFLOW_SLOT_CHECKS
+            )
             
             if not validation_result.get("valid", False):
                 logger.error(f"Workflow validation failed for job {job_id}: {validation_result.get('errors', [])}")
@@ -81,29 +95,23 @@ class StartJobInstantIDService:
     async def _update_workflow_with_params(self, job_id: str, reference_image: str, prompt: str) -> Dict[str, Any]:
         """Update the InstantID workflow with user parameters"""
         try:
-            # Load the InstantID workflow template
-            workflows_dir = os.path.join(os.path.dirname(current_dir), 'workflows')
-            workflow_path = os.path.join(workflows_dir, f"{self.workflow_name}.json")
-            
-            if not os.path.exists(workflow_path):
-                raise FileNotFoundError(f"InstantID workflow not found: {workflow_path}")
-            
-            with open(workflow_path, 'r') as f:
-                workflow_data = json.load(f)
-            
-            # Update workflow with user parameters
-            workflow_str = json.dumps(workflow_data)
-            
-            # Replace placeholders
-            workflow_str = workflow_str.replace("{reference_image}", reference_image)
-            workflow_str = workflow_str.replace("{user_prompt}", prompt)
-            workflow_str = workflow_str.replace("{timestamp}", str(hash(job_id) % 10000))
-            
-            updated_workflow = json.loads(workflow_str)
+            # Compiled once per template version; only the slot nodes are copied
+            template = self._load_template()
+            updated_workflow = template.instantiate({
+                "reference_image": reference_image,
+                "user_prompt": prompt,
+                "timestamp": str(hash(job_id) % 10000)
+            })
             
             logger.info(f"Workflow parameters updated for job: {job_id}")
             return updated_workflow
             
         except Exception as e:
             logger.error(f"Failed to update workflow with parameters: {e}")
-            raise e
\ No newline at end of file
+            raise e
+    
+    def _load_template(self):
+        """Load the compiled InstantID workflow template"""
+        workflows_dir = os.path.join(os.path.dirname(current_dir), 'workflows')
+        workflow_path = os.path.join(workflows_dir, f"{self.workflow_name}.json")
+        return workflow_templates.get(workflow_path, placeholders=WORKFLOW_PLACEHOLDERS)
\ No newline at end of file
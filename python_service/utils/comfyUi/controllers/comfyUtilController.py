@@ -1,6 +1,8 @@
 from typing import Dict, Any
 import logging
-from ..services.validateWorkflow import WorkflowValidationService
+from ..services.validateWorkflow import WorkflowValidationService, prepare_api_prompt
+from ..services.comfyClient import comfy_client
+from ..services.validationCache import validation_cache, check_slot_values
 
 logger = logging.getLogger(__name__)
 
@@ -9,13 +11,15 @@ class ComfyUtilController:
     
     def __init__(self):
         self.validation_service = WorkflowValidationService()
+        self.client = comfy_client
+        self.validation_cache = validation_cache
     
     async def validate_workflow(self, workflow_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate a workflow using ComfyUI API"""
+        """Validate a workflow against ComfyUI's node schemas"""
         try:
             logger.info("ComfyUtil controller validating workflow")
             
-            result = await self.validation_service.validate_with_comfyui(workflow_data)
+            result = await self.validation_service.validate_workflow(workflow_data)
             
             return result
             
@@ -28,13 +32,59 @@ class ComfyUtilController:
                 "response": {}
             }
     
-    async def submit_workflow(self, workflow_data: Dict[str, Any], client_id: str = "python_service") -> Dict[str, Any]:
-        """Submit workflow for execution (future use)"""
+    async def validate_template_instance(self, template, values: Dict[str, Any],
+                                         checks: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate a job built from a workflow template
+
+        The template itself is validated once per version (keyed by its
+        structural hash); each job only pays for cheap checks on the
+        substituted slot values.
+        """
         try:
-            # TODO: Implement workflow submission
+            errors = check_slot_values(values, checks)
+            if errors:
+                return {
+                    "valid": False,
+                    "details": {"message": "Invalid job parameters"},
+                    "errors": errors,
+                    "response": {}
+                }
+            
+            key = template.structural_hash
+            result = self.validation_cache.get(key)
+            cached = result is not None
+            if not cached:
+                # The first job's workflow stands in for the template, since
+                # placeholder slots are not valid inputs on their own
+                logger.info(f"Validating template {key[:12]}")
+                result = await self.validation_service.validate_workflow(template.instantiate(values))
+                # Only successes are cached; failures may be transient
+                if not result.get("valid", False):
+                    return result
+                self.validation_cache.put(key, result)
+            
             return {
-                "submitted": False,
-                "message": "Workflow submission not yet implemented"
+                **result,
+                "details": {**result.get("details", {}), "template_hash": key, "cached": cached}
+            }
+            
+        except Exception as e:
+            logger.error(f"Template validation failed: {e}")
+            return {
+                "valid": False,
+                "details": {},
+                "errors": [str(e)],
+                "response": {}
+            }
+    
+    async def submit_workflow(self, workflow_data: Dict[str, Any], job_id: str = None) -> Dict[str, Any]:
+        """Submit workflow for execution over the shared ComfyUI client"""
+        try:
+            tracker = await self.client.submit(await prepare_api_prompt(workflow_data), job_id=job_id)
+            return {
+                "submitted": True,
+                "prompt_id": tracker.prompt_id,
+                "client_id": self.client.client_id
             }
             
         except Exception as e:
@@ -45,12 +95,12 @@ class ComfyUtilController:
             }
     
     async def get_queue_status(self) -> Dict[str, Any]:
-        """Get ComfyUI queue status (future use)"""
+        """Get ComfyUI queue status"""
         try:
-            # TODO: Implement queue status check
+            queue = await self.client.get_json("/queue")
             return {
-                "queue_running": [],
-                "queue_pending": []
+                "queue_running": queue.get("queue_running", []),
+                "queue_pending": queue.get("queue_pending", [])
             }
             
         except Exception as e:
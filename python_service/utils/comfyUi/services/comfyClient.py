@@ -0,0 +1,387 @@
+from typing import Dict, Any, Optional, Callable, List, Tuple
+import logging
+import asyncio
+import json
+import time
+import uuid
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+class ComfySubmissionError(Exception):
+    """Raised when ComfyUI rejects a prompt"""
+
+    def __init__(self, error: Any, node_errors: Optional[Dict[str, Any]] = None, status_code: int = 400):
+        self.error = error
+        self.node_errors = node_errors or {}
+        self.status_code = status_code
+        message = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        super().__init__(message)
+
+
+class ComfyJobTracker:
+    """Tracks a single prompt through ComfyUI's websocket events"""
+
+    def __init__(self, prompt_id: str, job_id: Optional[str] = None,
+                 on_event: Optional[Callable[["ComfyJobTracker", str, Dict[str, Any]], Any]] = None):
+        self.prompt_id = prompt_id
+        self.job_id = job_id or prompt_id
+        self.status = "queued"
+        self.current_node = None
+        self.progress = {"value": 0, "max": 0, "node": None}
+        self.outputs: Dict[str, Any] = {}
+        self.cached_nodes: List[str] = []
+        self.error: Optional[Dict[str, Any]] = None
+        self.on_event = on_event
+        self.created_at = time.monotonic()
+        self.last_event_at = self.created_at
+        self._done = asyncio.get_running_loop().create_future()
+        # Running on_event coroutines; referenced here so they are not collected mid-run
+        self._callback_tasks = set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.done()
+
+    def handle_event(self, event_type: str, data: Dict[str, Any]):
+        """Apply a websocket event for this prompt"""
+        if self.done:
+            return
+
+        self.last_event_at = time.monotonic()
+        if event_type == "execution_start":
+            self.status = "running"
+        elif event_type == "execution_cached":
+            self.cached_nodes = data.get("nodes", [])
+        elif event_type == "executing":
+            node = data.get("node")
+            if node is None:
+                # Legacy completion signal, sent after execution_success/error
+                self._finish("success" if self.status == "running" else self.status)
+            else:
+                self.status = "running"
+                self.current_node = node
+        elif event_type == "progress":
+            self.status = "running"
+            self.progress = {
+                "value": data.get("value", 0),
+                "max": data.get("max", 0),
+                "node": data.get("node"),
+            }
+        elif event_type == "executed":
+            self.outputs[str(data.get("node"))] = data.get("output")
+        elif event_type == "execution_success":
+            self._finish("success")
+        elif event_type == "execution_error":
+            self.error = {
+                "node_id": data.get("node_id"),
+                "node_type": data.get("node_type"),
+                "exception_type": data.get("exception_type"),
+                "exception_message": data.get("exception_message"),
+            }
+            self._finish("error")
+        elif event_type == "execution_interrupted":
+            self._finish("interrupted")
+
+        if self.on_event is not None:
+            try:
+                result = self.on_event(self, event_type, data)
+                if asyncio.iscoroutine(result):
+                    task = asyncio.ensure_future(result)
+                    self._callback_tasks.add(task)
+                    task.add_done_callback(self._callback_done)
+            except Exception as e:
+                logger.error(f"Job event callback failed for {self.job_id}: {e}")
+
+    def _callback_done(self, task: asyncio.Future):
+        self._callback_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Job event callback failed for {self.job_id}: {task.exception()}")
+
+    def _finish(self, status: str):
+        self.status = status
+        if not self._done.done():
+            self._done.set_result(self.to_dict())
+
+    def fail(self, message: str):
+        """Mark the job as failed without a ComfyUI event (e.g. lost history)"""
+        self.error = {"exception_message": message}
+        self._finish("error")
+
+    async def wait(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait until ComfyUI reports the prompt as finished"""
+        return await asyncio.wait_for(asyncio.shield(self._done), timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prompt_id": self.prompt_id,
+            "job_id": self.job_id,
+            "status": self.status,
+            "current_node": self.current_node,
+            "progress": dict(self.progress),
+            "outputs": self.outputs,
+            "error": self.error,
+        }
+
+
+class ComfyClientService:
+    """Shared async ComfyUI client
+
+    Every request goes through one keep-alive aiohttp session, and completion of
+    submitted prompts is followed through a single /ws connection whose events
+    are dispatched to per-prompt trackers by prompt_id.
+    """
+
+    def __init__(self, comfy_host: str = "localhost", comfy_port: int = 8188,
+                 max_connections: int = 32, timeout: float = 30,
+                 sweep_interval: float = 60, max_job_seconds: float = 3600):
+        self.comfy_url = f"http://{comfy_host}:{comfy_port}"
+        self.ws_url = f"ws://{comfy_host}:{comfy_port}/ws"
+        self.client_id = uuid.uuid4().hex
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.queue_remaining: Optional[int] = None
+        # Trackers without events for sweep_interval are checked against
+        # /history, and failed once they are older than max_job_seconds
+        self.sweep_interval = sweep_interval
+        self.max_job_seconds = max_job_seconds
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._ws_task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        self._ws_connected: Optional[asyncio.Event] = None
+        self._trackers: Dict[str, ComfyJobTracker] = {}
+        self._closing = False
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def start(self):
+        """Open the shared session and websocket listener"""
+        self._closing = False
+        self._get_session()
+        await self._ensure_listener()
+
+    async def close(self):
+        """Stop the websocket listener and close the shared session"""
+        self._closing = True
+        for task in (self._ws_task, self._sweep_task):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._ws_task = None
+        self._sweep_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_json(self, path: str, **kwargs) -> Any:
+        """GET a ComfyUI endpoint and decode the JSON body"""
+        session = self._get_session()
+        async with session.get(f"{self.comfy_url}{path}", **kwargs) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def get_conditional(self, path: str, etag: Optional[str] = None) -> Tuple[int, Optional[str], Any]:
+        """GET a ComfyUI endpoint with If-None-Match
+
+        Returns (status, etag, body); body is None when the server answers
+        304 Not Modified.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        session = self._get_session()
+        async with session.get(f"{self.comfy_url}{path}", headers=headers) as response:
+            if response.status == 304:
+                return 304, etag, None
+            response.raise_for_status()
+            return response.status, response.headers.get("ETag"), await response.json()
+
+    async def post_prompt(self, prompt: Dict[str, Any], prompt_id: Optional[str] = None,
+                          extra_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """POST an API-format prompt to /prompt
+
+        Returns the status code and decoded body without raising on
+        validation errors, so callers can inspect node_errors.
+        """
+        payload = {"prompt": prompt, "client_id": self.client_id}
+        if prompt_id is not None:
+            payload["prompt_id"] = prompt_id
+        if extra_data:
+            payload["extra_data"] = extra_data
+
+        session = self._get_session()
+        async with session.post(f"{self.comfy_url}/prompt", json=payload) as response:
+            try:
+                body = await response.json(content_type=None)
+            except json.JSONDecodeError:
+                body = {"raw_response": await response.text()}
+            return {"status_code": response.status, "body": body or {}}
+
+    async def submit(self, prompt: Dict[str, Any], job_id: Optional[str] = None,
+                     extra_data: Optional[Dict[str, Any]] = None,
+                     on_event: Optional[Callable] = None) -> ComfyJobTracker:
+        """Queue a prompt and return a tracker following it over /ws"""
+        await self._ensure_listener()
+
+        # The prompt_id is chosen here so the tracker is registered before
+        # ComfyUI can emit any event for it.
+        prompt_id = str(uuid.uuid4())
+        tracker = ComfyJobTracker(prompt_id, job_id=job_id, on_event=on_event)
+        self._trackers[prompt_id] = tracker
+
+        try:
+            result = await self.post_prompt(prompt, prompt_id=prompt_id, extra_data=extra_data)
+        except Exception:
+            self._trackers.pop(prompt_id, None)
+            raise
+
+        if result["status_code"] != 200:
+            self._trackers.pop(prompt_id, None)
+            body = result["body"]
+            raise ComfySubmissionError(
+                body.get("error", "Unknown submission error"),
+                node_errors=body.get("node_errors", {}),
+                status_code=result["status_code"],
+            )
+
+        tracker._done.add_done_callback(lambda _: self._trackers.pop(prompt_id, None))
+        return tracker
+
+    def get_tracker(self, prompt_id: str) -> Optional[ComfyJobTracker]:
+        return self._trackers.get(prompt_id)
+
+    @property
+    def connected(self) -> bool:
+        return self._ws_connected is not None and self._ws_connected.is_set()
+
+    @property
+    def active_jobs(self) -> int:
+        return len(self._trackers)
+
+    async def _ensure_listener(self):
+        """Start the websocket listener and wait until it is connected"""
+        if self._ws_task is None or self._ws_task.done():
+            self._ws_connected = asyncio.Event()
+            self._ws_task = asyncio.create_task(self._listen())
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep())
+        try:
+            await asyncio.wait_for(self._ws_connected.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"ComfyUI websocket unavailable at {self.ws_url}")
+
+    async def _listen(self):
+        """Receive /ws events forever, reconnecting with backoff"""
+        backoff = 0.5
+        while not self._closing:
+            try:
+                session = self._get_session()
+                async with session.ws_connect(
+                    f"{self.ws_url}?clientId={self.client_id}",
+                    heartbeat=30,
+                ) as ws:
+                    logger.info(f"Connected to ComfyUI websocket at {self.ws_url}")
+                    backoff = 0.5
+                    self._ws_connected.set()
+                    await self._reconcile_trackers()
+
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._dispatch(msg.data)
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+                        # Binary messages are previews, which we do not track
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"ComfyUI websocket error: {e}")
+
+            self._ws_connected.clear()
+            if self._closing:
+                break
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10)
+
+    def _dispatch(self, raw: str):
+        """Route a websocket message to the tracker for its prompt_id"""
+        try:
+            message = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning("Ignoring invalid JSON from ComfyUI websocket")
+            return
+
+        event_type = message.get("type")
+        data = message.get("data") or {}
+
+        if event_type == "status":
+            exec_info = data.get("status", {}).get("exec_info", {})
+            self.queue_remaining = exec_info.get("queue_remaining", self.queue_remaining)
+            return
+
+        prompt_id = data.get("prompt_id")
+        tracker = self._trackers.get(prompt_id) if prompt_id else None
+        if tracker is not None:
+            tracker.handle_event(event_type, data)
+
+    async def _sweep(self):
+        """Periodically resolve or expire trackers that stopped receiving events"""
+        while not self._closing:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self._reconcile_trackers(idle_seconds=self.sweep_interval)
+            except Exception as e:
+                logger.warning(f"ComfyUI tracker sweep failed: {e}")
+            self._expire_trackers()
+
+    def _expire_trackers(self):
+        """Fail trackers for prompts that never finished, so they do not leak"""
+        now = time.monotonic()
+        for prompt_id, tracker in list(self._trackers.items()):
+            if not tracker.done and now - tracker.created_at > self.max_job_seconds:
+                logger.warning(f"Giving up on prompt {prompt_id} after {self.max_job_seconds:.0f}s")
+                tracker.fail(f"No result from ComfyUI after {self.max_job_seconds:.0f}s")
+
+    async def _reconcile_trackers(self, idle_seconds: float = 0):
+        """Resolve jobs that finished while their events were missed
+
+        Only trackers without an event for idle_seconds are checked.
+        """
+        now = time.monotonic()
+        for prompt_id, tracker in list(self._trackers.items()):
+            if tracker.done or now - tracker.last_event_at < idle_seconds:
+                continue
+            try:
+                history = await self.get_json(f"/history/{prompt_id}")
+            except Exception as e:
+                logger.warning(f"Could not reconcile prompt {prompt_id}: {e}")
+                continue
+
+            entry = history.get(prompt_id)
+            if not entry:
+                continue
+            for node_id, output in entry.get("outputs", {}).items():
+                tracker.outputs[str(node_id)] = output
+            status = entry.get("status", {})
+            if status.get("completed"):
+                tracker.handle_event("execution_success", {"prompt_id": prompt_id})
+            elif status.get("status_str") == "error":
+                tracker.fail("Execution failed while websocket was disconnected")
+
+
+# Global ComfyUI client instance shared by all services
+comfy_client = ComfyClientService()
@@ -0,0 +1,331 @@
+from typing import Dict, Any, Optional, List, Tuple
+import logging
+import traceback
+import sys
+
+from .workflowConverter import UPLOAD_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+# The checks below mirror ComfyUI's execution.validate_prompt/validate_inputs
+# and return the same error shapes, but run against /object_info schemas so
+# no request (and no queued prompt) is needed. Node-specific VALIDATE_INPUTS
+# hooks cannot run here; ComfyUI still applies them when the job is queued.
+# The inputs such a hook takes over are listed in the schema's
+# "validate_inputs" and, as in ComfyUI, skip the built-in checks.
+
+def validate_node_input(received_type: Any, input_type: Any, strict: bool = False) -> bool:
+    """Same type compatibility rule as comfy_execution.validation.validate_node_input"""
+    if not received_type != input_type:
+        return True
+
+    # AnyType compares equal to every type in ComfyUI and reaches /object_info as "*"
+    if received_type == "*" or input_type == "*":
+        return True
+
+    if not isinstance(received_type, str) or not isinstance(input_type, str):
+        return False
+
+    received_types = set(t.strip() for t in received_type.split(","))
+    input_types = set(t.strip() for t in input_type.split(","))
+
+    if strict:
+        return received_types.issubset(input_types)
+    return len(received_types.intersection(input_types)) > 0
+
+def full_type_name(klass) -> str:
+    module = klass.__module__
+    if module == 'builtins':
+        return klass.__qualname__
+    return module + '.' + klass.__qualname__
+
+def _get_input_info(class_inputs: Dict[str, Any], name: str) -> Tuple[Any, Optional[str], Dict[str, Any]]:
+    for category in ("required", "optional", "hidden"):
+        if name in class_inputs.get(category, {}):
+            info = class_inputs[category][name]
+            extra_info = info[1] if len(info) > 1 and isinstance(info[1], dict) else {}
+            return info[0], category, extra_info
+    return None, None, {}
+
+def _validate_function_inputs(schema: Dict[str, Any]) -> Tuple[List[str], bool]:
+    """Arguments of the node's VALIDATE_INPUTS and whether it takes **kwargs"""
+    info = schema.get("validate_inputs") or {}
+    return info.get("inputs", []), info.get("kwargs", False)
+
+def _has_custom_validation(extra_info: Dict[str, Any]) -> bool:
+    # Upload combos are checked by the node's VALIDATE_INPUTS (file exists)
+    # rather than against the option list, which can be stale here
+    return any(extra_info.get(option) for option in UPLOAD_OPTIONS)
+
+def validate_inputs(prompt: Dict[str, Any], item: str, validated: Dict[str, Any],
+                    schemas: Dict[str, Any]) -> Tuple[bool, List[Dict[str, Any]], str]:
+    unique_id = item
+    if unique_id in validated:
+        return validated[unique_id]
+
+    inputs = prompt[unique_id]['inputs']
+    class_type = prompt[unique_id]['class_type']
+    schema = schemas[class_type]
+
+    class_inputs = schema.get("input", {})
+    valid_inputs = set(class_inputs.get('required', {})).union(set(class_inputs.get('optional', {})))
+
+    errors = []
+    valid = True
+    validate_function_inputs, validate_has_kwargs = _validate_function_inputs(schema)
+
+    for x in valid_inputs:
+        input_type, input_category, extra_info = _get_input_info(class_inputs, x)
+        if x not in inputs:
+            if input_category == "required":
+                errors.append({
+                    "type": "required_input_missing",
+                    "message": "Required input is missing",
+                    "details": f"{x}",
+                    "extra_info": {
+                        "input_name": x
+                    }
+                })
+            continue
+
+        val = inputs[x]
+        info = (input_type, extra_info)
+        if isinstance(val, list):
+            if len(val) != 2:
+                errors.append({
+                    "type": "bad_linked_input",
+                    "message": "Bad linked input, must be a length-2 list of [node_id, slot_index]",
+                    "details": f"{x}",
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "received_value": val
+                    }
+                })
+                continue
+
+            o_id = val[0]
+            o_class_type = prompt[o_id]['class_type']
+            r = schemas[o_class_type]["output"]
+            received_type = r[val[1]]
+            if 'input_types' not in validate_function_inputs and not validate_node_input(received_type, input_type):
+                errors.append({
+                    "type": "return_type_mismatch",
+                    "message": "Return type mismatch between linked nodes",
+                    "details": f"{x}, received_type({received_type}) mismatch input_type({input_type})",
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "received_type": received_type,
+                        "linked_node": val
+                    }
+                })
+                continue
+            try:
+                r = validate_inputs(prompt, o_id, validated, schemas)
+                if r[0] is False:
+                    valid = False
+                    continue
+            except Exception as ex:
+                typ, _, tb = sys.exc_info()
+                valid = False
+                validated[o_id] = (False, [{
+                    "type": "exception_during_inner_validation",
+                    "message": "Exception when validating inner node",
+                    "details": str(ex),
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "exception_message": str(ex),
+                        "exception_type": full_type_name(typ),
+                        "traceback": traceback.format_tb(tb),
+                        "linked_node": val
+                    }
+                }], o_id)
+                continue
+        else:
+            try:
+                if isinstance(val, dict) and "__value__" in val:
+                    val = val["__value__"]
+                if input_type == "INT":
+                    val = int(val)
+                if input_type == "FLOAT":
+                    val = float(val)
+                if input_type == "STRING":
+                    val = str(val)
+                if input_type == "BOOLEAN":
+                    val = bool(val)
+            except Exception as ex:
+                errors.append({
+                    "type": "invalid_input_type",
+                    "message": f"Failed to convert an input value to a {input_type} value",
+                    "details": f"{x}, {val}, {ex}",
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "received_value": val,
+                        "exception_message": str(ex)
+                    }
+                })
+                continue
+
+            if x in validate_function_inputs or validate_has_kwargs or _has_custom_validation(extra_info):
+                continue
+
+            if "min" in extra_info and val < extra_info["min"]:
+                errors.append({
+                    "type": "value_smaller_than_min",
+                    "message": "Value {} smaller than min of {}".format(val, extra_info["min"]),
+                    "details": f"{x}",
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "received_value": val,
+                    }
+                })
+                continue
+            if "max" in extra_info and val > extra_info["max"]:
+                errors.append({
+                    "type": "value_bigger_than_max",
+                    "message": "Value {} bigger than max of {}".format(val, extra_info["max"]),
+                    "details": f"{x}",
+                    "extra_info": {
+                        "input_name": x,
+                        "input_config": info,
+                        "received_value": val,
+                    }
+                })
+                continue
+
+            if isinstance(input_type, list):
+                combo_options = input_type
+                if val not in combo_options:
+                    input_config = info
+                    if len(combo_options) > 20:
+                        list_info = f"(list of length {len(combo_options)})"
+                        input_config = None
+                    else:
+                        list_info = str(combo_options)
+
+                    errors.append({
+                        "type": "value_not_in_list",
+                        "message": "Value not in list",
+                        "details": f"{x}: '{val}' not in {list_info}",
+                        "extra_info": {
+                            "input_name": x,
+                            "input_config": input_config,
+                            "received_value": val,
+                        }
+                    })
+                    continue
+
+    if len(errors) > 0 or valid is not True:
+        ret = (False, errors, unique_id)
+    else:
+        ret = (True, [], unique_id)
+
+    validated[unique_id] = ret
+    return ret
+
+def validate_prompt(prompt: Dict[str, Any], schemas: Dict[str, Any],
+                    partial_execution_list: Optional[List[str]] = None):
+    """Validate an API prompt against node schemas
+
+    Returns (valid, error, good_outputs, node_errors), the same tuple as
+    ComfyUI's execution.validate_prompt.
+    """
+    outputs = set()
+    for x in prompt:
+        if 'class_type' not in prompt[x]:
+            error = {
+                "type": "invalid_prompt",
+                "message": "Cannot execute because a node is missing the class_type property.",
+                "details": f"Node ID '#{x}'",
+                "extra_info": {}
+            }
+            return (False, error, [], {})
+
+        class_type = prompt[x]['class_type']
+        schema = schemas.get(class_type, None)
+        if schema is None:
+            error = {
+                "type": "invalid_prompt",
+                "message": f"Cannot execute because node {class_type} does not exist.",
+                "details": f"Node ID '#{x}'",
+                "extra_info": {}
+            }
+            return (False, error, [], {})
+
+        if schema.get("output_node") is True:
+            if partial_execution_list is None or x in partial_execution_list:
+                outputs.add(x)
+
+    if len(outputs) == 0:
+        error = {
+            "type": "prompt_no_outputs",
+            "message": "Prompt has no outputs",
+            "details": "",
+            "extra_info": {}
+        }
+        return (False, error, [], {})
+
+    good_outputs = set()
+    errors = []
+    node_errors = {}
+    validated = {}
+    for o in sorted(outputs):
+        valid = False
+        reasons = []
+        try:
+            m = validate_inputs(prompt, o, validated, schemas)
+            valid = m[0]
+            reasons = m[1]
+        except Exception as ex:
+            typ, _, tb = sys.exc_info()
+            valid = False
+            reasons = [{
+                "type": "exception_during_validation",
+                "message": "Exception when validating node",
+                "details": str(ex),
+                "extra_info": {
+                    "exception_type": full_type_name(typ),
+                    "traceback": traceback.format_tb(tb)
+                }
+            }]
+            validated[o] = (False, reasons, o)
+
+        if valid is True:
+            good_outputs.add(o)
+        else:
+            errors += [(o, reasons)]
+            for node_id, result in validated.items():
+                valid = result[0]
+                reasons = result[1]
+                # Downstream nodes of an invalid node are invalid too but carry
+                # no errors of their own, so they are not reported
+                if valid is not True and len(reasons) > 0:
+                    if node_id not in node_errors:
+                        node_errors[node_id] = {
+                            "errors": reasons,
+                            "dependent_outputs": [],
+                            "class_type": prompt[node_id]['class_type']
+                        }
+                    node_errors[node_id]["dependent_outputs"].append(o)
+
+    if len(good_outputs) == 0:
+        errors_list = []
+        for o, errors in errors:
+            for error in errors:
+                errors_list.append(f"{error['message']}: {error['details']}")
+        errors_list = "\n".join(errors_list)
+
+        error = {
+            "type": "prompt_outputs_failed_validation",
+            "message": "Prompt outputs failed validation",
+            "details": errors_list,
+            "extra_info": {}
+        }
+
+        return (False, error, list(good_outputs), node_errors)
+
+    return (True, None, list(good_outputs), node_errors)
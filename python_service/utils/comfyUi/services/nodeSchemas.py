@@ -0,0 +1,58 @@
+from typing import Dict, Any, Optional
+import logging
+import asyncio
+import time
+
+from .comfyClient import comfy_client
+
+logger = logging.getLogger(__name__)
+
+class NodeSchemaService:
+    """Cached copy of ComfyUI's /object_info node schemas
+
+    The payload is fetched once and then only revalidated with its ETag
+    after max_age seconds, so a schema lookup is normally a dict access.
+    """
+
+    def __init__(self, client=None, max_age: float = 300):
+        self.client = client or comfy_client
+        self.max_age = max_age
+        self._schemas: Optional[Dict[str, Any]] = None
+        self._etag: Optional[str] = None
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def get(self, force_refresh: bool = False) -> Dict[str, Any]:
+        """Get node schemas keyed by class_type"""
+        if not force_refresh and self._schemas is not None and time.monotonic() - self._fetched_at < self.max_age:
+            return self._schemas
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not force_refresh and self._schemas is not None and time.monotonic() - self._fetched_at < self.max_age:
+                return self._schemas
+
+            try:
+                status, etag, body = await self.client.get_conditional("/object_info", self._etag)
+            except Exception as e:
+                if self._schemas is None:
+                    raise
+                # Keep serving the last known schemas while ComfyUI is unreachable
+                logger.warning(f"Failed to refresh /object_info, using cached schemas: {e}")
+                return self._schemas
+
+            if status != 304:
+                self._schemas = body
+                self._etag = etag
+                logger.info(f"Loaded {len(body)} node schemas from ComfyUI")
+            self._fetched_at = time.monotonic()
+            return self._schemas
+
+    def invalidate(self):
+        """Force the next lookup to revalidate with ComfyUI"""
+        self._fetched_at = 0.0
+
+
+# Global node schema cache shared by all services
+node_schemas = NodeSchemaService()
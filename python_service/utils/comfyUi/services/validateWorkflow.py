@@ -1,153 +1,94 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import logging
-import requests
-import asyncio
-import json
+
+from .nodeSchemas import node_schemas
+from .workflowConverter import convert_ui_workflow
+from .localValidation import validate_prompt
 
 logger = logging.getLogger(__name__)
 
+def is_ui_workflow(workflow_data: Dict[str, Any]) -> bool:
+    """Whether a workflow is in UI format (nodes array) rather than API format"""
+    return "nodes" in workflow_data and isinstance(workflow_data["nodes"], list)
+
+def build_api_prompt(workflow_data: Dict[str, Any], schemas: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Convert a workflow into the API prompt format accepted by /prompt"""
+    if is_ui_workflow(workflow_data):
+        if schemas is None:
+            raise ValueError("Node schemas are required to convert a UI workflow")
+        # Widget values are mapped to named inputs using each node's schema
+        return convert_ui_workflow(workflow_data, schemas)
+
+    # API format: keep the node entries only
+    return {key: value for key, value in workflow_data.items() if key.isdigit()}
+
+async def prepare_api_prompt(workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a workflow into an API prompt, loading node schemas if needed"""
+    schemas = await node_schemas.get() if is_ui_workflow(workflow_data) else None
+    return build_api_prompt(workflow_data, schemas)
+
 class WorkflowValidationService:
-    """Service for validating workflows with ComfyUI API"""
-    
-    def __init__(self, comfy_host: str = "localhost", comfy_port: int = 8188):
-        self.comfy_url = f"http://{comfy_host}:{comfy_port}"
-        self.prompt_endpoint = f"{self.comfy_url}/prompt"  # Use /prompt for validation
-        self.timeout = 30  # 30 second timeout
-    
-    async def validate_with_comfyui(self, workflow_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Validate workflow with ComfyUI validation endpoint"""
+    """Service for validating workflows against ComfyUI's node schemas
+
+    Schemas come from /object_info and are cached, so validation runs
+    in-process and never queues the prompt.
+    """
+
+    def __init__(self, schemas=None):
+        self.node_schemas = schemas or node_schemas
+
+    async def validate_workflow(self, workflow_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate workflow locally with the same checks as ComfyUI's /prompt"""
         try:
-            logger.info(f"Validating workflow with ComfyUI at {self.prompt_endpoint}")
-            
-            # Convert workflow nodes array to ComfyUI format (key-value pairs)
-            clean_workflow = {}
-            
-            # Check if workflow has nodes array
-            if "nodes" in workflow_data and isinstance(workflow_data["nodes"], list):
-                # Convert nodes array to dict with node IDs as keys
-                for node in workflow_data["nodes"]:
-                    if "id" in node:
-                        node_id = str(node["id"])
-                        # Create ComfyUI compatible node structure
-                        clean_workflow[node_id] = {
-                            "inputs": node.get("inputs", {}),
-                            "class_type": node.get("type", ""),
-                            "_meta": {
-                                "title": node.get("title", "")
-                            }
-                        }
-                        
-                        # Convert widget values to inputs format
-                        if "widgets_values" in node:
-                            # Map widget values to input names based on node type
-                            widgets_values = node["widgets_values"]
-                            if widgets_values:
-                                clean_workflow[node_id]["inputs"].update({
-                                    f"input_{i}": value for i, value in enumerate(widgets_values)
-                                })
-            else:
-                # Fallback: try original approach for different workflow formats
-                for key, value in workflow_data.items():
-                    if key.isdigit():
-                        clean_workflow[key] = value
-            
-            logger.info(f"Original workflow has {len(workflow_data.get('nodes', []))} nodes")
-            logger.info(f"Cleaned workflow keys: {list(clean_workflow.keys())}")
-            
-            # Prepare validation payload
-            validation_payload = {
-                "prompt": clean_workflow
-            }
-            
-            # Make async request to ComfyUI
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None, 
-                self._make_validation_request, 
-                validation_payload
-            )
-            
-            return self._parse_validation_response(response)
-            
+            schemas = await self.node_schemas.get()
         except Exception as e:
-            logger.error(f"ComfyUI validation request failed: {e}")
+            logger.error(f"Failed to load node schemas from ComfyUI: {e}")
             return {
                 "valid": False,
                 "details": {
                     "error": "ComfyUI API not available or validation failed",
-                    "comfy_url": self.comfy_url
+                    "comfy_url": self.node_schemas.client.comfy_url
                 },
                 "errors": [str(e)],
                 "response": {}
             }
-    
-    def _make_validation_request(self, payload: Dict[str, Any]) -> requests.Response:
-        """Make synchronous validation request to ComfyUI"""
+
         try:
-            response = requests.post(
-                self.prompt_endpoint,
-                json=payload,
-                timeout=self.timeout,
-                headers={"Content-Type": "application/json"}
-            )
-            return response
-            
-        except requests.exceptions.ConnectionError as e:
-            logger.error(f"Cannot connect to ComfyUI at {self.comfy_url}: {e}")
-            raise Exception(f"ComfyUI service unavailable at {self.comfy_url}")
-        except requests.exceptions.Timeout as e:
-            logger.error(f"ComfyUI validation timeout: {e}")
-            raise Exception("ComfyUI validation timeout")
+            prompt = build_api_prompt(workflow_data, schemas)
+            return self.validate_prompt(prompt, schemas)
+
         except Exception as e:
-            logger.error(f"ComfyUI request failed: {e}")
-            raise e
-    
-    def _parse_validation_response(self, response: requests.Response) -> Dict[str, Any]:
-        """Parse ComfyUI validation response"""
-        try:
-            response_data = response.json() if response.text else {}
-            
-            if response.status_code == 200:
-                # Successful validation
-                return {
-                    "valid": True,
-                    "details": {
-                        "status_code": response.status_code,
-                        "message": "Workflow validation successful"
-                    },
-                    "errors": [],
-                    "response": response_data
-                }
-            else:
-                # Validation failed
-                return {
-                    "valid": False,
-                    "details": {
-                        "status_code": response.status_code,
-                        "message": "Workflow validation failed"
-                    },
-                    "errors": [response_data.get("error", "Unknown validation error")],
-                    "response": response_data
-                }
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse ComfyUI response: {e}")
+            logger.error(f"Workflow validation failed: {e}")
             return {
                 "valid": False,
                 "details": {
-                    "status_code": response.status_code,
-                    "message": "Invalid JSON response from ComfyUI"
+                    "message": "Failed to validate workflow"
                 },
-                "errors": [f"JSON decode error: {str(e)}"],
-                "response": {"raw_response": response.text}
+                "errors": [str(e)],
+                "response": {}
             }
-        except Exception as e:
-            logger.error(f"Failed to process ComfyUI response: {e}")
+
+    def validate_prompt(self, prompt: Dict[str, Any], schemas: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate an API prompt and shape the result like a /prompt response"""
+        valid, error, good_outputs, node_errors = validate_prompt(prompt, schemas)
+
+        if valid:
             return {
-                "valid": False,
+                "valid": True,
                 "details": {
-                    "message": "Failed to process ComfyUI response"
+                    "message": "Workflow validation successful",
+                    "outputs": good_outputs
                 },
-                "errors": [str(e)],
-                "response": {}
-            }
\ No newline at end of file
+                "errors": [],
+                "response": {"node_errors": node_errors}
+            }
+
+        logger.warning(f"Invalid workflow: {error.get('message')}: {error.get('details')}")
+        return {
+            "valid": False,
+            "details": {
+                "message": "Workflow validation failed"
+            },
+            "errors": [error],
+            "response": {"error": error, "node_errors": node_errors}
+        }
@@ -0,0 +1,90 @@
+from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+import logging
+import threading
+import os
+
+logger = logging.getLogger(__name__)
+
+# Default image extensions accepted for image slots
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+def check_slot_values(values: Dict[str, Any], checks: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Cheap per-job type and range checks on the values substituted into a template
+
+    Each check may define ``type``, ``min_length``/``max_length`` (strings),
+    ``min``/``max`` (numbers), ``extensions`` and ``filename`` (reject path
+    separators and parent references).
+    """
+    errors = []
+    for name, check in checks.items():
+        if name not in values:
+            if check.get("required", True):
+                errors.append(f"Missing value for '{name}'")
+            continue
+
+        value = values[name]
+        expected_type = check.get("type")
+        if expected_type is not None and not isinstance(value, expected_type):
+            errors.append(f"'{name}' must be of type {expected_type.__name__}, got {type(value).__name__}")
+            continue
+
+        if isinstance(value, str):
+            if len(value) < check.get("min_length", 0):
+                errors.append(f"'{name}' must be at least {check['min_length']} characters")
+            if "max_length" in check and len(value) > check["max_length"]:
+                errors.append(f"'{name}' must be at most {check['max_length']} characters")
+            if check.get("filename") and (os.path.basename(value) != value or value in (".", "..")):
+                errors.append(f"'{name}' must be a plain file name")
+            extensions = check.get("extensions")
+            if extensions and not value.lower().endswith(tuple(extensions)):
+                errors.append(f"'{name}' must have one of the extensions {list(extensions)}")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if "min" in check and value < check["min"]:
+                errors.append(f"'{name}' must be >= {check['min']}")
+            if "max" in check and value > check["max"]:
+                errors.append(f"'{name}' must be <= {check['max']}")
+
+    return errors
+
+class ValidationCache:
+    """Bounded cache of successful workflow validations keyed by template structure"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one cached validation, or all of them"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Global validation cache shared by all services
+validation_cache = ValidationCache()
@@ -0,0 +1,252 @@
+from typing import Dict, Any, Optional, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Input types the frontend renders as widgets (lists are combos)
+WIDGET_TYPES = ("INT", "FLOAT", "STRING", "BOOLEAN", "COMBO")
+
+# Combo options that add an extra "upload" widget after the input
+UPLOAD_OPTIONS = ("image_upload", "video_upload", "audio_upload", "animated_image_upload")
+
+# Values of the extra control_after_generate widget
+CONTROL_VALUES = ("fixed", "increment", "decrement", "randomize")
+
+# cg-use-everywhere broadcasters; their links are added by the frontend
+EVERYWHERE_NODES = ("Anything Everywhere", "Anything Everywhere3", "Anything Everywhere?",
+                    "Seed Everywhere", "Prompts Everywhere")
+
+# Frontend-only nodes that are never sent to the server
+VIRTUAL_NODES = ("Reroute", "PrimitiveNode", "Note", "MarkdownNote", "SetNode", "GetNode",
+                 "Label (rgthree)", "Bookmark (rgthree)") + EVERYWHERE_NODES
+
+# Node modes in UI workflows
+MODE_MUTED = 2
+MODE_BYPASS = 4
+
+def is_widget_input(input_type: Any, extra_info: Dict[str, Any]) -> bool:
+    """Whether the frontend renders an input as a widget rather than a socket"""
+    if extra_info.get("forceInput"):
+        return False
+    return isinstance(input_type, list) or input_type in WIDGET_TYPES
+
+def iter_schema_inputs(schema: Dict[str, Any]):
+    """Yield (name, input_type, extra_info) for required then optional inputs"""
+    inputs = schema.get("input", {})
+    order = schema.get("input_order") or {k: list(v.keys()) for k, v in inputs.items()}
+    for category in ("required", "optional"):
+        spec = inputs.get(category, {})
+        for name in order.get(category, spec.keys()):
+            if name not in spec:
+                continue
+            info = spec[name]
+            input_type = info[0]
+            extra_info = info[1] if len(info) > 1 and isinstance(info[1], dict) else {}
+            yield name, input_type, extra_info
+
+def map_widget_values(schema: Dict[str, Any], widgets_values: Any) -> Dict[str, Any]:
+    """Map a UI node's widgets_values to named inputs
+
+    Mirrors the order in which the frontend creates widgets: one per widget
+    input in input_order, plus the extra ``upload`` widget after upload combos
+    and the ``control_after_generate`` widget after seed-like inputs, whose
+    values occupy a slot in widgets_values but are not node inputs.
+    """
+    if isinstance(widgets_values, dict):
+        # Some custom nodes (e.g. VHS) serialise widgets by name
+        return {
+            name: widgets_values[name]
+            for name, input_type, extra_info in iter_schema_inputs(schema)
+            if is_widget_input(input_type, extra_info) and name in widgets_values
+        }
+
+    values = widgets_values or []
+    widgets = [w for w in iter_schema_inputs(schema) if is_widget_input(w[1], w[2])]
+    mapped = {}
+    index = 0
+    for position, (name, input_type, extra_info) in enumerate(widgets):
+        if index >= len(values):
+            break
+        mapped[name] = values[index]
+        index += 1
+
+        if any(extra_info.get(option) for option in UPLOAD_OPTIONS):
+            index += 1
+            continue
+
+        if input_type in ("INT", "COMBO") or isinstance(input_type, list):
+            has_control = extra_info.get("control_after_generate", name in ("seed", "noise_seed"))
+            next_value = values[index] if index < len(values) else None
+            if not has_control and input_type == "INT" and next_value in CONTROL_VALUES:
+                # Older nodes get a control widget from the frontend without
+                # declaring it; only skip it if the next widget can't hold it
+                following = widgets[position + 1] if position + 1 < len(widgets) else None
+                has_control = following is None or not (
+                    following[1] == "STRING" or (isinstance(following[1], list) and next_value in following[1])
+                )
+            if has_control and next_value in CONTROL_VALUES:
+                index += 1
+
+    return mapped
+
+class UIWorkflowConverter:
+    """Convert a UI-format workflow (``nodes``/``links``) into an API prompt
+
+    Links are resolved through Reroute, SetNode/GetNode and bypassed nodes,
+    PrimitiveNode values are inlined, muted nodes are dropped and
+    use-everywhere broadcasts are connected to unconnected inputs of the
+    matching type, matching what the frontend sends to /prompt.
+    """
+
+    def __init__(self, workflow: Dict[str, Any], schemas: Dict[str, Any]):
+        self.schemas = schemas
+        self.nodes = {node["id"]: node for node in workflow.get("nodes", []) if "id" in node}
+        self.links = {}
+        for link in workflow.get("links", []):
+            if isinstance(link, dict):
+                self.links[link["id"]] = (link["origin_id"], link["origin_slot"], link.get("type"))
+            else:
+                link_id, origin_id, origin_slot, _, _, link_type = link[:6]
+                self.links[link_id] = (origin_id, origin_slot, link_type)
+        self.set_nodes = {
+            node["widgets_values"][0]: node
+            for node in self.nodes.values()
+            if node.get("type") == "SetNode" and node.get("widgets_values")
+        }
+
+    def convert(self) -> Dict[str, Any]:
+        broadcasts = self._everywhere_broadcasts()
+        prompt = {}
+        for node_id, node in self.nodes.items():
+            class_type = node.get("type", "")
+            if class_type in VIRTUAL_NODES or node.get("mode") in (MODE_MUTED, MODE_BYPASS):
+                continue
+
+            schema = self.schemas.get(class_type)
+            inputs = {}
+            if schema is not None:
+                inputs = self._node_inputs(node, schema)
+                if broadcasts:
+                    self._apply_broadcasts(node, schema, inputs, broadcasts)
+            prompt[str(node_id)] = {
+                "inputs": inputs,
+                "class_type": class_type,
+                "_meta": {"title": node.get("title") or (schema or {}).get("display_name", class_type)}
+            }
+        return prompt
+
+    def _node_inputs(self, node: Dict[str, Any], schema: Dict[str, Any]) -> Dict[str, Any]:
+        widget_values = map_widget_values(schema, node.get("widgets_values"))
+        linked = {slot.get("name"): slot.get("link") for slot in node.get("inputs", []) if slot.get("link") is not None}
+
+        inputs = {}
+        for name, input_type, extra_info in iter_schema_inputs(schema):
+            if name in linked:
+                source = self._resolve_link(linked[name])
+                if source is None:
+                    pass
+                elif source[0] == "value":
+                    # PrimitiveNode: the target keeps the value in its own widget
+                    inputs[name] = widget_values.get(name, source[1])
+                    continue
+                else:
+                    inputs[name] = [str(source[0]), source[1]]
+                    continue
+            if name in widget_values:
+                value = widget_values[name]
+                # Lists are reserved for links, so list values are wrapped
+                inputs[name] = {"__value__": value} if isinstance(value, list) else value
+        return inputs
+
+    def _everywhere_broadcasts(self) -> List[Tuple[str, Optional[str], Any]]:
+        """Collect (type, input name filter, value) for every active broadcaster"""
+        broadcasts = []
+        for node in self.nodes.values():
+            class_type = node.get("type")
+            if class_type not in EVERYWHERE_NODES or node.get("mode") in (MODE_MUTED, MODE_BYPASS):
+                continue
+            name_filter = "seed" if class_type == "Seed Everywhere" else None
+
+            for slot in node.get("inputs", []):
+                link = self.links.get(slot.get("link"))
+                if link is None:
+                    continue
+                source = self._resolve_link(slot["link"])
+                if source is None:
+                    continue
+                value = source[1] if source[0] == "value" else [str(source[0]), source[1]]
+                broadcasts.append((link[2], name_filter, value))
+
+            if class_type == "Seed Everywhere" and not node.get("inputs", [{}])[0].get("link"):
+                values = node.get("widgets_values") or []
+                if values:
+                    broadcasts.append(("INT", name_filter, values[0]))
+        return broadcasts
+
+    def _apply_broadcasts(self, node: Dict[str, Any], schema: Dict[str, Any], inputs: Dict[str, Any],
+                          broadcasts: List[Tuple[str, Optional[str], Any]]):
+        linked = {slot.get("name") for slot in node.get("inputs", []) if slot.get("link") is not None}
+        connectable = node.get("properties", {}).get("widget_ue_connectable", {})
+        for name, input_type, extra_info in iter_schema_inputs(schema):
+            if name in linked:
+                continue
+            if is_widget_input(input_type, extra_info):
+                # Widgets only accept broadcasts when enabled on the node
+                if not connectable.get(name):
+                    continue
+            elif name in inputs:
+                continue
+            for link_type, name_filter, value in broadcasts:
+                if link_type == input_type and (name_filter is None or name_filter in name.lower()):
+                    inputs[name] = value
+                    break
+
+    def _resolve_link(self, link_id: int, depth: int = 0) -> Optional[Tuple[Any, Any]]:
+        """Follow a link to the node that really produces the value
+
+        Returns (node_id, slot), ("value", constant), or None if the link
+        ends in a muted or missing node.
+        """
+        link = self.links.get(link_id)
+        if link is None or depth > 64:
+            return None
+        origin_id, origin_slot, link_type = link
+        node = self.nodes.get(origin_id)
+        if node is None or node.get("mode") == MODE_MUTED:
+            return None
+
+        class_type = node.get("type")
+        if class_type == "PrimitiveNode":
+            values = node.get("widgets_values") or [None]
+            return ("value", values[0])
+        if class_type in ("Reroute", "SetNode"):
+            return self._follow_input(node, 0, depth)
+        if class_type == "GetNode":
+            name = (node.get("widgets_values") or [None])[0]
+            set_node = self.set_nodes.get(name)
+            return self._follow_input(set_node, 0, depth) if set_node else None
+        if node.get("mode") == MODE_BYPASS:
+            return self._follow_bypass(node, origin_slot, link_type, depth)
+        return (origin_id, origin_slot)
+
+    def _follow_input(self, node: Dict[str, Any], index: int, depth: int):
+        inputs = node.get("inputs", [])
+        if index >= len(inputs) or inputs[index].get("link") is None:
+            return None
+        return self._resolve_link(inputs[index]["link"], depth + 1)
+
+    def _follow_bypass(self, node: Dict[str, Any], origin_slot: int, link_type: Any, depth: int):
+        """A bypassed node passes through its first input of the output's type"""
+        inputs = node.get("inputs", [])
+        candidates = []
+        if origin_slot < len(inputs):
+            candidates.append(inputs[origin_slot])
+        candidates.extend(inputs)
+        for slot in candidates:
+            if slot.get("link") is not None and slot.get("type") == link_type:
+                return self._resolve_link(slot["link"], depth + 1)
+        return None
+
+def convert_ui_workflow(workflow: Dict[str, Any], schemas: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a UI-format workflow into an API prompt using node schemas"""
+    return UIWorkflowConverter(workflow, schemas).convert()
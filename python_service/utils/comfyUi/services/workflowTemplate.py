@@ -0,0 +1,185 @@
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+import logging
+import threading
+import hashlib
+import json
+import os
+
+logger = logging.getLogger(__name__)
+
+# Stand-in value for parameter slots when hashing a template's structure
+SLOT_MASK = "\u0000slot\u0000"
+
+class WorkflowTemplate:
+    """A workflow loaded once with the locations of its parameter slots precomputed
+
+    Two kinds of slots are supported:
+    - widget slots for UI-format workflows (``nodes`` array), addressed by
+      node id and ``widgets_values`` index, e.g. ``{"image": (137, 0)}``
+    - ``{placeholder}`` strings in the inputs of API-format workflows
+
+    ``instantiate`` copies only the nodes that hold a slot; every other node
+    is shared with the template, so callers must treat the result as read-only
+    outside the slot values.
+    """
+
+    def __init__(self, path: str, data: Dict[str, Any],
+                 widget_slots: Optional[Dict[str, Tuple[int, int]]] = None,
+                 placeholders: Iterable[str] = ()):
+        self.path = path
+        self.data = data
+        self.is_ui_format = isinstance(data.get("nodes"), list)
+
+        # slot name -> [(node index in "nodes", widget index)]
+        self._widget_slots: Dict[str, List[Tuple[int, int]]] = {}
+        # node key -> {input name: template string}
+        self._placeholder_inputs: Dict[str, Dict[str, str]] = {}
+        self._placeholders = tuple(placeholders)
+        self._structural_hash: Optional[str] = None
+
+        if widget_slots:
+            self._compile_widget_slots(widget_slots)
+        if self._placeholders:
+            self._compile_placeholders()
+
+    def _compile_widget_slots(self, widget_slots: Dict[str, Tuple[int, int]]):
+        nodes = self.data.get("nodes", [])
+        index_by_id = {node.get("id"): i for i, node in enumerate(nodes)}
+
+        for name, (node_id, widget_index) in widget_slots.items():
+            node_index = index_by_id.get(node_id)
+            if node_index is None:
+                logger.warning(f"Node ({node_id}) for slot '{name}' not found in {self.path}")
+                continue
+
+            widgets_values = nodes[node_index].get("widgets_values")
+            if not isinstance(widgets_values, list) or len(widgets_values) <= widget_index:
+                logger.warning(f"Node ({node_id}) for slot '{name}' has no widgets_values[{widget_index}]")
+                continue
+
+            self._widget_slots.setdefault(name, []).append((node_index, widget_index))
+
+    def _compile_placeholders(self):
+        for node_key, node in self.data.items():
+            if not isinstance(node, dict):
+                continue
+            for input_name, value in node.get("inputs", {}).items():
+                if isinstance(value, str) and any(f"{{{p}}}" in value for p in self._placeholders):
+                    self._placeholder_inputs.setdefault(node_key, {})[input_name] = value
+
+    @property
+    def slot_names(self) -> List[str]:
+        templates = [t for inputs in self._placeholder_inputs.values() for t in inputs.values()]
+        names = list(self._widget_slots.keys())
+        names.extend(p for p in self._placeholders if any(f"{{{p}}}" in t for t in templates))
+        return names
+
+    def slot_paths(self) -> List[Tuple[Any, ...]]:
+        """Paths of every value that instantiate() may change"""
+        paths = []
+        nodes = self.data.get("nodes", [])
+        for slots in self._widget_slots.values():
+            for node_index, widget_index in slots:
+                paths.append(("nodes", nodes[node_index].get("id"), "widgets_values", widget_index))
+        for node_key, inputs in self._placeholder_inputs.items():
+            for input_name in inputs:
+                paths.append((node_key, "inputs", input_name))
+        return paths
+
+    @property
+    def structural_hash(self) -> str:
+        """Hash of the workflow with every parameter slot masked out
+
+        Two jobs built from the same template version share this hash no
+        matter which values are substituted into the slots.
+        """
+        if self._structural_hash is None:
+            masked = self.instantiate({name: SLOT_MASK for name in self.slot_names})
+            encoded = json.dumps(masked, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            self._structural_hash = hashlib.sha256(encoded).hexdigest()
+        return self._structural_hash
+
+    def instantiate(self, values: Dict[str, Any]) -> Dict[str, Any]:
+        """Build a per-job workflow, copying only the nodes that change"""
+        workflow = dict(self.data)
+
+        if self._widget_slots:
+            nodes = list(self.data["nodes"])
+            copied = {}
+            for name, slots in self._widget_slots.items():
+                if name not in values:
+                    continue
+                for node_index, widget_index in slots:
+                    node = copied.get(node_index)
+                    if node is None:
+                        node = dict(nodes[node_index])
+                        node["widgets_values"] = list(node["widgets_values"])
+                        nodes[node_index] = copied[node_index] = node
+                    node["widgets_values"][widget_index] = values[name]
+            workflow["nodes"] = nodes
+
+        for node_key, inputs in self._placeholder_inputs.items():
+            node = dict(self.data[node_key])
+            node["inputs"] = dict(node["inputs"])
+            for input_name, template in inputs.items():
+                result = template
+                for placeholder in self._placeholders:
+                    if placeholder in values:
+                        result = result.replace(f"{{{placeholder}}}", str(values[placeholder]))
+                node["inputs"][input_name] = result
+            workflow[node_key] = node
+
+        return workflow
+
+
+class WorkflowTemplateCache:
+    """Process-wide cache of compiled workflow templates
+
+    Templates are keyed by path and slot definition, and reloaded only when
+    the file's mtime or size changes.
+    """
+
+    def __init__(self):
+        self._templates: Dict[Tuple[Any, ...], Tuple[Tuple[int, int], WorkflowTemplate]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, widget_slots: Optional[Dict[str, Tuple[int, int]]] = None,
+            placeholders: Iterable[str] = ()) -> WorkflowTemplate:
+        """Get the compiled template for path, loading it on first use or change"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Workflow template not found: {path}")
+
+        placeholders = tuple(placeholders)
+        key = (path, tuple(sorted((widget_slots or {}).items())), placeholders)
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        cached = self._templates.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._templates.get(key)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            with open(path, 'r') as f:
+                data = json.load(f)
+
+            template = WorkflowTemplate(path, data, widget_slots=widget_slots, placeholders=placeholders)
+            self._templates[key] = (version, template)
+            logger.info(f"Workflow template compiled: {os.path.basename(path)} (slots: {template.slot_names})")
+            return template
+
+    def invalidate(self, path: Optional[str] = None):
+        """Drop one template, or all of them"""
+        with self._lock:
+            if path is None:
+                self._templates.clear()
+            else:
+                for key in [k for k in self._templates if k[0] == path]:
+                    del self._templates[key]
+
+
+# Global workflow template cache shared by all services
+workflow_templates = WorkflowTemplateCache()